@@ -0,0 +1,74 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+from caching import FrozenDict, LRUCache
+
+# Accept-Language / Accept-Encoding values repeat across clients as much as
+# user agents do, so parsed results are memoized by the raw header value
+ACCEPT_HEADER_CACHE_SIZE = int(os.environ.get("ACCEPT_HEADER_CACHE_SIZE", "4096"))
+accept_language_cache = LRUCache("accept_language", ACCEPT_HEADER_CACHE_SIZE)
+accept_encoding_cache = LRUCache("accept_encoding", ACCEPT_HEADER_CACHE_SIZE)
+
+# RFC 9110 12.4.2: qvalue = ( "0" [ "." 0*3DIGIT ] ) / ( "1" [ "." 0*3("0") ] )
+_QVALUE = re.compile(r"(?:0(?:\.[0-9]{0,3})?|1(?:\.0{0,3})?)\Z")
+# RFC 4647 2.1: language-range = (1*8ALPHA *("-" 1*8alphanum)) / "*"
+_LANGUAGE_RANGE = re.compile(r"(?:\*|[A-Za-z]{1,8}(?:-[A-Za-z0-9]{1,8})*)\Z")
+# RFC 9110 5.6.2: token = 1*tchar
+_TOKEN = re.compile(r"[!#$%&'*+\-.^_`|~0-9A-Za-z]+\Z")
+
+
+def _weighted_elements(value: str) -> List[Tuple[str, float]]:
+    """
+    (item, quality) for each element of a comma-separated, q-weighted header
+    value, in header order. Whitespace around separators and the case of the
+    q parameter are ignored; elements that are empty or carry a malformed q
+    are skipped rather than failing the whole header.
+    """
+    elements = []
+    for element in value.split(","):
+        item, *params = element.split(";")
+        item = item.strip()
+        if not item:
+            continue
+        quality: Optional[float] = 1.0
+        for param in params:
+            name, _, weight = param.partition("=")
+            if name.strip().lower() == "q":
+                weight = weight.strip()
+                quality = float(weight) if _QVALUE.match(weight) else None
+        if quality is not None:
+            elements.append((item, quality))
+    return elements
+
+
+def _parse_accept_language(value: str) -> Tuple[FrozenDict, ...]:
+    # POSIX-style locales ("en_US") are not language ranges, but clients send them; keep them as "en-US"
+    ranges = ((item.replace("_", "-"), quality) for item, quality in _weighted_elements(value))
+    languages = [FrozenDict(language=item, quality=quality) for item, quality in ranges if _LANGUAGE_RANGE.match(item)]
+    # Stable: equally weighted ranges keep the client's order
+    languages.sort(key=lambda entry: entry["quality"], reverse=True)
+    return tuple(languages)
+
+
+def _parse_accept_encoding(value: str) -> Tuple[FrozenDict, ...]:
+    return tuple(FrozenDict(coding=item.lower(), quality=quality)
+                 for item, quality in _weighted_elements(value) if _TOKEN.match(item))
+
+
+def parse_accept_language(accept_language: str) -> Tuple[FrozenDict, ...]:
+    """
+    Language ranges of an Accept-Language value as read-only
+    {"language", "quality"} entries, highest quality first. Underscores
+    are read as hyphens, so "en_US" comes back as "en-US".
+    """
+    if not accept_language:
+        return ()
+    return accept_language_cache.get_or_compute(accept_language, _parse_accept_language)
+
+
+def parse_accept_encoding(accept_encoding: str) -> Tuple[FrozenDict, ...]:
+    """Content codings of an Accept-Encoding value as read-only {"coding", "quality"} entries, in header order."""
+    if not accept_encoding:
+        return ()
+    return accept_encoding_cache.get_or_compute(accept_encoding, _parse_accept_encoding)
@@ -0,0 +1,79 @@
+"""
+Accept-Language / Accept-Encoding parsing per request: the previous
+split-based parsers, the RFC parsers uncached, and the memoized parsers
+the request signals use, over header values repeating as they do in the
+load-test workload plus a share of one-off values. Also reports the hit
+rate of the parse caches.
+"""
+import random
+import sys
+
+import common
+import accept_headers
+import loadtest
+from accept_headers import parse_accept_encoding, parse_accept_language
+
+
+def legacy_accept_language(accept_language: str):
+    if not accept_language:
+        return []
+    languages = []
+    for part in accept_language.split(","):
+        part = part.strip()
+        if ";q=" in part:
+            lang, quality = part.split(";q=")
+            languages.append({"language": lang.strip(), "quality": float(quality.strip())})
+        else:
+            languages.append({"language": part, "quality": 1.0})
+    languages.sort(key=lambda x: x["quality"], reverse=True)
+    return languages
+
+
+def legacy_accept_encoding(accept_encoding: str):
+    return [enc.strip() for enc in accept_encoding.split(",") if enc.strip()]
+
+
+def headers(count: int, unique_share: float, seed: int = 21):
+    rng = random.Random(seed)
+    values = []
+    for index in range(count):
+        language = rng.choice(loadtest.ACCEPT_LANGUAGES)
+        if rng.random() < unique_share:
+            language += f",x-{index % 99_999:05d};q=0.{index % 10}"
+        values.append((language, rng.choice(loadtest.ACCEPT_ENCODINGS)))
+    return values
+
+
+def run(language, encoding, values) -> None:
+    # Every round starts cold, so the hit rate is that of a single pass
+    accept_headers.accept_language_cache.clear()
+    accept_headers.accept_encoding_cache.clear()
+    for accept_language, accept_encoding in values:
+        language(accept_language)
+        encoding(accept_encoding)
+
+
+VARIANTS = (
+    ("previous split parsers", legacy_accept_language, legacy_accept_encoding),
+    ("RFC parsers, uncached", accept_headers._parse_accept_language, accept_headers._parse_accept_encoding),
+    ("RFC parsers, memoized", parse_accept_language, parse_accept_encoding),
+)
+
+
+def main_bench(count: int = 50_000) -> int:
+    for unique_share in (0.0, 0.05, 0.5):
+        values = headers(count, unique_share)
+        print(f"-- {count:,} requests, {unique_share:.0%} one-off Accept-Language values")
+        for label, language, encoding in VARIANTS:
+            result = common.bench(label, lambda: run(language, encoding, values))
+            print(f"{'':<48} {result['best_s'] / count * 1e9:9.0f}ns/request")
+        cache = accept_headers.accept_language_cache
+        hits, misses = cache.hits, cache.misses
+        run(parse_accept_language, parse_accept_encoding, values)
+        hits, misses = cache.hits - hits, cache.misses - misses
+        print(f"{'accept_language cache, one pass':<48} hit rate {hits / (hits + misses):.1%}, {len(cache)} entries")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_bench())
@@ -0,0 +1,42 @@
+"""
+Per-record ingestion cost: N separate POST /collect requests versus one
+POST /collect/batch NDJSON body, driven in-process through the ASGI app.
+Storage and logging are disabled so the numbers isolate request handling.
+"""
+import json
+import os
+import time
+
+os.environ.setdefault("SIGNAL_STORE", "none")
+os.environ.setdefault("LOG_SINK", "none")
+
+import common
+from fastapi.testclient import TestClient
+import main
+
+
+def main_bench(records: int = 500) -> None:
+    client = TestClient(main.app)
+    payloads = [common.client_payload(canvas_kb=4, seed=i) for i in range(20)]
+    headers = {"user-agent": common.ua_corpus(1)[0], "accept-language": "en-US,en;q=0.9",
+               "x-forwarded-for": "203.0.113.7"}
+
+    start = time.perf_counter()
+    for i in range(records):
+        client.post("/collect", json=payloads[i % len(payloads)], headers=headers)
+    single_s = time.perf_counter() - start
+
+    body = "\n".join(json.dumps(payloads[i % len(payloads)]) for i in range(records)).encode()
+    start = time.perf_counter()
+    response = client.post("/collect/batch", content=body,
+                           headers={**headers, "content-type": "application/x-ndjson"})
+    batch_s = time.perf_counter() - start
+    assert response.json()["accepted"] == records
+
+    print(f"{'POST /collect x' + str(records):<32} {single_s / records * 1e3:7.3f}ms/record")
+    print(f"{'POST /collect/batch (NDJSON)':<32} {batch_s / records * 1e3:7.3f}ms/record  "
+          f"response {len(response.content) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main_bench()
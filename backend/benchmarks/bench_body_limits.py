@@ -0,0 +1,80 @@
+"""
+Oversized /collect bodies with and without the body limit: a 24 MB
+canvas data URL posted with Content-Length and chunked, through the ASGI
+app. Without a cap the body is buffered, decoded and processed in full;
+with COLLECT_MAX_BODY_BYTES it is answered with 413 before (Content-Length)
+or as soon as (chunked) the limit is crossed. Reports time and peak traced
+memory per request.
+"""
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("SIGNAL_STORE", "none")
+os.environ.setdefault("LOG_SINK", "none")
+os.environ.setdefault("CANVAS_STORE", "none")
+
+import common
+import main
+from body_limits import body_limits
+
+CHUNK = 64 * 1024
+
+
+async def post(body: bytes, chunked: bool) -> int:
+    """POST /collect straight into the ASGI app, delivering the body in CHUNK-sized messages as a server would."""
+    headers = [(b"content-type", b"application/json"), (b"user-agent", common.ua_corpus(1)[0].encode())]
+    if not chunked:
+        headers.append((b"content-length", str(len(body)).encode()))
+    scope = {**common.collect_scope(headers), "query_string": b"response=minimal"}
+    view = memoryview(body)
+    offset = 0
+    status = None
+
+    async def receive():
+        nonlocal offset
+        chunk = bytes(view[offset:offset + CHUNK])
+        offset += CHUNK
+        return {"type": "http.request", "body": chunk, "more_body": offset < len(body)}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await main.app(scope, receive, send)
+    return status
+
+
+def run(label: str, body: bytes, chunked: bool, requests: int = 3) -> None:
+    timings, peak, status = [], 0, None
+    for _ in range(requests):
+        tracemalloc.start()
+        start = time.perf_counter()
+        status = asyncio.run(post(body, chunked))
+        timings.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(f"{label:<40} {status}  {min(timings) * 1e3:9.1f}ms/request  peak {peak / 1024 / 1024:7.1f} MB")
+
+
+def main_bench(canvas_mb: int = 24) -> None:
+    payload = common.client_payload(canvas_kb=1)
+    payload["canvasFingerprintDataURL"] = "data:image/png;base64," + "A" * (canvas_mb * 1024 * 1024)
+    body = json.dumps(payload).encode()
+    limit, max_chars = body_limits.max_body_bytes, body_limits.max_chars
+    print(f"{len(body) / 1024 / 1024:.0f} MB body, COLLECT_MAX_BODY_BYTES={limit}")
+
+    body_limits.max_body_bytes = body_limits.max_chars = len(body) + 1
+    run("no limit, Content-Length", body, chunked=False)
+    run("no limit, chunked", body, chunked=True)
+    body_limits.max_body_bytes, body_limits.max_chars = limit, max_chars
+    run("limit, Content-Length", body, chunked=False)
+    run("limit, chunked", body, chunked=True)
+    print(f"bodies rejected: {body_limits.stats()['bodies_rejected']}")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,81 @@
+"""
+Body validation cost on small and large /collect payloads: FastAPI's body
+parameter (json.loads, then CollectedSignals validation of the Python
+objects), CollectedSignals.model_validate_json, and the lazy path
+(orjson decode, top-level checks, list items checked on read). Each
+variant is followed by model_dump(), as record_collection does, and the
+dumps are checked for equality. Reports time and peak traced memory per
+body, then /collect end to end through the ASGI app in both modes.
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SIGNAL_STORE", "none")
+os.environ.setdefault("LOG_SINK", "none")
+os.environ.setdefault("CANVAS_STORE", "none")
+# Room for the largest payload below
+os.environ.setdefault("CLIENT_FIELD_MAX_CHARS", str(4 * 1024 * 1024))
+
+import common
+import collected_signals
+import main
+from collected_signals import CollectedSignals, parse_lazy
+from fastapi.testclient import TestClient
+
+
+def payload(canvas_kb: int, items: int) -> bytes:
+    body = common.client_payload(canvas_kb=canvas_kb, fonts=items, plugins=items // 10)
+    body["fileUploads"] = [{"name": f"file{i}.bin", "size": i * 17, "type": "application/octet-stream",
+                            "lastModified": 1700000000000 + i} for i in range(items // 10)]
+    body["computedStyles"] = {f"--prop-{i}": {"value": f"{i}px", "inherited": bool(i % 2)} for i in range(items)}
+    return json.dumps(body).encode()
+
+
+VARIANTS = (
+    ("FastAPI body param (json.loads + validate)", lambda body: CollectedSignals.model_validate(json.loads(body))),
+    ("CollectedSignals.model_validate_json", CollectedSignals.model_validate_json),
+    ("lazy (orjson + top-level checks)", parse_lazy),
+)
+
+
+def peak_memory(fn, body: bytes) -> int:
+    tracemalloc.start()
+    record = fn(body).model_dump()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del record
+    return peak
+
+
+def main_bench(calls: int = 20) -> int:
+    for canvas_kb, items in ((2, 20), (256, 2_000), (2048, 8_000)):
+        body = payload(canvas_kb, items)
+        dumps = [fn(body).model_dump() for _, fn in VARIANTS]
+        if any(dump != dumps[0] for dump in dumps[1:]):
+            print(f"MISMATCH at {canvas_kb} KB canvas, {items} items")
+            return 1
+        print(f"-- {len(body) / 1024:,.0f} KB body ({canvas_kb} KB canvas, {items} fonts/styles)")
+        for label, fn in VARIANTS:
+            result = common.bench(label, lambda: [fn(body).model_dump() for _ in range(calls)])
+            print(f"{'':<48} {result['best_s'] / calls * 1e6:9.1f}us/body  "
+                  f"peak {peak_memory(fn, body) / 1024:8.1f} KB")
+
+    client = TestClient(main.app)
+    body = payload(256, 2_000)
+    headers = {"content-type": "application/json", "user-agent": common.ua_corpus(1)[0]}
+    print(f"-- POST /collect?response=minimal, {len(body) / 1024:,.0f} KB body")
+    for mode in ("model", "lazy"):
+        collected_signals.BODY_VALIDATION = mode
+        start = time.perf_counter()
+        for _ in range(calls * 5):
+            assert client.post("/collect?response=minimal", content=body, headers=headers).status_code == 200
+        elapsed = time.perf_counter() - start
+        print(f"BODY_VALIDATION={mode:<36} {elapsed / (calls * 5) * 1e3:9.2f}ms/request")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_bench())
@@ -0,0 +1,64 @@
+"""
+Compare the legacy three-function bot detection against the single-pass
+classifier in bot_detection.py over a large user agent corpus.
+"""
+from typing import Dict, List
+
+import common
+from bot_detection import BOT_INDICATORS, BOT_PATTERNS, classify_request
+
+
+def legacy_is_bot(user_agent: str) -> bool:
+    if not user_agent:
+        return False
+    ua_lower = user_agent.lower()
+    return any(indicator in ua_lower for indicator in BOT_INDICATORS)
+
+
+def legacy_detect_bot_patterns(user_agent: str) -> List[str]:
+    if not user_agent:
+        return []
+    ua_lower = user_agent.lower()
+    return [name for pattern, name in BOT_PATTERNS.items() if pattern in ua_lower]
+
+
+def legacy_detect_automation_headers(headers: Dict) -> bool:
+    automation_indicators = [
+        headers.get("x-requested-with") == "XMLHttpRequest",
+        "headless" in headers.get("user-agent", "").lower(),
+        "selenium" in headers.get("user-agent", "").lower(),
+        "puppeteer" in headers.get("user-agent", "").lower(),
+        "playwright" in headers.get("user-agent", "").lower(),
+        headers.get("sec-ch-ua") and "Headless" in headers.get("sec-ch-ua", ""),
+    ]
+    return any(automation_indicators)
+
+
+def legacy_classify(user_agent: str, headers: Dict) -> Dict:
+    # parse_user_agent() called is_bot a second time on every request
+    legacy_is_bot(user_agent)
+    return {
+        "is_bot_likely": legacy_is_bot(user_agent),
+        "bot_patterns_matched": legacy_detect_bot_patterns(user_agent),
+        "has_automation_headers": legacy_detect_automation_headers(headers),
+    }
+
+
+def main(size: int = 50_000) -> None:
+    corpus = common.ua_corpus(size)
+    requests = [{"user-agent": ua, "sec-ch-ua": '"Chromium";v="124"'} for ua in corpus]
+
+    mismatches = [h for h in requests
+                  if legacy_classify(h["user-agent"], h) != classify_request(h["user-agent"], h)]
+    print(f"corpus={size} mismatches={len(mismatches)}")
+
+    legacy = common.bench("legacy is_bot+patterns+automation",
+                          lambda: [legacy_classify(h["user-agent"], h) for h in requests])
+    compiled = common.bench("compiled classify_request",
+                            lambda: [classify_request(h["user-agent"], h) for h in requests])
+    for result in (legacy, compiled):
+        print(f"{result['label']:<48} {result['best_s'] / size * 1e6:7.2f}us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Canvas offload: per-record memory, encoded record size and on-disk storage
+with canvas data URLs kept inline versus offloaded to the content-addressed
+blob store. Records go through main.record_collection into a jsonl signal
+store; devices repeat, as they do in production, so most canvases dedup.
+"""
+import asyncio
+import base64
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("SIGNAL_STORE", "none")
+os.environ.setdefault("LOG_SINK", "none")
+
+import common
+import main
+from canvas_store import CanvasStore
+from log_sink import encode_record
+from signal_store import create_store, list_segments
+from starlette.requests import Request
+
+
+def device_payloads(devices: int, canvas_kb: int, seed: int = 5):
+    rng = random.Random(seed)
+    payloads = []
+    for index in range(devices):
+        payload = common.client_payload(canvas_kb=1, seed=index)
+        image = b"\x89PNG\r\n\x1a\n" + rng.randbytes(canvas_kb * 1024 * 3 // 4)
+        payload["canvasFingerprintDataURL"] = "data:image/png;base64," + base64.b64encode(image).decode()
+        payloads.append(json.dumps(payload).encode())
+    return payloads
+
+
+def server_signals():
+    return main.build_server_signals(Request(common.collect_scope()))
+
+
+def directory_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+async def collect(bodies, signals):
+    return [await main.record_collection(time.time(), signals, main.CollectedSignals.model_validate_json(body))
+            for body in bodies]
+
+
+def run(label: str, store, records: int, payloads, signals) -> None:
+    rng = random.Random(11)
+    # Skewed device mix: a few devices account for most visits
+    order = [payloads[min(int(rng.paretovariate(1.2)) - 1, len(payloads) - 1)] for _ in range(records)]
+    with tempfile.TemporaryDirectory() as tmp:
+        main.canvas_store = store(os.path.join(tmp, "canvas")) if store else None
+        main.signal_store = create_store("jsonl", directory=os.path.join(tmp, "segments"))
+        tracemalloc.start()
+        start = time.perf_counter()
+        # Bodies are parsed per record, as a request would, so inline canvases are fresh strings
+        kept = asyncio.run(collect(order, signals))
+        elapsed = time.perf_counter() - start
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        encoded = sum(len(encode_record(record)) for record in kept[:500]) / min(500, records)
+        main.signal_store.close()
+        segments = sum(os.path.getsize(path) for path in list_segments(os.path.join(tmp, "segments")))
+        blobs = directory_size(os.path.join(tmp, "canvas")) if os.path.isdir(os.path.join(tmp, "canvas")) else 0
+        stats = main.canvas_store.stats() if main.canvas_store else {}
+    print(f"{label:<10} {elapsed / records * 1e6:8.1f}us/record  retained {retained / records / 1024:7.1f} KB/record  "
+          f"encoded {encoded / 1024:7.1f} KB/record  disk {segments / 1024 / 1024:7.2f} MB segments "
+          f"+ {blobs / 1024 / 1024:6.2f} MB blobs"
+          + (f"  ({stats['blobs']} blobs, {stats['deduplicated']} dedup hits)" if stats else ""))
+
+
+def main_bench(records: int = 5_000, devices: int = 400, canvas_kb: int = 24) -> None:
+    payloads = device_payloads(devices, canvas_kb)
+    signals = server_signals()
+    print(f"{records} records from {devices} devices, {canvas_kb} KB canvas data URLs")
+    run("inline", None, records, payloads, signals)
+    run("offload", CanvasStore, records, payloads, signals)
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,92 @@
+"""
+Request latency with the previous Client Hints middleware (@app.middleware
+"http", i.e. BaseHTTPMiddleware, building and joining the hint list on
+every response) against the pure ASGI ClientHintsMiddleware, through the
+full app: GET / (a health check, which now gets no hints), GET /canvas/...
+(a small response that still gets them) and POST /collect?response=minimal.
+Variants alternate round by round and the best round of each is reported.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("SIGNAL_STORE", "none")
+os.environ.setdefault("LOG_SINK", "none")
+os.environ.setdefault("CANVAS_STORE", "none")
+
+import common
+import main
+from client_hints import ClientHintsMiddleware
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+
+async def legacy_add_client_hints_request(request, call_next):
+    response = await call_next(request)
+    client_hints = [
+        "Sec-CH-UA", "Sec-CH-UA-Mobile", "Sec-CH-UA-Platform",
+        "Sec-CH-UA-Arch", "Sec-CH-UA-Bitness", "Sec-CH-UA-Model",
+        "Sec-CH-UA-Platform-Version", "Sec-CH-UA-Full-Version-List",
+        "Sec-CH-UA-WoW64", "Device-Memory", "Downlink", "ECT", "RTT",
+        "Save-Data", "Viewport-Width", "Width", "DPR",
+        "Sec-CH-Prefers-Color-Scheme", "Sec-CH-Prefers-Reduced-Motion"
+    ]
+    response.headers["Accept-CH"] = ", ".join(client_hints)
+    response.headers["Critical-CH"] = ", ".join(client_hints[:8])
+    return response
+
+
+def use_middleware(middleware: Middleware) -> None:
+    """Swap the Client Hints entry of the app's middleware list and rebuild the stack."""
+    index = next(i for i, entry in enumerate(main.app.user_middleware)
+                 if entry.cls in (ClientHintsMiddleware, BaseHTTPMiddleware))
+    main.app.user_middleware[index] = middleware
+    main.app.middleware_stack = main.app.build_middleware_stack()
+
+
+async def drive(requests: int, method: str, path: str, query: bytes, body: bytes) -> float:
+    headers = [(b"host", b"collector.example.com"), (b"user-agent", common.ua_corpus(1)[0].encode()),
+               (b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    scope = {**common.collect_scope(headers), "method": method, "path": path, "query_string": query}
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await main.app(dict(scope), receive, send)
+    elapsed = time.perf_counter() - start
+    assert status in (200, 404), status
+    return elapsed / requests
+
+
+def main_bench(requests: int = 2000, rounds: int = 5) -> int:
+    body = json.dumps(common.client_payload(canvas_kb=2, fonts=20, plugins=3)).encode()
+    cases = (("GET /", "GET", "/", b"", b""), ("GET /canvas/<digest> (404)", "GET", "/canvas/" + "0" * 64, b"", b""),
+             ("POST /collect?response=minimal", "POST", "/collect", b"response=minimal", body))
+    variants = (("BaseHTTPMiddleware", Middleware(BaseHTTPMiddleware, dispatch=legacy_add_client_hints_request)),
+                ("pure ASGI", next(entry for entry in main.app.user_middleware if entry.cls is ClientHintsMiddleware)))
+    for label, method, path, query, case_body in cases:
+        best = {name: float("inf") for name, _ in variants}
+        for _ in range(rounds):
+            for name, middleware in variants:
+                use_middleware(middleware)
+                count = requests // 10 if method == "POST" else requests
+                per_request = asyncio.run(drive(count, method, path, query, case_body))
+                best[name] = min(best[name], per_request)
+        print(f"-- {label}")
+        for name, _ in variants:
+            print(f"{name:<48} {best[name] * 1e6:9.1f}us/request")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_bench())
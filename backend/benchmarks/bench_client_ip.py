@@ -0,0 +1,70 @@
+"""
+Client IP extraction plus geolocation per request: the previous extractor
+(every X-Forwarded-For hop split out and parsed with ipaddress, then the
+chosen IP parsed again by get_ip_geolocation) against the trusted-proxy
+walk, which parses hops from the right until the first untrusted one and
+hands its address to geolocation. Chains of 1, 3 and 8 hops arrive through
+a local proxy; a spoofed chain comes straight from a public peer.
+"""
+import ipaddress
+import os
+import random
+import sys
+
+# Time the extraction and the address handoff, not database lookups
+os.environ.setdefault("GEOIP_DB_PATH", os.devnull)
+
+import common
+from geolocation import get_ip_geolocation
+from request_signals import extract_client_address
+from starlette.requests import Request
+
+
+def legacy_extract_client_ip(request: Request) -> str:
+    xff = request.headers.get("x-forwarded-for", "")
+    if xff:
+        for part in [p.strip() for p in xff.split(",")]:
+            try:
+                ip_obj = ipaddress.ip_address(part)
+                if not (ip_obj.is_private or ip_obj.is_loopback or ip_obj.is_link_local):
+                    return part
+            except ValueError:
+                continue
+    x_real_ip = request.headers.get("x-real-ip")
+    if x_real_ip:
+        try:
+            ip_obj = ipaddress.ip_address(x_real_ip.strip())
+            if not (ip_obj.is_private or ip_obj.is_loopback or ip_obj.is_link_local):
+                return x_real_ip.strip()
+        except ValueError:
+            pass
+    return request.client.host
+
+
+def requests_for(hops: int, peer: str, count: int, seed: int = 22):
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        client = f"{rng.randint(11, 99)}.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+        proxies = [f"10.0.{rng.randint(0, 255)}.{rng.randint(1, 254)}" for _ in range(hops - 1)]
+        xff = ", ".join([client] + proxies)
+        scope = {**common.collect_scope([(b"x-forwarded-for", xff.encode())]), "client": (peer, 50000)}
+        requests.append(Request(scope))
+    return requests
+
+
+def main_bench(count: int = 20_000) -> int:
+    for label, hops, peer in (("1 hop via local proxy", 1, "127.0.0.1"), ("3 hops via local proxy", 3, "127.0.0.1"),
+                              ("8 hops via local proxy", 8, "127.0.0.1"), ("spoofed, public peer", 3, "198.51.100.7")):
+        requests = requests_for(hops, peer, count)
+        sample = requests[0]
+        print(f"-- {label}: peer {sample.client.host}, X-Forwarded-For: {sample.headers['x-forwarded-for']}")
+        for name, fn in (("previous extract + geolocation", lambda r: get_ip_geolocation(legacy_extract_client_ip(r))),
+                         ("trusted-proxy walk + geolocation", lambda r: get_ip_geolocation(*extract_client_address(r)))):
+            result = common.bench(name, lambda: [fn(request) for request in requests])
+            print(f"{'':<48} {result['best_s'] / count * 1e9:9.0f}ns/request")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_bench())
@@ -0,0 +1,51 @@
+"""
+Columnar export throughput and memory: streams synthetic records through
+export_columnar.export_records at several row group sizes and reports
+records/second, Arrow pool peak and output size. Peak memory should track
+the row group size, not the number of records.
+"""
+import os
+import tempfile
+import time
+
+import common
+import export_columnar
+import pyarrow as pa
+
+
+def synthetic_records(count: int):
+    uas = common.ua_corpus(200)
+    payload = common.client_payload(canvas_kb=1)
+    payload.pop("canvasFingerprintDataURL")
+    for i in range(count):
+        yield {
+            "collection_metadata": {"timestamp": 1.7e9 + i, "response_time_ms": 1.5, "collection_version": "2.0.0"},
+            "server_signals": {
+                "client_ip": f"203.0.{i % 256}.{i % 251}",
+                "geolocation": {"city": "Berlin", "country_code": "DE", "timezone": "Europe/Berlin"},
+                "http_headers": {"user_agent": uas[i % len(uas)],
+                                 "user_agent_parsed": {"browser": "chrome", "os": "windows", "is_mobile": False}},
+                "bot_detection": {"is_bot_likely": i % 10 == 0, "bot_patterns_matched": []},
+            },
+            "client_signals": payload,
+            "signal_summary": {"unique_identifiers": {"canvas_fingerprint": f"{i % 500:064x}"}},
+        }
+
+
+def main(count: int = 50_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ("parquet", "arrow"):
+            for row_group in (1024, 8192, 32768):
+                out = os.path.join(tmp, f"signals.{fmt}")
+                pool = pa.default_memory_pool()
+                baseline = pool.max_memory()
+                start = time.perf_counter()
+                rows = export_columnar.export_records(synthetic_records(count), out, fmt, row_group)
+                elapsed = time.perf_counter() - start
+                print(f"{fmt:<8} row_group={row_group:<6} {rows / elapsed:>9,.0f} records/s  "
+                      f"arrow peak {(pool.max_memory() - baseline) / 1e6:6.1f} MB  "
+                      f"file {os.path.getsize(out) / 1e6:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Fingerprint hashing cost on large canvas payloads: the previous
+str()-and-concatenate generate_unique_identifiers versus the streaming
+canonical encoder. Reports per-call latency and peak extra memory
+(tracemalloc) for 10 KB to 1 MB canvas data URLs.
+"""
+import hashlib
+import time
+import tracemalloc
+
+import common
+from fingerprinting import signal_fingerprints
+
+
+def legacy_identifiers(ua, accept_lang, accept_enc, canvas, webgl, screen, navigator, now):
+    webgl_renderer = str(webgl)
+    screen_info = str(screen)
+    navigator_info = str(navigator)
+    combined = f"{ua}|{accept_lang}|{accept_enc}|{canvas}|{webgl_renderer}|{screen_info}|{navigator_info}"
+    return {
+        "basic_fingerprint": hashlib.md5(f"{ua}{accept_lang}".encode()).hexdigest(),
+        "canvas_fingerprint": hashlib.sha256(canvas.encode()).hexdigest() if canvas else None,
+        "webgl_fingerprint": hashlib.sha256(webgl_renderer.encode()).hexdigest(),
+        "screen_fingerprint": hashlib.sha256(screen_info.encode()).hexdigest(),
+        "combined_fingerprint": hashlib.sha256(combined.encode()).hexdigest(),
+        "session_id": hashlib.sha256(f"{combined}{now}".encode()).hexdigest()[:32],
+    }
+
+
+def peak_bytes(fn, args) -> int:
+    tracemalloc.start()
+    fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main(calls: int = 200) -> None:
+    for canvas_kb in (10, 100, 1024):
+        payload = common.client_payload(canvas_kb=canvas_kb)
+        args = (common.BROWSER_UAS[0].format(v=124, m=0), "en-US,en;q=0.9", "gzip, deflate, br",
+                payload["canvasFingerprintDataURL"], payload["webglRenderer"], payload["screen"],
+                payload["navigator"], time.time())
+        print(f"-- canvas {canvas_kb} KB")
+        for label, fn in (("legacy str() + concatenation", legacy_identifiers),
+                          ("streaming canonical encoder", signal_fingerprints)):
+            result = common.bench(label, lambda: [fn(*args) for _ in range(calls)])
+            print(f"{'':<48} {result['best_s'] / calls * 1e6:9.2f}us/call  "
+                  f"peak {peak_bytes(fn, args) / 1024:8.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Hot-reload and memory benchmark for the GeoIP database.
+
+1. Lookup threads hammer get_ip_geolocation while the database file is
+   atomically replaced and reloaded; reports swap latency and confirms no
+   lookup failed during the swaps.
+2. Several worker processes open the same database in MODE_MEMORY and in
+   mmap mode; reports per-worker RSS and PSS (PSS divides shared page-cache
+   pages between the processes that map them). Linux only.
+"""
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+import common
+import geoip2.database
+import geolocation
+import maxminddb
+from stub_mmdb import build_mmdb, stub_networks
+
+# Importing common is what makes geolocation importable from the benchmarks directory
+assert common.BACKEND_DIR in sys.path
+
+
+def reload_under_load(directory: str, networks, swaps: int = 20, threads: int = 4) -> None:
+    live = os.path.join(directory, "GeoLite2-City.mmdb")
+    staged = [build_mmdb(os.path.join(directory, f"build-{i}.mmdb"), networks, build_epoch=1000 + i)[0]
+              for i in range(2)]
+    os.replace(build_mmdb(os.path.join(directory, "tmp.mmdb"), networks, build_epoch=999)[0], live)
+    geolocation.load_database(live)
+
+    ips = [str(net.network_address + 1) for net in networks]
+    stop = threading.Event()
+    counts = {"lookups": 0, "errors": 0}
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        lookups = errors = 0
+        while not stop.is_set():
+            if "error" in geolocation.get_ip_geolocation(rng.choice(ips)):
+                errors += 1
+            lookups += 1
+        counts["lookups"] += lookups
+        counts["errors"] += errors
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    start = time.perf_counter()
+    swap_ms = []
+    for i in range(swaps):
+        time.sleep(0.05)
+        copy = os.path.join(directory, "incoming.mmdb")
+        with open(staged[i % 2], "rb") as src, open(copy, "wb") as dst:
+            dst.write(src.read())
+        os.replace(copy, live)
+        geolocation.reload_if_changed()
+        swap_ms.append(geolocation.reload_stats["last_swap_ms"])
+    stop.set()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    print(f"swaps={swaps} lookups={counts['lookups']} errors={counts['errors']} "
+          f"throughput={counts['lookups'] / elapsed:,.0f}/s")
+    print(f"swap latency ms: median {statistics.median(swap_ms):.2f}  max {max(swap_ms):.2f}")
+
+
+def _worker_memory(path: str, mode: int, ips, ready, results) -> None:
+    reader = geoip2.database.Reader(path, mode=mode)
+    for ip in ips:
+        reader.city(ip)
+    ready.wait()
+    results.put(geolocation.process_memory())
+    ready.wait()
+
+
+def memory_per_worker(path: str, networks, workers: int = 4) -> None:
+    ips = [str(net.network_address + 1) for net in networks]
+    ctx = multiprocessing.get_context("fork")
+    modes = {"MODE_MEMORY": maxminddb.MODE_MEMORY, "MODE_MMAP": maxminddb.MODE_MMAP_EXT}
+    print(f"database size {os.path.getsize(path) / 1e6:.1f} MB, {workers} workers")
+    for label, mode in modes.items():
+        ready, results = ctx.Barrier(workers + 1), ctx.Queue()
+        procs = [ctx.Process(target=_worker_memory, args=(path, mode, ips, ready, results)) for _ in range(workers)]
+        for p in procs:
+            p.start()
+        ready.wait()
+        memory = [results.get() for _ in procs]
+        ready.wait()
+        for p in procs:
+            p.join()
+        if memory[0]["pss"] is None:
+            print("  /proc/self/smaps_rollup not available; skipping memory measurement")
+            return
+        rss = statistics.mean(m["rss"] for m in memory) / 1e6
+        pss = statistics.mean(m["pss"] for m in memory) / 1e6
+        print(f"  {label:<12} mean RSS {rss:7.1f} MB  mean PSS {pss:7.1f} MB")
+
+
+def main() -> None:
+    networks = stub_networks(count=50_000)
+    with tempfile.TemporaryDirectory() as tmp:
+        reload_under_load(tmp, networks)
+        memory_per_worker(os.path.join(tmp, "GeoLite2-City.mmdb"), networks)
+
+
+if __name__ == "__main__":
+    main()
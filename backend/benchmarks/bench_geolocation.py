@@ -0,0 +1,54 @@
+"""
+Replay a realistic client IP distribution through get_ip_geolocation with the
+network-prefix cache disabled and enabled, against a stub GeoLite2 database.
+
+Traffic is Zipf-distributed over the stub networks (a few networks send most
+requests, as with ISP/carrier NAT pools), with random hosts inside each
+network and a slice of addresses the database does not cover.
+"""
+import ipaddress
+import os
+import random
+import tempfile
+
+import common
+import geolocation
+from stub_mmdb import build_mmdb
+
+
+def ip_stream(networks, size: int, unknown_ratio: float = 0.05, seed: int = 7):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(networks))]
+    chosen = rng.choices(networks, weights=weights, k=size)
+    stream = []
+    for network in chosen:
+        if rng.random() < unknown_ratio:
+            # 9.0.0.0/8 is not in the stub database
+            stream.append(f"9.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}")
+        else:
+            host = rng.randint(1, network.num_addresses - 2)
+            stream.append(str(ipaddress.ip_address(int(network.network_address) + host)))
+    return stream
+
+
+def main(size: int = 100_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path, networks = build_mmdb(os.path.join(tmp, "GeoLite2-City.mmdb"))
+        geolocation.load_database(path)
+        stream = ip_stream(networks, size)
+
+        geolocation.geo_cache = geolocation.NetworkCache("geoip_uncached", 0)
+        uncached = common.bench("get_ip_geolocation (cache disabled)",
+                                lambda: [geolocation.get_ip_geolocation(ip) for ip in stream], repeat=3)
+
+        geolocation.geo_cache = geolocation.NetworkCache("geoip", geolocation.GEOIP_CACHE_SIZE)
+        cached = common.bench("get_ip_geolocation (network cache)",
+                              lambda: [geolocation.get_ip_geolocation(ip) for ip in stream], repeat=3)
+
+        for result in (uncached, cached):
+            print(f"{result['label']:<48} {result['best_s'] / size * 1e6:7.2f}us/lookup")
+        print(geolocation.geo_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Header extraction cost: the previous per-field request.headers.get() block
+plus the dict(request.headers) rebuild, versus header_extraction's single
+pass over the raw ASGI header list. Uses realistic requests with 20-60
+headers and checks both paths produce identical output.
+"""
+import random
+
+import common
+from header_extraction import extract_headers
+from starlette.datastructures import Headers
+
+BROWSER_HEADERS = [
+    ("host", "collector.example.com"), ("connection", "keep-alive"), ("content-length", "48213"),
+    ("sec-ch-ua", '"Chromium";v="124", "Google Chrome";v="124", "Not-A.Brand";v="99"'),
+    ("sec-ch-ua-mobile", "?0"), ("sec-ch-ua-platform", '"Windows"'), ("user-agent", common.BROWSER_UAS[0].format(v=124, m=0)),
+    ("content-type", "application/json"), ("accept", "*/*"), ("origin", "https://app.example.com"),
+    ("sec-fetch-site", "same-site"), ("sec-fetch-mode", "cors"), ("sec-fetch-dest", "empty"),
+    ("referer", "https://app.example.com/"), ("accept-encoding", "gzip, deflate, br, zstd"),
+    ("accept-language", "en-US,en;q=0.9,de;q=0.8"), ("priority", "u=1, i"),
+    ("x-forwarded-for", "203.0.113.7, 10.0.0.2"), ("x-forwarded-proto", "https"), ("x-real-ip", "203.0.113.7"),
+    ("cookie", "session=" + "a" * 120), ("dnt", "1"), ("sec-gpc", "1"), ("cache-control", "no-cache"),
+    ("pragma", "no-cache"), ("sec-ch-ua-arch", '"x86"'), ("sec-ch-ua-bitness", '"64"'),
+    ("sec-ch-ua-full-version-list", '"Chromium";v="124.0.6367.91"'), ("sec-ch-ua-model", '""'),
+    ("sec-ch-ua-platform-version", '"15.0.0"'), ("device-memory", "8"), ("downlink", "10"), ("ect", "4g"),
+    ("rtt", "50"), ("viewport-width", "1920"), ("dpr", "1.25"), ("cf-connecting-ip", "203.0.113.7"),
+    ("cf-ipcountry", "DE"), ("cf-ray", "8a1b2c3d4e5f6789-FRA"), ("cf-visitor", '{"scheme":"https"}'),
+    ("x-request-id", "4f1c2d3e-aaaa-bbbb-cccc-1234567890ab"), ("x-amzn-trace-id", "Root=1-abc-def"),
+    ("traceparent", "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"), ("via", "1.1 varnish"),
+    ("x-forwarded-host", "collector.example.com"), ("x-forwarded-port", "443"), ("true-client-ip", "203.0.113.7"),
+    ("sec-ch-prefers-color-scheme", "dark"), ("sec-ch-prefers-reduced-motion", "no-preference"),
+    ("save-data", "off"), ("width", "1920"), ("upgrade-insecure-requests", "1"), ("te", "trailers"),
+    ("x-custom-a", "1"), ("x-custom-b", "2"), ("x-custom-c", "3"), ("x-custom-d", "4"), ("x-custom-e", "5"),
+    ("x-custom-f", "6"), ("x-custom-g", "7"),
+]
+
+
+def header_sets(count: int, seed: int = 5):
+    rng = random.Random(seed)
+    sets = []
+    for _ in range(count):
+        size = rng.randint(20, 60)
+        chosen = BROWSER_HEADERS[:size]
+        sets.append([(k.encode("latin-1"), v.encode("latin-1")) for k, v in chosen])
+    return sets
+
+
+def legacy_extract(raw):
+    headers = Headers(raw=raw)
+    return {
+        "header_count": len(headers),
+        "total_header_size": sum(len(k) + len(v) for k, v in headers.items()),
+        "is_ajax": headers.get("x-requested-with", "").lower() == "xmlhttprequest",
+        "is_prefetch": headers.get("x-moz") == "prefetch" or headers.get("x-purpose") == "preview",
+        "http_headers": {
+            "user_agent": headers.get("user-agent"),
+            "accept": headers.get("accept"),
+            "accept_language": headers.get("accept-language"),
+            "accept_encoding": headers.get("accept-encoding"),
+            "referer": headers.get("referer"),
+            "cookie": headers.get("cookie"),
+            "host": headers.get("host"),
+            "origin": headers.get("origin"),
+            "connection": headers.get("connection"),
+            "content_type": headers.get("content-type"),
+            "content_length": headers.get("content-length"),
+            "cache_control": headers.get("cache-control"),
+            "pragma": headers.get("pragma"),
+            "dnt": headers.get("dnt"),
+            "upgrade_insecure_requests": headers.get("upgrade-insecure-requests"),
+            "if_modified_since": headers.get("if-modified-since"),
+            "if_none_match": headers.get("if-none-match"),
+            "if_match": headers.get("if-match"),
+            "if_unmodified_since": headers.get("if-unmodified-since"),
+            "if_range": headers.get("if-range"),
+            "range": headers.get("range"),
+            "sec_fetch_dest": headers.get("sec-fetch-dest"),
+            "sec_fetch_mode": headers.get("sec-fetch-mode"),
+            "sec_fetch_site": headers.get("sec-fetch-site"),
+            "sec_fetch_user": headers.get("sec-fetch-user"),
+            "sec_gpc": headers.get("sec-gpc"),
+            "sec_ch_ua": headers.get("sec-ch-ua"),
+            "sec_ch_ua_mobile": headers.get("sec-ch-ua-mobile"),
+            "sec_ch_ua_platform": headers.get("sec-ch-ua-platform"),
+            "sec_ch_ua_arch": headers.get("sec-ch-ua-arch"),
+            "sec_ch_ua_bitness": headers.get("sec-ch-ua-bitness"),
+            "sec_ch_ua_full_version": headers.get("sec-ch-ua-full-version"),
+            "sec_ch_ua_full_version_list": headers.get("sec-ch-ua-full-version-list"),
+            "sec_ch_ua_model": headers.get("sec-ch-ua-model"),
+            "sec_ch_ua_platform_version": headers.get("sec-ch-ua-platform-version"),
+            "sec_ch_ua_wow64": headers.get("sec-ch-ua-wow64"),
+            "save_data": headers.get("save-data"),
+            "device_memory": headers.get("device-memory"),
+            "downlink": headers.get("downlink"),
+            "ect": headers.get("ect"),
+            "rtt": headers.get("rtt"),
+            "viewport_width": headers.get("viewport-width"),
+            "width": headers.get("width"),
+            "dpr": headers.get("dpr"),
+            "sec_ch_prefers_color_scheme": headers.get("sec-ch-prefers-color-scheme"),
+            "sec_ch_prefers_reduced_motion": headers.get("sec-ch-prefers-reduced-motion"),
+            "sec_ch_prefers_reduced_transparency": headers.get("sec-ch-prefers-reduced-transparency"),
+            "authorization": headers.get("authorization"),
+            "proxy_authorization": headers.get("proxy-authorization"),
+            "x_forwarded_for": headers.get("x-forwarded-for"),
+            "x_forwarded_host": headers.get("x-forwarded-host"),
+            "x_forwarded_proto": headers.get("x-forwarded-proto"),
+            "x_forwarded_port": headers.get("x-forwarded-port"),
+            "x_real_ip": headers.get("x-real-ip"),
+            "x_client_ip": headers.get("x-client-ip"),
+            "x_cluster_client_ip": headers.get("x-cluster-client-ip"),
+            "forwarded": headers.get("forwarded"),
+            "via": headers.get("via"),
+            "cf_connecting_ip": headers.get("cf-connecting-ip"),
+            "cf_ipcountry": headers.get("cf-ipcountry"),
+            "cf_ray": headers.get("cf-ray"),
+            "cf_visitor": headers.get("cf-visitor"),
+            "true_client_ip": headers.get("true-client-ip"),
+            "fastly_client_ip": headers.get("fastly-client-ip"),
+            "x_azure_clientip": headers.get("x-azure-clientip"),
+            "x_azure_socketip": headers.get("x-azure-socketip"),
+            "x_requested_with": headers.get("x-requested-with"),
+            "x_moz": headers.get("x-moz"),
+            "x_purpose": headers.get("x-purpose"),
+            "from": headers.get("from"),
+            "max_forwards": headers.get("max-forwards"),
+            "te": headers.get("te"),
+            "trailer": headers.get("trailer"),
+            "transfer_encoding": headers.get("transfer-encoding"),
+            "expect": headers.get("expect"),
+        },
+        "all_headers_raw": dict(headers),
+    }
+
+
+def single_pass_extract(raw):
+    headers = extract_headers(raw)
+    return {
+        "header_count": headers.count,
+        "total_header_size": headers.total_size,
+        "is_ajax": (headers.fields["x_requested_with"] or "").lower() == "xmlhttprequest",
+        "is_prefetch": headers.fields["x_moz"] == "prefetch" or headers.fields["x_purpose"] == "preview",
+        "http_headers": headers.fields,
+        "all_headers_raw": headers.raw,
+    }
+
+
+def main(requests: int = 20_000) -> None:
+    sets = header_sets(requests)
+    mismatches = sum(1 for raw in sets[:2000] if legacy_extract(raw) != single_pass_extract(raw))
+    print(f"{requests} requests with 20-60 headers, mismatches={mismatches}")
+    legacy = common.bench("legacy request.headers.get x75 + dict()", lambda: [legacy_extract(r) for r in sets])
+    single = common.bench("single-pass extract_headers", lambda: [single_pass_extract(r) for r in sets])
+    for result in (legacy, single):
+        print(f"{result['label']:<48} {result['best_s'] / requests * 1e6:7.2f}us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Handler-side cost of logging one collection record: the old synchronous
+print + json.dumps(indent=2) dump versus LogSink.emit(), plus the background
+writer's drain throughput. Output goes to /dev/null in both cases.
+"""
+import contextlib
+import json
+import os
+import time
+
+import common
+from log_sink import LogSink, StreamWriter
+
+
+def sample_record() -> dict:
+    payload = common.client_payload()
+    return {
+        "event": "signal_collection",
+        "client_ip": "203.0.113.7",
+        "data": {"server_signals": {"all_headers_raw": {f"x-header-{i}": "v" * 40 for i in range(30)}},
+                 "client_signals": payload},
+    }
+
+
+def main(records: int = 2_000) -> None:
+    record = sample_record()
+    with open(os.devnull, "w") as devnull:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(devnull):
+            for _ in range(records):
+                print("=" * 100)
+                print(json.dumps(record, indent=2, default=str))
+        legacy_s = time.perf_counter() - start
+    print(f"{'legacy print(json.dumps(indent=2))':<48} {legacy_s / records * 1e6:9.1f}us/record (blocking)")
+
+    for policy in ("drop_newest", "block"):
+        with open(os.devnull, "wb") as devnull:
+            sink = LogSink(writer=StreamWriter(devnull), maxsize=records, policy=policy)
+            sink.start()
+            start = time.perf_counter()
+            for _ in range(records):
+                sink.emit(record)
+            emit_s = time.perf_counter() - start
+            sink.close()
+            total_s = time.perf_counter() - start
+        stats = sink.stats()
+        print(f"{'LogSink.emit (' + policy + ')':<48} {emit_s / records * 1e6:9.1f}us/record in handler, "
+              f"drained {stats['written']} in {total_s * 1000:.0f}ms ({stats['encoder']}), dropped {stats['dropped']}")
+
+
+if __name__ == "__main__":
+    main()
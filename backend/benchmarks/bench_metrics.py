@@ -0,0 +1,72 @@
+"""
+Cost of the stage instrumentation: Histogram.observe / StageClock.lap on
+their own, the full per-record pipeline (server signals, record_collection,
+response rendering) with STAGE_TIMING on and off, and rendering /metrics.
+The pipeline leaves out routing and body validation, so the relative
+overhead printed is an upper bound for a real request.
+"""
+import asyncio
+import gc
+import os
+import time
+
+os.environ.setdefault("SIGNAL_STORE", "none")
+os.environ.setdefault("LOG_SINK", "none")
+os.environ.setdefault("CANVAS_STORE", "memory")
+
+import common
+import main
+import metrics
+from starlette.requests import Request
+
+
+def set_timing(enabled: bool) -> None:
+    metrics.STAGE_TIMING = enabled
+    main.server_signal_registry.timing = enabled
+
+
+async def collect(client_signals, scopes) -> None:
+    for scope in scopes:
+        start = time.perf_counter()
+        server_signals = main.build_server_signals(Request(scope))
+        data = await main.record_collection(time.time(), server_signals, client_signals)
+        main.timed_json_response(main.shape_collect_response("minimal", data), start, "collect")
+
+
+def pipeline(client_signals, scopes) -> None:
+    asyncio.run(collect(client_signals, scopes))
+
+
+def main_bench(requests: int = 500, rounds: int = 20, operations: int = 1_000_000) -> None:
+    histogram = metrics.Histogram()
+    clock = metrics.StageClock()
+    observe = common.bench("Histogram.observe", lambda: [histogram.observe(0.0003) for _ in range(operations)])
+    lap = common.bench("StageClock.lap", lambda: [clock.lap("bench") for _ in range(operations)])
+    for result in (observe, lap):
+        print(f"{'':<48} {result['best_s'] / operations * 1e9:7.1f}ns/call")
+
+    client_signals = main.CollectedSignals(**common.client_payload(canvas_kb=8))
+    scopes = [common.collect_scope() for _ in range(requests)]
+    # Alternate off/on rounds and keep the best of each, so drift and GC pauses hit both alike
+    timings = {False: float("inf"), True: float("inf")}
+    for _ in range(rounds):
+        for enabled in (False, True):
+            set_timing(enabled)
+            gc.collect()
+            start = time.perf_counter()
+            pipeline(client_signals, scopes)
+            timings[enabled] = min(timings[enabled], (time.perf_counter() - start) / requests)
+    set_timing(True)
+    before = sum(histogram.count for histogram in metrics.STAGES.values())
+    pipeline(client_signals, scopes)
+    laps = (sum(histogram.count for histogram in metrics.STAGES.values()) - before) / requests
+    print(f"{laps:.0f} stage observations per request, ~{laps * lap['best_s'] / operations * 1e6:.1f}us at the lap cost above")
+    overhead = timings[True] - timings[False]
+    print(f"per request: off {timings[False] * 1e6:.1f}us, on {timings[True] * 1e6:.1f}us, "
+          f"overhead {overhead * 1e6:.2f}us ({overhead / timings[False] * 100:.2f}%)")
+    print(f"{len(metrics.STAGES)} stages observed")
+    common.bench("render /metrics", lambda: main.metrics(), repeat=20)
+
+
+if __name__ == "__main__":
+    main_bench()
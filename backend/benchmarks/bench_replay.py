@@ -0,0 +1,59 @@
+"""
+Offline replay throughput (replay.py): records/s over a generated capture
+of stored /collect records, inline and with worker pools of increasing
+size, plus the replaying process's peak RSS (which stays flat however
+large the capture is, since input is streamed in bounded chunks).
+
+    python benchmarks/bench_replay.py [records]
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SIGNAL_STORE", "none")
+os.environ.setdefault("LOG_SINK", "none")
+
+import common
+import loadtest
+import replay
+from log_sink import encode_record
+from request_signals import build_server_signals
+from starlette.requests import Request
+
+
+def write_capture(path: str, records: int) -> None:
+    import gzip
+    import ipaddress
+
+    networks = [ipaddress.ip_network(f"{octet}.0.0.0/16") for octet in range(11, 40)]
+    client = common.client_payload(canvas_kb=4, fonts=60, plugins=5)
+    with gzip.open(path, "wb") as f:
+        for headers, _ in loadtest.build_workload(networks, records, seed=23):
+            server_signals = build_server_signals(Request(loadtest.request_scope(headers)))
+            f.write(encode_record({"server_signals": server_signals, "client_signals": client}) + b"\n")
+
+
+def main_bench(records: int = 20_000) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        capture = os.path.join(tmp, "capture.jsonl.gz")
+        # Written by a child process, so this process's peak RSS is the replay's own
+        writer = multiprocessing.Process(target=write_capture, args=(capture, records))
+        writer.start()
+        writer.join()
+        print(f"{os.cpu_count()} CPUs, {records:,} records, {os.path.getsize(capture) / 1024 / 1024:.1f} MB gzipped")
+        cpus = os.cpu_count() or 1
+        for workers in sorted({1, 2, *(2 ** power for power in range(1, 8) if 2 ** power < cpus), cpus}):
+            start = time.perf_counter()
+            totals = replay.replay(replay.iter_lines([capture]), os.path.join(tmp, "out.jsonl.gz"), workers=workers)
+            elapsed = time.perf_counter() - start
+            assert totals["records"] == records and not totals["errors"], totals
+            print(f"{'inline' if workers == 1 else f'{workers} workers':<12} {records / elapsed:9,.0f} records/s  "
+                  f"{totals['changed']} changed  peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_bench(*(int(arg) for arg in sys.argv[1:2])))
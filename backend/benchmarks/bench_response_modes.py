@@ -0,0 +1,35 @@
+"""
+Response size and latency of POST /collect for each response mode
+(?response=minimal|summary|full), driven in-process through the ASGI app.
+"""
+import os
+import statistics
+import time
+
+os.environ.setdefault("SIGNAL_STORE", "none")
+os.environ.setdefault("LOG_SINK", "none")
+
+import common
+from fastapi.testclient import TestClient
+import main
+
+
+def main_bench(requests: int = 300, canvas_kb: int = 40) -> None:
+    client = TestClient(main.app)
+    payload = common.client_payload(canvas_kb=canvas_kb)
+    headers = {"user-agent": common.ua_corpus(1)[0], "accept-language": "en-US,en;q=0.9"}
+    print(f"payload canvas {canvas_kb} KB, {requests} requests per mode")
+    for mode in main.RESPONSE_MODES:
+        timings = []
+        size = 0
+        for _ in range(requests):
+            start = time.perf_counter()
+            response = client.post(f"/collect?response={mode}", json=payload, headers=headers)
+            timings.append(time.perf_counter() - start)
+            size = len(response.content)
+        print(f"{mode:<8} {size / 1024:8.1f} KB/response  median {statistics.median(timings) * 1e3:6.2f}ms  "
+              f"p95 {sorted(timings)[int(len(timings) * 0.95)] * 1e3:6.2f}ms")
+
+
+if __name__ == "__main__":
+    main_bench()
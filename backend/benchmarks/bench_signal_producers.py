@@ -0,0 +1,39 @@
+"""
+Server signal cost by selection: every producer, the always-on core
+(client_ip, http_headers) and a typical subset, with and without per-producer
+timing. Each iteration builds a fresh Request, as the ASGI app would.
+"""
+import os
+
+os.environ.setdefault("SIGNAL_STORE", "none")
+os.environ.setdefault("LOG_SINK", "none")
+
+import common
+from request_signals import build_server_signals, parse_signal_selection, server_signal_registry
+from starlette.requests import Request
+
+SELECTIONS = [
+    ("all", "all"),
+    ("core only", "client_ip"),
+    ("core + geolocation,bot_detection", "geolocation,bot_detection"),
+]
+
+
+def main(requests: int = 5_000) -> None:
+    scopes = [common.collect_scope() for _ in range(requests)]
+    for timing in (True, False):
+        server_signal_registry.timing = timing
+        print(f"-- per-producer timing {'on' if timing else 'off'}")
+        for label, spec in SELECTIONS:
+            selection = parse_signal_selection(spec)
+            result = common.bench(label, lambda: [build_server_signals(Request(scope), selection) for scope in scopes])
+            print(f"{'':<48} {result['best_s'] / requests * 1e6:7.1f}us/request")
+
+    print("-- slowest producers (mean us)")
+    producers = server_signal_registry.stats()["producers"]
+    for name, entry in sorted(producers.items(), key=lambda item: -(item[1]["mean_us"] or 0))[:8]:
+        print(f"{name:<28} {entry['mean_us']:7.2f}")
+
+
+if __name__ == "__main__":
+    main()
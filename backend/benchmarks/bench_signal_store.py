@@ -0,0 +1,47 @@
+"""
+Signal store throughput (records/second) across backends, batch sizes and
+fsync policies. Records are encoded once up front so the numbers isolate the
+segment writers; rotation is exercised with a small segment size.
+"""
+import tempfile
+import time
+
+import common
+from log_sink import encode_record
+from signal_store import JsonlSegmentWriter, SqliteSegmentWriter, iter_records, list_segments
+
+BATCH_SIZES = (1, 16, 64, 256, 1024)
+
+
+def sample_line() -> bytes:
+    payload = common.client_payload(canvas_kb=8)
+    return encode_record({"server_signals": {"client_ip": "203.0.113.7"}, "client_signals": payload})
+
+
+def run(writer_cls, batch_size: int, fsync: str, records: int, line: bytes) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = writer_cls(tmp, segment_bytes=16 * 1024 * 1024, segment_records=10_000,
+                            max_segments=50, fsync=fsync, fsync_interval=0.5)
+        batch = [line] * batch_size
+        start = time.perf_counter()
+        for _ in range(records // batch_size):
+            writer.write_batch(batch)
+        writer.close()
+        elapsed = time.perf_counter() - start
+        assert sum(1 for _ in iter_records(tmp)) == (records // batch_size) * batch_size
+        assert list_segments(tmp)
+    return (records // batch_size) * batch_size / elapsed
+
+
+def main(records: int = 4_096) -> None:
+    line = sample_line()
+    print(f"record size {len(line) / 1024:.1f} KB, {records} records per run")
+    print(f"{'backend':<10}{'fsync':<10}" + "".join(f"{'batch ' + str(b):>13}" for b in BATCH_SIZES))
+    for writer_cls, label in ((JsonlSegmentWriter, "jsonl.gz"), (SqliteSegmentWriter, "sqlite")):
+        for fsync in ("never", "interval", "always"):
+            rates = [run(writer_cls, b, fsync, records, line) for b in BATCH_SIZES]
+            print(f"{label:<10}{fsync:<10}" + "".join(f"{rate:>11,.0f}/s" for rate in rates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Signal summary cost: the previous record_collection accounting (three
+client_signals.dict() calls, recursive count_non_null_values over the whole
+records, then again per category and inside calculate_completeness) versus
+signal_summary.summarize_signals over one model_dump(). Payloads carry large
+fileUploads / mimeTypes / plugins arrays; outputs are checked for equality.
+"""
+import os
+import sys
+import warnings
+
+os.environ.setdefault("SIGNAL_STORE", "none")
+os.environ.setdefault("LOG_SINK", "none")
+
+import common
+import main
+from signal_summary import count_non_null_values, summarize_signals
+from starlette.requests import Request
+
+
+def legacy_count(data):
+    if isinstance(data, dict):
+        count = 0
+        for value in data.values():
+            if value is not None:
+                if isinstance(value, (dict, list)):
+                    count += legacy_count(value)
+                else:
+                    count += 1
+        return count
+    elif isinstance(data, list):
+        return sum(1 for item in data if item is not None)
+    else:
+        return 1 if data is not None else 0
+
+
+def legacy_completeness(client_signals):
+    completeness = {}
+    for category in ("navigator", "screen", "performance", "interaction", "capabilities", "storage"):
+        data = client_signals.get(category, {})
+        if data:
+            total_possible = len(data) if isinstance(data, dict) else 1
+            completeness[category] = (legacy_count(data) / total_possible) * 100 if total_possible > 0 else 0
+    return completeness
+
+
+def legacy_summary(server_signals, client_signals):
+    client_signals.dict()
+    totals = (legacy_count(server_signals), legacy_count(client_signals.dict()),
+              legacy_completeness(client_signals.dict()))
+    categories = {
+        "Network/HTTP": len(server_signals.get("http_headers", {})),
+        "Geolocation": legacy_count(server_signals["geolocation"]),
+        "Navigator/Device": legacy_count(client_signals.navigator),
+        "Screen/Viewport": legacy_count(client_signals.screen),
+        "Performance": legacy_count(client_signals.performance),
+        "Graphics/Fingerprinting": sum([
+            1 if client_signals.canvasFingerprintDataURL else 0,
+            legacy_count(client_signals.webglRenderer),
+            len(client_signals.installedFontsDetection or []),
+        ]),
+        "Interaction/Behavior": legacy_count(client_signals.interaction),
+        "Capabilities": legacy_count(client_signals.capabilities),
+        "Storage": legacy_count(client_signals.storage),
+        "Device Motion": legacy_count(client_signals.deviceMotion),
+    }
+    return totals + (categories,)
+
+
+def new_summary(server_signals, client_signals):
+    return tuple(summarize_signals(server_signals, client_signals.model_dump()))
+
+
+def payload(items: int):
+    body = common.client_payload(canvas_kb=4, fonts=items, plugins=items)
+    body["fileUploads"] = [{"name": f"file{i}.bin", "size": i * 17, "type": "application/octet-stream",
+                            "lastModified": 1700000000000 + i} for i in range(items)]
+    body["osHints"] = {"nested": {"level": {f"k{i}": {"v": i, "w": None} for i in range(items // 10)}}}
+    return main.CollectedSignals(**body)
+
+
+def main_bench(calls: int = 200) -> int:
+    # The legacy path deliberately uses the deprecated .dict()
+    warnings.simplefilter("ignore", DeprecationWarning)
+    server_signals = main.build_server_signals(Request(common.collect_scope()))
+    for items in (10, 1_000, 10_000):
+        client_signals = payload(items)
+        if legacy_summary(server_signals, client_signals) != new_summary(server_signals, client_signals):
+            print(f"MISMATCH at {items} items")
+            return 1
+        print(f"-- {items} items per array")
+        for label, fn in (("legacy: 3x dict() + repeated recursive counts", legacy_summary),
+                          ("summarize_signals over one model_dump()", new_summary)):
+            result = common.bench(label, lambda: [fn(server_signals, client_signals) for _ in range(calls)])
+            print(f"{'':<48} {result['best_s'] / calls * 1e6:9.1f}us/record")
+
+    deep = {}
+    for _ in range(100_000):
+        deep = {"child": deep, "leaf": 1}
+    try:
+        legacy_count(deep)
+        legacy = "ok"
+    except RecursionError:
+        legacy = "RecursionError"
+    print(f"100k-deep payload: legacy {legacy}, iterative counted {count_non_null_values(deep)} leaves")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_bench())
@@ -0,0 +1,24 @@
+"""
+Measure parse_user_agent with the LRU cache disabled vs. enabled over a
+request stream where a small set of distinct user agents repeats.
+"""
+import common
+from caching import LRUCache
+import user_agent
+
+
+def main(requests: int = 100_000, distinct: int = 500) -> None:
+    stream = [ua for ua in common.ua_corpus(distinct)] * (requests // distinct)
+
+    user_agent.ua_cache = LRUCache("user_agent_uncached", 0)
+    common.bench("parse_user_agent (cache disabled)",
+                 lambda: [user_agent.parse_user_agent(ua) for ua in stream])
+
+    user_agent.ua_cache = LRUCache("user_agent", user_agent.UA_CACHE_SIZE)
+    common.bench("parse_user_agent (LRU cache)",
+                 lambda: [user_agent.parse_user_agent(ua) for ua in stream])
+    print(user_agent.ua_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Throughput versus worker count for the pre-forking launcher (serve.py):
+POST /collect over HTTP from several client processes, with 1, 2, 4 ...
+workers up to the CPU count, with and without shared UA/GeoIP caches.
+Also reports each worker's RSS and PSS; PSS splits pages shared with the
+supervisor and siblings, so the RSS-PSS gap is what preloading saves.
+Geolocation runs against a stub GeoLite2 database.
+
+    python benchmarks/bench_workers.py [max_workers]
+"""
+import asyncio
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import common
+import loadtest
+from stub_mmdb import build_mmdb
+
+CLIENT_CONCURRENCY = 16
+
+
+def client_process(port: int, workload, results) -> None:
+    import httpx
+
+    async def run():
+        limits = httpx.Limits(max_connections=CLIENT_CONCURRENCY)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            return await loadtest.drive(client, workload, CLIENT_CONCURRENCY)
+
+    results.put(asyncio.run(run()))
+
+
+def worker_memory(supervisor: int) -> List[Dict[str, int]]:
+    memory = []
+    with open(f"/proc/{supervisor}/task/{supervisor}/children") as f:
+        children = [int(pid) for pid in f.read().split()]
+    for pid in children:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            fields = {line.split(":")[0]: int(line.split()[1]) for line in f if line.endswith("kB\n")}
+        memory.append({"rss": fields["Rss"] * 1024, "pss": fields["Pss"] * 1024})
+    return memory
+
+
+def run(workers: int, shared: bool, env: Dict[str, str], workload, clients: int) -> None:
+    port = loadtest.free_port()
+    command = [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port), "--host", "127.0.0.1"]
+    if shared:
+        command += ["--shared-caches", "user_agent,geoip"]
+    server = subprocess.Popen(command, cwd=common.BACKEND_DIR, env={**os.environ, **env}, stdout=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 30
+        while subprocess.run(["curl", "-sf", f"http://127.0.0.1:{port}/"], capture_output=True).returncode:
+            if server.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError("serve.py did not start")
+            time.sleep(0.2)
+
+        results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=client_process, args=(port, workload[index::clients], results))
+                     for index in range(clients)]
+        start = time.perf_counter()
+        for process in processes:
+            process.start()
+        outcomes = [results.get() for _ in processes]
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+        memory = worker_memory(server.pid)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    requests = sum(outcome["requests"] for outcome in outcomes)
+    errors = sum(outcome["errors"] for outcome in outcomes)
+    p99 = max(outcome["p99_ms"] for outcome in outcomes)
+    rss = sum(entry["rss"] for entry in memory) / len(memory) / 1024 / 1024
+    pss = sum(entry["pss"] for entry in memory) / len(memory) / 1024 / 1024
+    print(f"{workers:>2} workers{' + shared caches' if shared else '':<16} {requests / elapsed:8.1f} req/s  "
+          f"p99 {p99:7.1f}ms  per worker: RSS {rss:6.1f} MB  PSS {pss:6.1f} MB"
+          + (f"  {errors} errors" if errors else ""))
+
+
+def main_bench(max_workers: int = os.cpu_count() or 1, requests: int = 3000) -> None:
+    levels = sorted({1, *(2 ** power for power in range(1, 8) if 2 ** power < max_workers), max_workers})
+    clients = min(4, max(2, max_workers))
+    print(f"{os.cpu_count()} CPUs, {clients} client processes x {CLIENT_CONCURRENCY} connections, {requests} requests")
+    with tempfile.TemporaryDirectory() as tmp:
+        mmdb_path, networks = build_mmdb(os.path.join(tmp, "GeoLite2-City.mmdb"))
+        env = {**loadtest.SERVER_ENV, "GEOIP_DB_PATH": mmdb_path}
+        workload = loadtest.build_workload(networks, requests, seed=2024)
+        for workers in levels:
+            for shared in (False, True):
+                run(workers, shared, env, workload, clients)
+
+
+if __name__ == "__main__":
+    main_bench(*(int(arg) for arg in sys.argv[1:2]))
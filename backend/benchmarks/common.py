@@ -0,0 +1,107 @@
+"""
+Shared helpers for the backend micro-benchmarks.
+
+Run any benchmark from the backend directory, e.g.
+    python benchmarks/bench_bot_detection.py
+"""
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+BROWSER_UAS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{v}.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{v}.0.0.0 Safari/537.36 Edg/{v}.0.0.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.{m} Safari/605.1.15",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_{m}) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{v}.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:{v}.0) Gecko/20100101 Firefox/{v}.0",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:{v}.0) Gecko/20100101 Firefox/{v}.0",
+    "Mozilla/5.0 (Linux; Android 1{m}; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{v}.0.0.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_{m} like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.{m} Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (iPad; CPU OS 16_{m} like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/16.{m} Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Windows NT 6.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/{v}.0.0.0 Safari/537.36 OPR/{m}0.0.0.0",
+]
+
+BOT_UAS = [
+    "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+    "Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)",
+    "Mozilla/5.0 (compatible; YandexBot/3.0; +http://yandex.com/bots)",
+    "facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) HeadlessChrome/{v}.0.0.0 Safari/537.36",
+    "curl/8.{m}.0",
+    "Wget/1.21.{m}",
+    "python-requests/2.3{m}.0",
+    "Java/17.0.{m}",
+    "Slackbot-LinkExpanding 1.0 (+https://api.slack.com/robots)",
+    "TelegramBot (like TwitterBot)",
+    "Mozilla/5.0 (compatible; DuckDuckBot-Https/1.1; https://duckduckgo.com/bot)",
+]
+
+
+def ua_corpus(size: int, bot_ratio: float = 0.1, seed: int = 1234) -> List[str]:
+    """Build a deterministic list of realistic browser and bot user agents."""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        templates = BOT_UAS if rng.random() < bot_ratio else BROWSER_UAS
+        corpus.append(rng.choice(templates).format(v=rng.randint(100, 141), m=rng.randint(0, 9)))
+    return corpus
+
+
+def bench(label: str, fn: Callable[[], Any], repeat: int = 5) -> Dict[str, Any]:
+    """Run fn `repeat` times and print/return the best wall-clock duration."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{label:<48} best {best * 1000:9.2f}ms  (of {repeat})")
+    return {"label": label, "best_s": best, "runs_s": timings}
+
+
+def client_payload(canvas_kb: int = 20, fonts: int = 60, plugins: int = 5, seed: int = 99) -> Dict[str, Any]:
+    """A CollectedSignals-shaped body like the one the frontend posts."""
+    rng = random.Random(seed)
+    canvas = "data:image/png;base64," + "".join(
+        rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/") for _ in range(canvas_kb * 1024))
+    return {
+        "navigator": {
+            "userAgent": BROWSER_UAS[0].format(v=124, m=0), "language": "en-US", "languages": ["en-US", "en"],
+            "platform": "Win32", "vendor": "Google Inc.", "hardwareConcurrency": 8, "deviceMemory": 8,
+            "maxTouchPoints": 0, "cookieEnabled": True, "doNotTrack": None, "onLine": True,
+            "pdfViewerEnabled": True, "webdriver": False,
+        },
+        "screen": {"width": 1920, "height": 1080, "availWidth": 1920, "availHeight": 1040, "colorDepth": 24,
+                   "pixelDepth": 24, "orientation": "landscape-primary", "devicePixelRatio": 1.25},
+        "timezone": "America/New_York",
+        "tzOffsetMin": 240,
+        "locale": "en-US",
+        "performance": {f"timing{i}": 1700000000000 + i for i in range(20)},
+        "canvasFingerprintDataURL": canvas,
+        "webglRenderer": {"vendor": "Google Inc. (NVIDIA)", "renderer": "ANGLE (NVIDIA GeForce RTX 3070)"},
+        "installedFontsDetection": [f"Font {i}" for i in range(fonts)],
+        "interaction": {"mouseMoves": 42, "clicks": 3, "keyPresses": 0, "scrollDepth": 0.4},
+        "capabilities": {f"api{i}": bool(i % 3) for i in range(30)},
+        "storage": {"localStorage": True, "sessionStorage": True, "indexedDB": True, "quota": 299977904946},
+        "mimeTypes": [{"type": f"application/x-type-{i}", "suffixes": "pdf", "description": "Portable"} for i in range(plugins)],
+        "plugins": [{"name": f"Plugin {i}", "filename": "internal-pdf-viewer", "description": "PDF"} for i in range(plugins)],
+        "historyLength": 2,
+        "documentReferrer": "",
+    }
+
+
+def collect_scope(headers: Optional[List[Tuple[bytes, bytes]]] = None) -> Dict[str, Any]:
+    """ASGI scope of a POST /collect from a public client address."""
+    return {
+        "type": "http", "method": "POST", "path": "/collect", "query_string": b"", "scheme": "https",
+        "server": ("collector.example.com", 443), "client": ("203.0.113.7", 50000),
+        "headers": headers if headers is not None else [
+            (b"host", b"collector.example.com"), (b"user-agent", ua_corpus(1)[0].encode()),
+            (b"accept-language", b"en-US,en;q=0.9"), (b"accept-encoding", b"gzip, br")],
+    }
@@ -0,0 +1,311 @@
+"""
+Reproducible benchmark suite for the /collect pipeline.
+
+Runs the per-helper micro-benchmarks (parse_user_agent, extract_client_ip,
+get_ip_geolocation, generate_unique_identifiers, build_server_signals),
+then drives POST /collect with a synthetic workload at several concurrency
+levels, in-process through an ASGI client and over HTTP against a uvicorn
+worker. Geolocation runs offline against a stub GeoLite2 database, and
+storage and logging are disabled so the numbers isolate request handling.
+
+Results are written as JSON; pass an earlier file to --compare to print
+the change of every figure and fail on regressions:
+
+    python benchmarks/loadtest.py
+    python benchmarks/loadtest.py --quick --compare benchmarks/results/collect-20261016-101500.json
+
+The workload is derived from --seed only, so two runs send identical requests.
+"""
+import argparse
+import asyncio
+import ipaddress
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import common
+from stub_mmdb import build_mmdb
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+CONCURRENCY_LEVELS = (1, 8, 32)
+# Environment shared by the in-process app and the uvicorn worker
+SERVER_ENV = {"SIGNAL_STORE": "none", "LOG_SINK": "none", "CANVAS_STORE": "memory", "GEOIP_WATCH_INTERVAL": "0"}
+
+ACCEPT_LANGUAGES = ["en-US,en;q=0.9", "de-DE,de;q=0.9,en;q=0.8", "fr-FR,fr;q=0.9", "ja,en-US;q=0.7,en;q=0.3",
+                    "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7", "en-GB"]
+ACCEPT_ENCODINGS = ["gzip, deflate, br, zstd", "gzip, deflate, br", "gzip", "identity"]
+CANVAS_KB = (1, 4, 16, 64)
+FONT_COUNTS = (0, 20, 60, 200)
+PLUGIN_COUNTS = (0, 3, 10)
+
+# Figures compared between runs and whether a larger value is better
+HIGHER_IS_BETTER = {"requests_per_s": True, "p50_ms": False, "p90_ms": False, "p99_ms": False, "ns_per_op": False}
+
+
+def client_ips(networks: List[ipaddress.IPv4Network], size: int, rng: random.Random) -> List[str]:
+    """Zipf-distributed hosts inside the stub networks, plus a slice of addresses it does not cover."""
+    weights = [1 / (rank + 1) for rank in range(len(networks))]
+    ips = []
+    for network in rng.choices(networks, weights=weights, k=size):
+        if rng.random() < 0.05:
+            ips.append(f"9.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}")
+        else:
+            host = rng.randint(1, network.num_addresses - 2)
+            ips.append(str(ipaddress.ip_address(int(network.network_address) + host)))
+    return ips
+
+
+def build_workload(networks: List[ipaddress.IPv4Network], size: int, seed: int) -> List[Tuple[Dict[str, str], bytes]]:
+    """(headers, JSON body) pairs; payloads vary canvas size, font list and plugin arrays."""
+    rng = random.Random(seed)
+    bodies = [json.dumps(common.client_payload(canvas_kb=canvas_kb, fonts=fonts, plugins=plugins, seed=index)).encode()
+              for index, (canvas_kb, fonts, plugins) in enumerate(
+                  (rng.choice(CANVAS_KB), rng.choice(FONT_COUNTS), rng.choice(PLUGIN_COUNTS)) for _ in range(32))]
+    uas = common.ua_corpus(size, seed=seed)
+    ips = client_ips(networks, size, rng)
+    workload = []
+    for ua, ip in zip(uas, ips):
+        headers = {
+            "user-agent": ua,
+            "accept-language": rng.choice(ACCEPT_LANGUAGES),
+            "accept-encoding": rng.choice(ACCEPT_ENCODINGS),
+            "x-forwarded-for": ip if rng.random() < 0.5 else f"{ip}, 10.0.0.{rng.randint(1, 254)}",
+            "content-type": "application/json",
+        }
+        if rng.random() < 0.5:
+            headers["sec-ch-ua-platform"] = '"Windows"'
+            headers["sec-ch-ua-mobile"] = "?0"
+        workload.append((headers, rng.choice(bodies)))
+    return workload
+
+
+def request_scope(headers: Dict[str, str]) -> Dict[str, Any]:
+    # From a local proxy, so X-Forwarded-For is believed as in the HTTP runs
+    return {**common.collect_scope([(name.encode(), value.encode()) for name, value in headers.items()]),
+            "client": ("127.0.0.1", 50000)}
+
+
+def micro_benchmarks(main, workload, repeat: int) -> Dict[str, Dict[str, Any]]:
+    from starlette.requests import Request
+    from geolocation import get_ip_geolocation
+    from request_signals import build_server_signals, extract_client_ip
+    from user_agent import parse_user_agent
+
+    requests = [Request(request_scope(headers)) for headers, _ in workload]
+    uas = [headers["user-agent"] for headers, _ in workload]
+    ips = [extract_client_ip(request) for request in requests]
+    server_signals = [build_server_signals(request) for request in requests[:200]]
+    client_records = [main.CollectedSignals.model_validate_json(body).model_dump() for _, body in workload[:200]]
+    pairs = list(zip(server_signals, client_records))
+
+    cases = [
+        ("parse_user_agent", uas, parse_user_agent),
+        ("extract_client_ip", requests, extract_client_ip),
+        ("get_ip_geolocation", ips, get_ip_geolocation),
+        ("generate_unique_identifiers", pairs, lambda pair: main.generate_unique_identifiers(*pair)),
+        ("build_server_signals", requests, build_server_signals),
+    ]
+    results = {}
+    for name, inputs, fn in cases:
+        run = common.bench(name, lambda: [fn(value) for value in inputs], repeat=repeat)
+        results[name] = {"ops": len(inputs), "ns_per_op": run["best_s"] / len(inputs) * 1e9}
+    return results
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def drive(client, workload, concurrency: int, path: str = "/collect") -> Dict[str, Any]:
+    """POST every workload item with `concurrency` requests in flight; latency percentiles and throughput."""
+    latencies: List[float] = []
+    errors = 0
+    queue = iter(workload)
+
+    async def worker():
+        nonlocal errors
+        for headers, body in queue:
+            start = time.perf_counter()
+            response = await client.post(path, content=body, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def report(label: str, result: Dict[str, Any]) -> None:
+    print(f"{label:<24} c={result['concurrency']:<3} {result['requests_per_s']:8.1f} req/s  "
+          f"p50 {result['p50_ms']:7.2f}ms  p90 {result['p90_ms']:7.2f}ms  p99 {result['p99_ms']:7.2f}ms"
+          + (f"  {result['errors']} errors" if result["errors"] else ""))
+
+
+async def run_asgi(app, workload, levels) -> Dict[str, Dict[str, Any]]:
+    import httpx
+
+    results = {}
+    # Loopback peer, like request_scope: a trusted proxy, so X-Forwarded-For drives the client IP and GeoIP lookup
+    transport = httpx.ASGITransport(app=app, client=("127.0.0.1", 50000))
+    async with httpx.AsyncClient(transport=transport, base_url="http://collector") as client:
+        await drive(client, workload[:50], 1)  # warm caches and lazy imports
+        for concurrency in levels:
+            results[f"c{concurrency}"] = result = await drive(client, workload, concurrency)
+            report("asgi /collect", result)
+    return results
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_uvicorn(env: Dict[str, str], workload, levels) -> Dict[str, Dict[str, Any]]:
+    import httpx
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        cwd=common.BACKEND_DIR, env={**os.environ, **env})
+    results = {}
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    if (await client.get("/")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if server.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("uvicorn did not start")
+                await asyncio.sleep(0.1)
+            await drive(client, workload[:50], 1)
+            for concurrency in levels:
+                results[f"c{concurrency}"] = result = await drive(client, workload, concurrency)
+                report("uvicorn /collect", result)
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=common.BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Comparable figures as {"section.case.metric": value}."""
+    figures = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            figures.update(flatten(value, path + "."))
+        elif key in HIGHER_IS_BETTER and isinstance(value, (int, float)):
+            figures[path] = value
+    return figures
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print every figure next to its baseline; return those that got worse by more than `threshold`."""
+    before = flatten({key: baseline.get(key, {}) for key in ("micro", "asgi", "uvicorn")})
+    after = flatten({key: current.get(key, {}) for key in ("micro", "asgi", "uvicorn")})
+    print(f"\ncompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')})")
+    regressions = []
+    for name, value in after.items():
+        old = before.get(name)
+        if not old:
+            continue
+        change = (value - old) / old
+        worse = -change if HIGHER_IS_BETTER[name.rsplit(".", 1)[1]] else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<48} {old:12.2f} -> {value:12.2f}  {change * 100:+7.1f}%{flag}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the /collect pipeline and record the results as JSON")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(CONCURRENCY_LEVELS))
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--quick", action="store_true", help="a smaller run for a fast sanity check")
+    parser.add_argument("--no-uvicorn", action="store_true", help="skip the HTTP run against a uvicorn worker")
+    parser.add_argument("--out", help="results file (default: benchmarks/results/collect-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+    requests = 300 if args.quick else args.requests
+    repeat = 3 if args.quick else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        mmdb_path, networks = build_mmdb(os.path.join(tmp, "GeoLite2-City.mmdb"))
+        env = {**SERVER_ENV, "GEOIP_DB_PATH": mmdb_path}
+        os.environ.update(env)
+        import main as collector
+
+        workload = build_workload(networks, requests, args.seed)
+        results: Dict[str, Any] = {
+            "meta": {
+                "timestamp": datetime.now().isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "seed": args.seed,
+                "requests": requests,
+                "concurrency": args.concurrency,
+                "env": env | {"GEOIP_DB_PATH": "<stub>"},
+            },
+        }
+        results["micro"] = micro_benchmarks(collector, workload, repeat)
+        results["asgi"] = asyncio.run(run_asgi(collector.app, workload, args.concurrency))
+        if not args.no_uvicorn:
+            results["uvicorn"] = asyncio.run(run_uvicorn(env, workload, args.concurrency))
+
+    out = args.out or os.path.join(RESULTS_DIR, f"collect-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✓ results written to {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"⚠ {len(regressions)} figure(s) regressed by more than {args.threshold:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
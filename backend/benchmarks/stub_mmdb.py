@@ -0,0 +1,204 @@
+"""
+Minimal MaxMind DB writer used to build a stub GeoLite2-City database so
+geolocation can be exercised offline (benchmarks, local development).
+
+    python benchmarks/stub_mmdb.py ./GeoLite2-City.mmdb
+
+The generated database contains synthetic City records for a deterministic
+set of IPv4 networks (/16 to /24) in an IPv6 search tree, which is the
+layout the real GeoLite2 files use.
+"""
+import ipaddress
+import random
+import struct
+import sys
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+METADATA_MARKER = b"\xab\xcd\xefMaxMind.com"
+
+CITIES = [
+    ("New York", "US", "United States", "NY", "New York", "NA", "North America", "America/New_York", 40.71, -74.0),
+    ("Los Angeles", "US", "United States", "CA", "California", "NA", "North America", "America/Los_Angeles", 34.05, -118.24),
+    ("London", "GB", "United Kingdom", "ENG", "England", "EU", "Europe", "Europe/London", 51.51, -0.13),
+    ("Berlin", "DE", "Germany", "BE", "Berlin", "EU", "Europe", "Europe/Berlin", 52.52, 13.4),
+    ("Paris", "FR", "France", "IDF", "Ile-de-France", "EU", "Europe", "Europe/Paris", 48.86, 2.35),
+    ("Tokyo", "JP", "Japan", "13", "Tokyo", "AS", "Asia", "Asia/Tokyo", 35.68, 139.69),
+    ("Sao Paulo", "BR", "Brazil", "SP", "Sao Paulo", "SA", "South America", "America/Sao_Paulo", -23.55, -46.63),
+    ("Mumbai", "IN", "India", "MH", "Maharashtra", "AS", "Asia", "Asia/Kolkata", 19.08, 72.88),
+    ("Sydney", "AU", "Australia", "NSW", "New South Wales", "OC", "Oceania", "Australia/Sydney", -33.87, 151.21),
+    ("Toronto", "CA", "Canada", "ON", "Ontario", "NA", "North America", "America/Toronto", 43.65, -79.38),
+]
+EU_COUNTRIES = {"DE", "FR"}
+PUBLIC_FIRST_OCTETS = [
+    23, 31, 37, 45, 52, 54, 62, 66, 77, 81, 89, 93, 104, 109, 142, 151,
+    163, 176, 185, 188, 195, 203, 212, 217,
+]
+
+# MaxMind DB type ids for unsigned integers; libmaxminddb requires exact
+# types for metadata fields, so those are wrapped in UInt explicitly
+UINT16, UINT32, UINT64 = 5, 6, 9
+
+
+class UInt(NamedTuple):
+    type_id: int
+    value: int
+
+
+class _DataWriter:
+    """Encodes values into the MaxMind DB data section format."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self._offsets: Dict[Any, int] = {}
+
+    def _control(self, type_id: int, size: int) -> bytes:
+        if size < 29:
+            size_bits, extra = size, b""
+        elif size < 285:
+            size_bits, extra = 29, bytes([size - 29])
+        elif size < 65821:
+            size_bits, extra = 30, struct.pack(">H", size - 285)
+        else:
+            size_bits, extra = 31, struct.pack(">I", size - 65821)[1:]
+        if type_id <= 7:
+            return bytes([(type_id << 5) | size_bits]) + extra
+        return bytes([size_bits, type_id - 7]) + extra
+
+    def _encode(self, value: Any) -> bytes:
+        if isinstance(value, UInt):
+            raw = value.value.to_bytes(8, "big").lstrip(b"\x00")
+            return self._control(value.type_id, len(raw)) + raw
+        if isinstance(value, bool):
+            return self._control(14, int(value))
+        if isinstance(value, str):
+            raw = value.encode("utf-8")
+            return self._control(2, len(raw)) + raw
+        if isinstance(value, float):
+            return self._control(3, 8) + struct.pack(">d", value)
+        if isinstance(value, int):
+            if value < 0:
+                return self._control(8, 4) + struct.pack(">i", value)
+            type_id = UINT16 if value < 1 << 16 else UINT32 if value < 1 << 32 else UINT64
+            return self._encode(UInt(type_id, value))
+        if isinstance(value, dict):
+            out = bytearray(self._control(7, len(value)))
+            for key, item in value.items():
+                out += self._encode(key) + self._encode(item)
+            return bytes(out)
+        if isinstance(value, (list, tuple)):
+            out = bytearray(self._control(11, len(value)))
+            for item in value:
+                out += self._encode(item)
+            return bytes(out)
+        raise TypeError(f"cannot encode {type(value).__name__}")
+
+    def store(self, key: Any, value: Any) -> int:
+        """Append a record once per key and return its data section offset."""
+        if key not in self._offsets:
+            self._offsets[key] = len(self.buffer)
+            self.buffer += self._encode(value)
+        return self._offsets[key]
+
+
+def _city_record(index: int) -> Dict[str, Any]:
+    city, cc, country, region_code, region, cont_code, continent, tz, lat, lon = CITIES[index % len(CITIES)]
+    geoname = 1000 + index
+    return {
+        "city": {"geoname_id": geoname, "names": {"en": city}},
+        "continent": {"code": cont_code, "geoname_id": 6255140 + index % 7, "names": {"en": continent}},
+        "country": {"geoname_id": 2000 + index % len(CITIES), "iso_code": cc, "names": {"en": country},
+                    **({"is_in_european_union": True} if cc in EU_COUNTRIES else {})},
+        "location": {"accuracy_radius": 20 + index % 200, "latitude": lat, "longitude": lon, "time_zone": tz},
+        "postal": {"code": f"{10000 + index}"},
+        "registered_country": {"geoname_id": 2000 + index % len(CITIES), "iso_code": cc, "names": {"en": country}},
+        "subdivisions": [{"geoname_id": 3000 + index, "iso_code": region_code, "names": {"en": region}}],
+    }
+
+
+def stub_networks(count: int = 2000, seed: int = 42) -> List[ipaddress.IPv4Network]:
+    """Deterministic, non-overlapping public IPv4 networks between /16 and /24."""
+    rng = random.Random(seed)
+    networks: List[ipaddress.IPv4Network] = []
+    # 9.0.0.0/8 is deliberately absent so callers have a block of unknown addresses
+    blocks = [(first, second) for first in PUBLIC_FIRST_OCTETS for second in range(256)]
+    rng.shuffle(blocks)
+    for first, second in blocks:
+        if len(networks) >= count:
+            break
+        prefix = rng.choice([16, 18, 20, 22, 24, 24, 24])
+        if prefix == 16:
+            networks.append(ipaddress.ip_network(f"{first}.{second}.0.0/16"))
+            continue
+        # carve several sibling subnets out of this /16
+        subnets = list(ipaddress.ip_network(f"{first}.{second}.0.0/16").subnets(new_prefix=prefix))
+        for subnet in rng.sample(subnets, min(len(subnets), rng.randint(1, 8))):
+            networks.append(subnet)
+    return networks[:count]
+
+
+def build_mmdb(path: str, networks: Optional[List[ipaddress.IPv4Network]] = None,
+               build_epoch: Optional[int] = None) -> Tuple[str, List[ipaddress.IPv4Network]]:
+    """Write a GeoLite2-City-compatible stub database to `path`."""
+    networks = stub_networks() if networks is None else networks
+    data = _DataWriter()
+
+    # node = [left, right]; records are ("node", i), ("data", offset) or None
+    nodes: List[List[Any]] = [[None, None]]
+    for index, network in enumerate(networks):
+        offset = data.store(index, _city_record(index))
+        # IPv4 networks live under ::/96 in an IPv6 tree
+        bits = int(network.network_address)
+        depth = 96 + network.prefixlen
+        node = 0
+        for position in range(depth):
+            bit = (bits >> (127 - position)) & 1
+            if position == depth - 1:
+                nodes[node][bit] = ("data", offset)
+                break
+            child = nodes[node][bit]
+            if child is None:
+                nodes.append([None, None])
+                child = ("node", len(nodes) - 1)
+                nodes[node][bit] = child
+            node = child[1]
+
+    node_count = len(nodes)
+
+    def record(value: Any) -> int:
+        if value is None:
+            return node_count
+        if value[0] == "node":
+            return value[1]
+        return node_count + 16 + value[1]
+
+    tree = bytearray()
+    for left, right in nodes:
+        tree += struct.pack(">II", record(left), record(right))
+
+    metadata = _DataWriter()
+    metadata.store("meta", {
+        "node_count": UInt(UINT32, node_count),
+        "record_size": UInt(UINT16, 32),
+        "ip_version": UInt(UINT16, 6),
+        "database_type": "GeoLite2-City",
+        "languages": ["en"],
+        "binary_format_major_version": UInt(UINT16, 2),
+        "binary_format_minor_version": UInt(UINT16, 0),
+        "build_epoch": UInt(UINT64, int(time.time()) if build_epoch is None else build_epoch),
+        "description": {"en": "WhoAmI stub GeoLite2-City database"},
+    })
+
+    with open(path, "wb") as out:
+        out.write(tree)
+        out.write(b"\x00" * 16)
+        out.write(data.buffer)
+        out.write(METADATA_MARKER)
+        out.write(metadata.buffer)
+    return path, networks
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else "./GeoLite2-City.mmdb"
+    _, written = build_mmdb(target)
+    print(f"✓ wrote {len(written)} networks to {target}")
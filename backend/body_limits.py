@@ -0,0 +1,135 @@
+import os
+from collections import Counter
+from itertools import islice
+from typing import Any, AsyncIterator, Dict, Iterable, Optional
+
+from pydantic import ValidationError
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+
+# Largest accepted /collect body; checked against Content-Length before reading
+# and again while the body streams in, so an oversized body is never buffered
+COLLECT_MAX_BODY_BYTES = int(os.environ.get("COLLECT_MAX_BODY_BYTES", str(1024 * 1024)))
+# Largest accepted /collect/batch body (each line is also capped by NDJSON_MAX_LINE_BYTES)
+BATCH_MAX_BODY_BYTES = int(os.environ.get("BATCH_MAX_BODY_BYTES", str(256 * 1024 * 1024)))
+# Per-field limits of client signals: items for list and dict fields, characters for strings
+CLIENT_FIELD_MAX_ITEMS = int(os.environ.get("CLIENT_FIELD_MAX_ITEMS", "10000"))
+CLIENT_FIELD_MAX_CHARS = int(os.environ.get("CLIENT_FIELD_MAX_CHARS", str(512 * 1024)))
+# Overrides for single fields, e.g. "fileUploads=100,canvasFingerprintDataURL=262144"
+CLIENT_FIELD_LIMITS = os.environ.get("CLIENT_FIELD_LIMITS", "")
+# Fields cut down to their limit instead of failing validation, e.g. "fileUploads,installedFontsDetection"
+CLIENT_FIELD_TRUNCATE = os.environ.get("CLIENT_FIELD_TRUNCATE", "")
+
+
+def parse_field_limits(spec: str) -> Dict[str, int]:
+    """{field: limit} from "field=limit,..."; raises ValueError on malformed entries."""
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, value = entry.partition("=")
+        if not sep or not value.strip().isdigit():
+            raise ValueError(f"malformed CLIENT_FIELD_LIMITS entry {entry!r}; expected field=limit")
+        limits[name.strip()] = int(value)
+    return limits
+
+
+class BodyLimits:
+    """
+    Size limits for collection bodies, with counters of what they rejected
+    or truncated.
+
+    The total body limit is enforced on the byte stream, before anything is
+    decoded. Field limits apply to the decoded client signal values: a field
+    over its limit fails validation like any other bad field (422), unless
+    it is listed for truncation, in which case it is cut to the limit.
+    """
+
+    def __init__(self, max_body_bytes: int = COLLECT_MAX_BODY_BYTES, max_batch_bytes: int = BATCH_MAX_BODY_BYTES,
+                 max_items: int = CLIENT_FIELD_MAX_ITEMS, max_chars: int = CLIENT_FIELD_MAX_CHARS,
+                 field_limits: Optional[Dict[str, int]] = None, truncate: Iterable[str] = ()):
+        self.max_body_bytes = max_body_bytes
+        self.max_batch_bytes = max_batch_bytes
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self.field_limits = dict(field_limits or {})
+        self.truncate = frozenset(truncate)
+        self.bodies_rejected = 0
+        self.fields_rejected: Counter = Counter()
+        self.fields_truncated: Counter = Counter()
+
+    def _too_large(self, limit: int) -> HTTPException:
+        self.bodies_rejected += 1
+        return HTTPException(status_code=413, detail=f"request body exceeds {limit} bytes")
+
+    async def stream(self, request: Request, max_bytes: int) -> AsyncIterator[bytes]:
+        """request.stream(), failing with 413 as soon as more than max_bytes have arrived."""
+        declared = request.headers.get("content-length", "")
+        if declared.isdigit() and int(declared) > max_bytes:
+            raise self._too_large(max_bytes)
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes:
+                raise self._too_large(max_bytes)
+            yield chunk
+
+    async def read_body(self, request: Request) -> bytes:
+        """The whole /collect body, or 413 once it exceeds max_body_bytes."""
+        body = bytearray()
+        async for chunk in self.stream(request, self.max_body_bytes):
+            body += chunk
+        return bytes(body)
+
+    def limit(self, name: str, value: Any) -> Optional[int]:
+        """Limit for this field's value, in items or characters; None for scalars."""
+        limit = self.field_limits.get(name)
+        if isinstance(value, str):
+            return self.max_chars if limit is None else limit
+        if isinstance(value, (list, dict)):
+            return self.max_items if limit is None else limit
+        return None
+
+    def enforce(self, values: Dict[str, Any], fields: Iterable[str], title: str) -> None:
+        """
+        Apply the limits of `fields` to decoded values in place: truncate
+        fields listed for it, raise a ValidationError (titled `title`) for
+        any other field over its limit.
+        """
+        errors = []
+        for name in fields:
+            value = values.get(name)
+            limit = self.limit(name, value)
+            if limit is None or len(value) <= limit:
+                continue
+            if name in self.truncate:
+                values[name] = dict(islice(value.items(), limit)) if isinstance(value, dict) else value[:limit]
+                self.fields_truncated[name] += 1
+                continue
+            self.fields_rejected[name] += 1
+            if isinstance(value, str):
+                errors.append({"type": "string_too_long", "loc": (name,), "input": value[:64] + "...",
+                               "ctx": {"max_length": limit}})
+            else:
+                errors.append({"type": "too_long", "loc": (name,), "input": f"<{len(value)} items>",
+                               "ctx": {"field_type": type(value).__name__.capitalize(), "max_length": limit,
+                                       "actual_length": len(value)}})
+        if errors:
+            raise ValidationError.from_exception_data(title, errors)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_body_bytes": self.max_body_bytes,
+            "max_batch_bytes": self.max_batch_bytes,
+            "max_items": self.max_items,
+            "max_chars": self.max_chars,
+            "field_limits": self.field_limits,
+            "truncate": sorted(self.truncate),
+            "bodies_rejected": self.bodies_rejected,
+            "fields_rejected": sum(self.fields_rejected.values()),
+            "fields_truncated": sum(self.fields_truncated.values()),
+            "rejected_by_field": dict(self.fields_rejected),
+            "truncated_by_field": dict(self.fields_truncated),
+        }
+
+
+body_limits = BodyLimits(field_limits=parse_field_limits(CLIENT_FIELD_LIMITS),
+                         truncate=filter(None, (name.strip() for name in CLIENT_FIELD_TRUNCATE.split(","))))
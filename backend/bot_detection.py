@@ -0,0 +1,142 @@
+import re
+from typing import Any, Dict, List, Mapping, Optional
+
+# Substrings that mark a user agent as a likely bot
+BOT_INDICATORS = [
+    'bot', 'crawler', 'spider', 'scraper', 'curl', 'wget', 'python',
+    'java', 'http', 'headless', 'phantom', 'selenium', 'puppeteer',
+    'slurp', 'facebook', 'twitter', 'linkedinbot', 'whatsapp',
+    'telegram', 'discord', 'slack', 'google', 'bing', 'yahoo',
+    'baidu', 'yandex', 'duckduck', 'archive', 'scrapy'
+]
+
+# Substring -> display name for well-known bots and automation clients
+BOT_PATTERNS = {
+    'googlebot': 'Google Bot',
+    'bingbot': 'Bing Bot',
+    'slurp': 'Yahoo Bot',
+    'duckduckbot': 'DuckDuckGo Bot',
+    'baiduspider': 'Baidu Spider',
+    'yandexbot': 'Yandex Bot',
+    'facebookexternalhit': 'Facebook Bot',
+    'twitterbot': 'Twitter Bot',
+    'linkedinbot': 'LinkedIn Bot',
+    'whatsapp': 'WhatsApp',
+    'telegrambot': 'Telegram Bot',
+    'discordbot': 'Discord Bot',
+    'slackbot': 'Slack Bot',
+    'curl': 'cURL',
+    'wget': 'Wget',
+    'python': 'Python Script',
+    'java': 'Java Client',
+    'selenium': 'Selenium',
+    'puppeteer': 'Puppeteer',
+    'playwright': 'Playwright',
+    'headless': 'Headless Browser',
+    'phantom': 'PhantomJS',
+}
+
+# User agent substrings that indicate browser automation frameworks
+AUTOMATION_UA_TOKENS = ['headless', 'selenium', 'puppeteer', 'playwright']
+
+
+def _trie_pattern(tokens: List[str]) -> str:
+    """
+    Render tokens as a prefix-trie regex (e.g. "bing(?:bot)?") so the engine
+    branches on one character per level instead of retrying every alternative
+    at each offset. Greedy optional suffixes make each match the longest token
+    starting at its offset.
+    """
+    trie: Dict[str, Any] = {}
+    for token in tokens:
+        node = trie
+        for char in token:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def render(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + render(child)
+                    for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return "(?:" + body + ")?"
+        return body
+
+    return render(trie)
+
+
+def _build_matcher():
+    """
+    Compile every token from the three tables into one regex.
+
+    Each match is the longest token starting at its offset. Any shorter token
+    matching at the same offset is necessarily a prefix of that one, so a
+    precomputed prefix closure recovers the complete set of matched tokens.
+    Scanning resumes one character after each match start, which keeps
+    overlapping tokens (e.g. "slurpython").
+    """
+    tokens = sorted(set(BOT_INDICATORS) | set(BOT_PATTERNS) | set(AUTOMATION_UA_TOKENS))
+    regex = re.compile(_trie_pattern(tokens))
+    prefixes = {
+        token: frozenset(other for other in tokens if token.startswith(other))
+        for token in tokens
+    }
+    return regex, prefixes
+
+
+_TOKEN_REGEX, _TOKEN_PREFIXES = _build_matcher()
+_BOT_INDICATOR_SET = frozenset(BOT_INDICATORS)
+_AUTOMATION_UA_SET = frozenset(AUTOMATION_UA_TOKENS)
+
+
+def match_ua_tokens(user_agent: str) -> frozenset:
+    """Return every table token found in the user agent, in one pass over its lowercased form."""
+    if not user_agent:
+        return frozenset()
+
+    ua_lower = user_agent.lower()
+    search = _TOKEN_REGEX.search
+    match = search(ua_lower)
+    if match is None:
+        return frozenset()
+
+    found = set()
+    while match is not None:
+        found |= _TOKEN_PREFIXES[match.group()]
+        match = search(ua_lower, match.start() + 1)
+    return frozenset(found)
+
+
+def is_bot_tokens(tokens: frozenset) -> bool:
+    return not _BOT_INDICATOR_SET.isdisjoint(tokens)
+
+
+def is_bot(user_agent: str) -> bool:
+    return is_bot_tokens(match_ua_tokens(user_agent))
+
+
+def classify_request(user_agent: str, headers: Mapping[str, str],
+                     tokens: Optional[frozenset] = None) -> Dict[str, Any]:
+    """
+    Single-pass replacement for is_bot + detect_bot_patterns + detect_automation_headers.
+    Returns the `bot_detection` block of the server signals. Pass `tokens` when
+    the user agent has already been scanned (see user_agent.analyze_user_agent).
+    """
+    if tokens is None:
+        tokens = match_ua_tokens(user_agent)
+    patterns: List[str] = [name for pattern, name in BOT_PATTERNS.items() if pattern in tokens]
+
+    sec_ch_ua = headers.get("sec-ch-ua")
+    has_automation = (
+        headers.get("x-requested-with") == "XMLHttpRequest"
+        or not _AUTOMATION_UA_SET.isdisjoint(tokens)
+        or bool(sec_ch_ua and "Headless" in sec_ch_ua)
+    )
+
+    return {
+        "is_bot_likely": is_bot_tokens(tokens),
+        "bot_patterns_matched": patterns,
+        "has_automation_headers": has_automation,
+    }
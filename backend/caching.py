@@ -0,0 +1,200 @@
+import mmap
+import pickle
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+_MISSING = object()
+
+# Every cache created in the process, by name, for the stats endpoint
+REGISTRY: Dict[str, "LRUCache"] = {}
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict for cached results. Still a real dict, so json.dumps and
+    FastAPI serialize it natively, but any attempt to mutate it raises.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("cached result is read-only")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+class SharedCache:
+    """
+    Fixed-size hash table in an anonymous shared memory mapping, used as a
+    second cache level by forked worker processes. It must be created
+    before the workers fork; every worker then maps the same pages.
+
+    Each slot holds one pickled (key, value) pair behind its length and
+    CRC32. There are no locks: a slot being rewritten while another worker
+    reads it fails the checksum and reads as a miss, and keys hashing to
+    the same slot replace each other. Slots are chosen with hash(), which
+    forked workers share. The first MARKS bytes are a shared flag area for
+    the owning cache (NetworkCache records prefix lengths there).
+    """
+
+    _HEADER = struct.Struct("<II")
+    MARKS = 256
+
+    def __init__(self, name: str, size_bytes: int, slot_bytes: int = 1024):
+        self.name = name
+        self.slot_bytes = slot_bytes
+        self.slots = max(1, (size_bytes - self.MARKS) // slot_bytes)
+        self._mem = mmap.mmap(-1, self.MARKS + self.slots * slot_bytes)
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.oversized = 0
+        self.corrupt = 0
+
+    def _offset(self, key: Hashable) -> int:
+        return self.MARKS + (hash(key) % self.slots) * self.slot_bytes
+
+    def read(self, key: Hashable, default: Any = None) -> Any:
+        """Like get(), without counting a hit or miss."""
+        offset = self._offset(key)
+        length, checksum = self._HEADER.unpack_from(self._mem, offset)
+        if length == 0 or length > self.slot_bytes - self._HEADER.size:
+            return default
+        start = offset + self._HEADER.size
+        payload = self._mem[start:start + length]
+        if zlib.crc32(payload) != checksum:
+            self.corrupt += 1
+            return default
+        stored_key, value = pickle.loads(payload)
+        return value if stored_key == key else default
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.read(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        payload = pickle.dumps((key, value), protocol=pickle.HIGHEST_PROTOCOL)
+        if len(payload) > self.slot_bytes - self._HEADER.size:
+            self.oversized += 1
+            return
+        offset = self._offset(key)
+        start = offset + self._HEADER.size
+        # Invalidate, write, then publish, so a reader never accepts a half-written slot
+        self._HEADER.pack_into(self._mem, offset, 0, 0)
+        self._mem[start:start + len(payload)] = payload
+        self._HEADER.pack_into(self._mem, offset, len(payload), zlib.crc32(payload))
+        self.stores += 1
+
+    def marks(self) -> bytes:
+        return self._mem[:self.MARKS]
+
+    def set_mark(self, index: int) -> None:
+        self._mem[index] = 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "slots": self.slots,
+            "slot_bytes": self.slot_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "oversized": self.oversized,
+            "corrupt": self.corrupt,
+            "hit_rate": (self.hits / lookups) if lookups else None,
+        }
+
+
+class LRUCache:
+    """
+    Bounded least-recently-used cache with hit/miss/eviction counters.
+    A maxsize of 0 disables caching (every lookup is a miss). With a
+    SharedCache attached, get_or_compute consults it on a local miss and
+    publishes what it computes, so workers reuse each other's results.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = max(0, int(maxsize))
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared: Optional[SharedCache] = None
+        REGISTRY[name] = self
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize == 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[Hashable], Any]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            shared = self.shared
+            value = shared.get(key, _MISSING) if shared is not None else _MISSING
+            if value is _MISSING:
+                value = compute(key)
+                if shared is not None:
+                    shared.put(key, value)
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": (self.hits / lookups) if lookups else None,
+        }
+        if self.shared is not None:
+            stats["shared"] = self.shared.stats()
+        return stats
+
+
+def all_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: cache.stats() for name, cache in REGISTRY.items()}
+
+
+def attach_shared_caches(names: Iterable[str], size_bytes: int) -> None:
+    """Give each named cache a SharedCache of size_bytes; call before forking workers."""
+    for name in names:
+        if name not in REGISTRY:
+            raise ValueError(f"unknown cache {name!r}; expected any of {', '.join(REGISTRY)}")
+        REGISTRY[name].shared = SharedCache(name, size_bytes)
@@ -0,0 +1,313 @@
+import base64
+import binascii
+import mimetypes
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, NamedTuple, Optional, Set, Tuple
+
+# Where decoded canvas images go: "disk", "memory", or "none" to keep data URLs inline in records
+CANVAS_STORE_BACKEND = os.environ.get("CANVAS_STORE", "disk")
+CANVAS_STORE_DIR = os.environ.get(
+    "CANVAS_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "signal_data", "canvas"))
+# Total decoded bytes kept; least recently referenced unreferenced blobs are evicted beyond this
+CANVAS_STORE_MAX_BYTES = int(os.environ.get("CANVAS_STORE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# What replaces canvasFingerprintDataURL in a record: REFERENCE_PREFIX + sha256 hex
+REFERENCE_PREFIX = "sha256:"
+# Blob index shared by every worker using the directory
+INDEX_NAME = "index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY, media_type TEXT NOT NULL, size INTEGER NOT NULL,
+    refs INTEGER NOT NULL, last_used REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS blobs_evictable ON blobs (last_used) WHERE refs = 0;
+"""
+
+
+class BlobEntry(NamedTuple):
+    media_type: str
+    size: int
+    refs: int
+
+
+def parse_data_url(data_url: str) -> Optional[Tuple[str, str]]:
+    """(media type, base64 payload) of a base64 data URL, or None for anything else."""
+    if not data_url.startswith("data:"):
+        return None
+    header, sep, payload = data_url.partition(",")
+    if not sep or not header.endswith(";base64"):
+        return None
+    return header[len("data:"):-len(";base64")] or "text/plain", payload
+
+
+def decode_payload(payload: str) -> Optional[bytes]:
+    """Decoded bytes, only if re-encoding them reproduces `payload` exactly."""
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    if base64.b64encode(data) != payload.encode("ascii"):
+        return None
+    return data
+
+
+def record_references(records: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """Digest of every offloaded canvas referenced by `records` (stored collection records)."""
+    for record in records:
+        canvas = (record.get("client_signals") or {}).get("canvasFingerprintDataURL")
+        if isinstance(canvas, str) and canvas.startswith(REFERENCE_PREFIX):
+            yield canvas[len(REFERENCE_PREFIX):]
+
+
+class CanvasStore:
+    """
+    Content-addressed store for canvas fingerprint images.
+
+    Blobs are keyed by the SHA-256 of the data URL (the value already reported
+    as canvas_fingerprint), so identical canvases from different visits are
+    decoded and written once; later records only bump the blob's refcount.
+    A reference is dropped with release() when the record holding it goes
+    away (signal store retention, or a record that was never stored). Only
+    blobs no record references are evicted, least recently referenced first,
+    once the decoded total exceeds max_bytes.
+
+    The index is SQLite: with a directory it is a WAL file next to the blobs
+    (<digest><extension>), shared by every worker process and persisted with
+    the refcounts; without one, index and blobs live in this process. All
+    methods block on disk I/O, so async callers run them in a thread.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = CANVAS_STORE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._blobs: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        # Opened on first use, so a store created before the workers fork gets one connection per worker
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_pid = 0
+        # Blob files found without an index entry (older stores, or a crash mid-offload)
+        self.adopted: Set[str] = set()
+        self.stored = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+
+    def _path(self, digest: str, media_type: str) -> str:
+        return os.path.join(self.directory, digest + mimetypes.guess_extension(media_type))
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is not None and self._db_pid == os.getpid():
+            return self._db
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            db = sqlite3.connect(os.path.join(self.directory, INDEX_NAME), timeout=10.0,
+                                 isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+        else:
+            db = sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False)
+        db.executescript(_SCHEMA)
+        self._db, self._db_pid = db, os.getpid()
+        if self.directory:
+            self._adopt_files(db)
+        return db
+
+    def _adopt_files(self, db: sqlite3.Connection) -> None:
+        """Index blob files the index does not know, unreferenced until rebuild_references() counts them."""
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            for name in os.listdir(self.directory):
+                digest, extension = os.path.splitext(name)
+                media_type = mimetypes.guess_type(name)[0]
+                if len(digest) != 64 or not extension or media_type is None:
+                    continue
+                size = os.stat(os.path.join(self.directory, name)).st_size
+                if db.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, 0, ?)",
+                              (digest, media_type, size, now)).rowcount:
+                    self.adopted.add(digest)
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+
+    def open(self) -> None:
+        """Open this process's index connection, indexing blob files it does not know yet."""
+        with self._lock:
+            self._connection()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # IMMEDIATE takes the write lock up front, so workers serialize on the index, not mid-transaction
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    def offload(self, data_url: str, digest: str, referenced: bool = True) -> Optional[str]:
+        """
+        Store the image behind `data_url` under `digest` (hex SHA-256 of the
+        data URL) and return the reference to put in the record instead, or
+        None if the value is not a base64 data URL and should stay inline.
+        With referenced=False no record will hold the reference, so the blob
+        stays evictable.
+        """
+        refs = 1 if referenced else 0
+        saved = len(data_url) - len(REFERENCE_PREFIX) - len(digest)
+        with self._transaction() as db:
+            if db.execute("UPDATE blobs SET refs = refs + ?, last_used = ? WHERE digest = ?",
+                          (refs, time.time(), digest)).rowcount:
+                self.deduplicated += 1
+                self.bytes_saved += saved
+                return REFERENCE_PREFIX + digest
+
+        parsed = parse_data_url(data_url)
+        # Only media types that map to a file extension, so the data URL can be rebuilt from disk
+        known_type = parsed is not None and mimetypes.guess_extension(parsed[0]) is not None
+        data = decode_payload(parsed[1]) if known_type else None
+        if data is None:
+            self.rejected += 1
+            return None
+
+        media_type = parsed[0]
+        with self._transaction() as db:
+            if db.execute("INSERT OR IGNORE INTO blobs VALUES (?, ?, ?, ?, ?)",
+                          (digest, media_type, len(data), refs, time.time())).rowcount:
+                # Written while the index is locked, so no worker can evict the file between write and insert
+                self._write(digest, media_type, data)
+                self.stored += 1
+            else:
+                # Another request stored the same canvas meanwhile
+                db.execute("UPDATE blobs SET refs = refs + ?, last_used = ? WHERE digest = ?",
+                           (refs, time.time(), digest))
+                self.deduplicated += 1
+            self.bytes_saved += saved
+            self._evict(db)
+        return REFERENCE_PREFIX + digest
+
+    def _write(self, digest: str, media_type: str, data: bytes) -> None:
+        if not self.directory:
+            self._blobs[digest] = data
+            return
+        # Written under a temporary name first so readers never see a partial blob
+        path = self._path(digest, media_type)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def release(self, digest: str) -> None:
+        """Drop one reference, e.g. when a record pointing at the blob is deleted or was never stored."""
+        self.release_all((digest,))
+
+    def release_all(self, digests: Iterable[str]) -> None:
+        """Drop one reference per digest; blobs left unreferenced become evictable."""
+        counts = Counter(digests)
+        if not counts:
+            return
+        with self._transaction() as db:
+            db.executemany("UPDATE blobs SET refs = MAX(0, refs - ?) WHERE digest = ?",
+                           [(count, digest) for digest, count in counts.items()])
+            self._evict(db)
+
+    def rebuild_references(self, digests: Iterable[str]) -> None:
+        """
+        Count references to adopted blobs from stored records, e.g.
+        record_references(iter_records()). Counts are added to what workers
+        recorded meanwhile, so a record seen twice is over- rather than
+        under-counted and its blob is never evicted while still referenced.
+        """
+        adopted, self.adopted = self.adopted, set()
+        counts = Counter(digest for digest in digests if digest in adopted)
+        with self._transaction() as db:
+            db.executemany("UPDATE blobs SET refs = refs + ? WHERE digest = ?",
+                           [(count, digest) for digest, count in counts.items()])
+
+    def entry(self, digest: str) -> Optional[BlobEntry]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT media_type, size, refs FROM blobs WHERE digest = ?", (digest,)).fetchone()
+        return BlobEntry(*row) if row is not None else None
+
+    def get(self, digest: str) -> Optional[Tuple[str, bytes]]:
+        """(media type, decoded bytes) of a stored blob, whichever worker stored it."""
+        entry = self.entry(digest)
+        if entry is None:
+            return None
+        if not self.directory:
+            data = self._blobs.get(digest)
+            return (entry.media_type, data) if data is not None else None
+        try:
+            with open(self._path(digest, entry.media_type), "rb") as f:
+                return entry.media_type, f.read()
+        except OSError:
+            return None
+
+    def data_url(self, digest: str) -> Optional[str]:
+        """Rebuild the original data URL of a stored blob."""
+        blob = self.get(digest)
+        if blob is None:
+            return None
+        media_type, data = blob
+        return f"data:{media_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        while total > self.max_bytes:
+            row = db.execute("SELECT digest, media_type, size FROM blobs WHERE refs = 0 "
+                             "ORDER BY last_used LIMIT 1").fetchone()
+            if row is None:
+                # Everything left is still referenced by a stored record
+                return
+            digest, media_type, size = row
+            db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+            self._blobs.pop(digest, None)
+            if self.directory:
+                try:
+                    os.remove(self._path(digest, media_type))
+                except OSError:
+                    pass
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            blobs, total_bytes, references = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(refs), 0) FROM blobs").fetchone()
+        return {
+            "backend": "disk" if self.directory else "memory",
+            "directory": self.directory,
+            "blobs": blobs,
+            "total_bytes": total_bytes,
+            "max_bytes": self.max_bytes,
+            "references": references,
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "evictions": self.evictions,
+            "bytes_saved": self.bytes_saved,
+        }
+
+
+def create_canvas_store(backend: str = CANVAS_STORE_BACKEND) -> Optional[CanvasStore]:
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return CanvasStore()
+    if backend == "disk":
+        return CanvasStore(CANVAS_STORE_DIR)
+    raise ValueError(f"unknown CANVAS_STORE backend {backend!r}; expected disk, memory or none")
+
+
+canvas_store = create_canvas_store()
@@ -0,0 +1,101 @@
+import os
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Client hints requested on responses (Accept-CH); the first CRITICAL_HINT_COUNT
+# are also sent as Critical-CH, so a browser retries the navigation with them
+CLIENT_HINTS = (
+    "Sec-CH-UA", "Sec-CH-UA-Mobile", "Sec-CH-UA-Platform",
+    "Sec-CH-UA-Arch", "Sec-CH-UA-Bitness", "Sec-CH-UA-Model",
+    "Sec-CH-UA-Platform-Version", "Sec-CH-UA-Full-Version-List",
+    "Sec-CH-UA-WoW64", "Device-Memory", "Downlink", "ECT", "RTT",
+    "Save-Data", "Viewport-Width", "Width", "DPR",
+    "Sec-CH-Prefers-Color-Scheme", "Sec-CH-Prefers-Reduced-Motion",
+)
+CRITICAL_HINT_COUNT = 8
+# Per-route hint sets, e.g. "/=none,/stats/*=none,/collect=Sec-CH-UA|Sec-CH-UA-Platform": a path
+# ending in * matches by prefix, "none" requests no hints; other routes request CLIENT_HINTS
+CLIENT_HINTS_ROUTES = os.environ.get("CLIENT_HINTS_ROUTES", "/=none,/metrics=none,/stats/*=none")
+
+
+def parse_hint_routes(spec: str) -> Dict[str, Optional[Tuple[str, ...]]]:
+    """{path: hints or None} from "path=Hint|Hint,..."; raises ValueError on malformed entries."""
+    routes = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        path, sep, hints = entry.partition("=")
+        if not sep or not path.strip().startswith("/"):
+            raise ValueError(f"malformed CLIENT_HINTS_ROUTES entry {entry!r}; expected path=Hint|Hint or path=none")
+        names = tuple(filter(None, (hint.strip() for hint in hints.split("|"))))
+        routes[path.strip()] = None if names in ((), ("none",)) else names
+    return routes
+
+
+class HintHeaders(NamedTuple):
+    """Encoded response headers of one hint set, built once."""
+    accept: List[Tuple[bytes, bytes]]
+    with_critical: List[Tuple[bytes, bytes]]
+    # Lowercase request header names of the critical hints
+    critical_names: frozenset
+
+    @classmethod
+    def build(cls, hints: Iterable[str], critical: Iterable[str]) -> "HintHeaders":
+        hints = tuple(hints)
+        critical = tuple(hint for hint in critical if hint in hints)
+        accept = [(b"accept-ch", ", ".join(hints).encode("latin-1"))]
+        if not critical:
+            return cls(accept, accept, frozenset())
+        return cls(accept, accept + [(b"critical-ch", ", ".join(critical).encode("latin-1"))],
+                   frozenset(hint.lower().encode("latin-1") for hint in critical))
+
+
+class ClientHintsMiddleware:
+    """
+    Pure ASGI middleware adding Accept-CH and Critical-CH to HTTP responses.
+
+    Header values are encoded once per hint set, and each route's set is
+    resolved by exact path, then by the longest matching prefix. Critical-CH
+    is left out when the request already carries every critical hint, since
+    there is nothing left for the browser to retry with.
+    """
+
+    def __init__(self, app, hints: Iterable[str] = CLIENT_HINTS, critical_count: int = CRITICAL_HINT_COUNT,
+                 routes: Optional[Dict[str, Optional[Tuple[str, ...]]]] = None):
+        self.app = app
+        hints = tuple(hints)
+        critical = hints[:critical_count]
+        self.default = HintHeaders.build(hints, critical)
+        self.exact: Dict[str, Optional[HintHeaders]] = {}
+        self.prefixes: List[Tuple[str, Optional[HintHeaders]]] = []
+        for path, route_hints in (routes or {}).items():
+            headers = None if route_hints is None else HintHeaders.build(route_hints, critical)
+            if path.endswith("*"):
+                self.prefixes.append((path[:-1], headers))
+            else:
+                self.exact[path] = headers
+        self.prefixes.sort(key=lambda entry: len(entry[0]), reverse=True)
+
+    def route(self, path: str) -> Optional[HintHeaders]:
+        if path in self.exact:
+            return self.exact[path]
+        for prefix, headers in self.prefixes:
+            if path.startswith(prefix):
+                return headers
+        return self.default
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        hints = self.route(scope["path"])
+        if hints is None:
+            await self.app(scope, receive, send)
+            return
+        extra = hints.with_critical
+        if hints.critical_names and hints.critical_names.issubset(name for name, _ in scope["headers"]):
+            extra = hints.accept
+
+        async def send_with_hints(message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *extra]
+            await send(message)
+
+        await self.app(scope, receive, send_with_hints)
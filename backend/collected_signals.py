@@ -0,0 +1,153 @@
+import json
+import os
+import typing
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+from body_limits import body_limits
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library decoder is used instead
+    orjson = None
+
+# How request bodies become client signals: "model" validates the whole body
+# into CollectedSignals; "lazy" decodes it and checks only top-level types and
+# sizes, deferring per-item checks of list fields until the field is read.
+# Both apply the field limits of body_limits.
+BODY_VALIDATION = os.environ.get("BODY_VALIDATION", "model")
+
+
+# Pydantic model for comprehensive signal collection
+class CollectedSignals(BaseModel):
+    navigator: Optional[Dict[str, Any]] = None
+    screen: Optional[Dict[str, Any]] = None
+    timezone: Optional[str] = None
+    tzOffsetMin: Optional[int] = None
+    locale: Optional[str] = None
+    performance: Optional[Dict[str, Any]] = None
+    canvasFingerprintDataURL: Optional[str] = None
+    webglRenderer: Optional[Dict[str, Any]] = None
+    computedStyles: Optional[Dict[str, Any]] = None
+    installedFontsDetection: Optional[List[str]] = None
+    audioContextFingerprint: Optional[Dict[str, Any]] = None
+    interaction: Optional[Dict[str, Any]] = None
+    capabilities: Optional[Dict[str, Any]] = None
+    storage: Optional[Dict[str, Any]] = None
+    deviceMotion: Optional[Dict[str, Any]] = None
+    fileUploads: Optional[List[Dict[str, Any]]] = None
+    documentReferrer: Optional[str] = None
+    historyLength: Optional[int] = None
+    previousUrlPath: Optional[str] = None
+    mimeTypes: Optional[List[Dict[str, Any]]] = None
+    plugins: Optional[List[Dict[str, Any]]] = None
+    osHints: Optional[Dict[str, Any]] = None
+    batteryStatus: Optional[Dict[str, Any]] = None
+
+
+def _field_spec(annotation: Any) -> Tuple[type, Optional[type]]:
+    """(top-level type, list item type or None) of an Optional[...] model field."""
+    inner = next(arg for arg in typing.get_args(annotation) if arg is not type(None))
+    origin = typing.get_origin(inner)
+    if origin is list:
+        item = typing.get_args(inner)[0]
+        return list, typing.get_origin(item) or item
+    return origin or inner, None
+
+
+# Derived from the model so both validation modes accept the same fields
+FIELD_SPECS: Dict[str, Tuple[type, Optional[type]]] = {
+    name: _field_spec(field.annotation) for name, field in CollectedSignals.model_fields.items()
+}
+FIELDS = tuple(FIELD_SPECS)
+
+_unknown_limits = sorted((set(body_limits.field_limits) | body_limits.truncate) - set(FIELDS))
+if _unknown_limits:
+    raise ValueError(f"CLIENT_FIELD_LIMITS / CLIENT_FIELD_TRUNCATE name unknown field(s) {', '.join(_unknown_limits)}")
+
+
+class LazySignals:
+    """
+    Client signals decoded without building a CollectedSignals model.
+
+    Values are the decoded JSON objects themselves, not validated copies.
+    Top-level types and size limits are checked when the body is parsed;
+    the items of list fields (font names, plugin and MIME type objects) are
+    checked the first time the field is read, and a bad item raises the
+    same ValidationError the model would.
+    """
+
+    __slots__ = ("_values", "_pending")
+
+    def __init__(self, values: Dict[str, Any], pending: List[str]):
+        self._values = values
+        self._pending = pending
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in FIELD_SPECS:
+            raise AttributeError(name)
+        if name in self._pending:
+            self._check_items(name)
+        return self._values.get(name)
+
+    def _check_items(self, name: str) -> None:
+        item_type = FIELD_SPECS[name][1]
+        value = self._values[name]
+        if not all(type(item) is item_type for item in value):
+            # Let the model coerce the field or report exactly what is wrong with it
+            self._values[name] = getattr(CollectedSignals.model_validate({name: value}), name)
+        self._pending.remove(name)
+
+    def model_dump(self) -> Dict[str, Any]:
+        """Same shape as CollectedSignals.model_dump(); dicts are shared with the decoded body."""
+        return {name: getattr(self, name) for name in FIELDS}
+
+
+ClientSignals = Union[CollectedSignals, LazySignals]
+
+
+def parse_model(body: bytes) -> CollectedSignals:
+    """Validate `body` into CollectedSignals, then apply the field limits to the validated values."""
+    signals = CollectedSignals.model_validate_json(body)
+    body_limits.enforce(signals.__dict__, FIELDS, CollectedSignals.__name__)
+    return signals
+
+
+def parse_lazy(body: bytes) -> ClientSignals:
+    """
+    Decode `body` into LazySignals. Anything the fast checks do not accept
+    as-is (invalid JSON, a string where an int belongs, ...) goes through
+    CollectedSignals instead, so results and errors match the model.
+    """
+    try:
+        values = orjson.loads(body) if orjson is not None else json.loads(body)
+    except ValueError:
+        values = None
+    if type(values) is not dict:
+        return parse_model(body)
+
+    pending = []
+    for name, (field_type, item_type) in FIELD_SPECS.items():
+        value = values.get(name)
+        if value is None:
+            continue
+        if type(value) is not field_type:
+            return parse_model(body)
+        if item_type is not None:
+            pending.append(name)
+    body_limits.enforce(values, FIELDS, CollectedSignals.__name__)
+    return LazySignals(values, pending)
+
+
+PARSERS: Dict[str, Callable[[bytes], ClientSignals]] = {
+    "model": parse_model,
+    "lazy": parse_lazy,
+}
+if BODY_VALIDATION not in PARSERS:
+    raise ValueError(f"unknown BODY_VALIDATION mode {BODY_VALIDATION!r}; expected {' or '.join(PARSERS)}")
+
+
+def parse_client_signals(body: bytes, mode: Optional[str] = None) -> ClientSignals:
+    """Client signals from a JSON body under BODY_VALIDATION (or `mode`); raises ValidationError."""
+    return PARSERS[mode or BODY_VALIDATION](body)
@@ -0,0 +1,254 @@
+"""
+Export collected signal records to Parquet or Arrow IPC for offline analysis.
+
+Records are flattened into a fixed columnar layout: the common server-side
+fields and the CollectedSignals scalars become typed columns, high-repetition
+strings (user agent, browser, country code, timezone, ...) are dictionary
+encoded, and nested client payloads without a fixed shape are kept as JSON
+text columns. Input is streamed and written one row group at a time, so
+memory stays bounded by the row group size regardless of dataset size.
+
+    python export_columnar.py --out signals.parquet
+    python export_columnar.py --input capture.jsonl --format arrow --out signals.arrows
+
+The arrow format is an Arrow IPC stream (read it with pyarrow.ipc.open_stream).
+
+Requires pyarrow (optional dependency: pip install pyarrow).
+"""
+import argparse
+import gzip
+import json
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from signal_store import SIGNAL_STORE_DIR, iter_records
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+DEFAULT_ROW_GROUP_SIZE = 8192
+
+# (column, kind, path into the comprehensive_data record)
+COLUMNS: List[Tuple[str, str, Tuple[str, ...]]] = [
+    ("collected_at", "float", ("collection_metadata", "timestamp")),
+    ("response_time_ms", "float", ("collection_metadata", "response_time_ms")),
+    ("collection_version", "dict_str", ("collection_metadata", "collection_version")),
+    # server signals
+    ("client_ip", "str", ("server_signals", "client_ip")),
+    ("request_path", "dict_str", ("server_signals", "request_path")),
+    ("url_scheme", "dict_str", ("server_signals", "url_scheme")),
+    ("server_hostname", "dict_str", ("server_signals", "server_hostname")),
+    ("geo_city", "dict_str", ("server_signals", "geolocation", "city")),
+    ("geo_region", "dict_str", ("server_signals", "geolocation", "region")),
+    ("country_code", "dict_str", ("server_signals", "geolocation", "country_code")),
+    ("geo_continent_code", "dict_str", ("server_signals", "geolocation", "continent_code")),
+    ("geo_latitude", "float", ("server_signals", "geolocation", "latitude")),
+    ("geo_longitude", "float", ("server_signals", "geolocation", "longitude")),
+    ("geo_accuracy_radius", "int", ("server_signals", "geolocation", "accuracy_radius")),
+    ("geo_timezone", "dict_str", ("server_signals", "geolocation", "timezone")),
+    ("user_agent", "dict_str", ("server_signals", "http_headers", "user_agent")),
+    ("accept_language", "dict_str", ("server_signals", "http_headers", "accept_language")),
+    ("accept_encoding", "dict_str", ("server_signals", "http_headers", "accept_encoding")),
+    ("referer", "str", ("server_signals", "http_headers", "referer")),
+    ("origin", "dict_str", ("server_signals", "http_headers", "origin")),
+    ("sec_ch_ua", "dict_str", ("server_signals", "http_headers", "sec_ch_ua")),
+    ("sec_ch_ua_platform", "dict_str", ("server_signals", "http_headers", "sec_ch_ua_platform")),
+    ("sec_ch_ua_mobile", "dict_str", ("server_signals", "http_headers", "sec_ch_ua_mobile")),
+    ("browser", "dict_str", ("server_signals", "http_headers", "user_agent_parsed", "browser")),
+    ("browser_version", "dict_str", ("server_signals", "http_headers", "user_agent_parsed", "browser_version")),
+    ("os", "dict_str", ("server_signals", "http_headers", "user_agent_parsed", "os")),
+    ("os_version", "dict_str", ("server_signals", "http_headers", "user_agent_parsed", "os_version")),
+    ("device_type", "dict_str", ("server_signals", "http_headers", "user_agent_parsed", "device_type")),
+    ("engine", "dict_str", ("server_signals", "http_headers", "user_agent_parsed", "engine")),
+    ("is_mobile", "bool", ("server_signals", "http_headers", "user_agent_parsed", "is_mobile")),
+    ("is_tablet", "bool", ("server_signals", "http_headers", "user_agent_parsed", "is_tablet")),
+    ("is_bot_likely", "bool", ("server_signals", "bot_detection", "is_bot_likely")),
+    ("has_automation_headers", "bool", ("server_signals", "bot_detection", "has_automation_headers")),
+    ("bot_patterns_matched", "json", ("server_signals", "bot_detection", "bot_patterns_matched")),
+    ("header_order_hash", "str", ("server_signals", "fingerprints", "header_order_hash")),
+    ("header_values_hash", "str", ("server_signals", "fingerprints", "header_values_hash")),
+    # client signals (CollectedSignals)
+    ("timezone", "dict_str", ("client_signals", "timezone")),
+    ("tz_offset_min", "int", ("client_signals", "tzOffsetMin")),
+    ("locale", "dict_str", ("client_signals", "locale")),
+    ("nav_platform", "dict_str", ("client_signals", "navigator", "platform")),
+    ("nav_vendor", "dict_str", ("client_signals", "navigator", "vendor")),
+    ("nav_language", "dict_str", ("client_signals", "navigator", "language")),
+    ("nav_hardware_concurrency", "int", ("client_signals", "navigator", "hardwareConcurrency")),
+    ("nav_device_memory", "float", ("client_signals", "navigator", "deviceMemory")),
+    ("nav_max_touch_points", "int", ("client_signals", "navigator", "maxTouchPoints")),
+    ("nav_webdriver", "bool", ("client_signals", "navigator", "webdriver")),
+    ("screen_width", "int", ("client_signals", "screen", "width")),
+    ("screen_height", "int", ("client_signals", "screen", "height")),
+    ("screen_color_depth", "int", ("client_signals", "screen", "colorDepth")),
+    ("device_pixel_ratio", "float", ("client_signals", "screen", "devicePixelRatio")),
+    ("webgl_vendor", "dict_str", ("client_signals", "webglRenderer", "vendor")),
+    ("webgl_renderer", "dict_str", ("client_signals", "webglRenderer", "renderer")),
+    ("installed_fonts", "json", ("client_signals", "installedFontsDetection")),
+    ("document_referrer", "str", ("client_signals", "documentReferrer")),
+    ("history_length", "int", ("client_signals", "historyLength")),
+    ("previous_url_path", "str", ("client_signals", "previousUrlPath")),
+    ("performance_json", "json", ("client_signals", "performance")),
+    ("computed_styles_json", "json", ("client_signals", "computedStyles")),
+    ("audio_fingerprint_json", "json", ("client_signals", "audioContextFingerprint")),
+    ("interaction_json", "json", ("client_signals", "interaction")),
+    ("capabilities_json", "json", ("client_signals", "capabilities")),
+    ("storage_json", "json", ("client_signals", "storage")),
+    ("device_motion_json", "json", ("client_signals", "deviceMotion")),
+    ("file_uploads_json", "json", ("client_signals", "fileUploads")),
+    ("mime_types_json", "json", ("client_signals", "mimeTypes")),
+    ("plugins_json", "json", ("client_signals", "plugins")),
+    ("os_hints_json", "json", ("client_signals", "osHints")),
+    ("battery_status_json", "json", ("client_signals", "batteryStatus")),
+    # summary (the canvas itself is represented by its digest)
+    ("total_server_signals", "int", ("signal_summary", "total_server_signals")),
+    ("total_client_signals", "int", ("signal_summary", "total_client_signals")),
+    ("basic_fingerprint", "str", ("signal_summary", "unique_identifiers", "basic_fingerprint")),
+    ("canvas_fingerprint", "dict_str", ("signal_summary", "unique_identifiers", "canvas_fingerprint")),
+    ("webgl_fingerprint", "dict_str", ("signal_summary", "unique_identifiers", "webgl_fingerprint")),
+    ("screen_fingerprint", "dict_str", ("signal_summary", "unique_identifiers", "screen_fingerprint")),
+    ("combined_fingerprint", "str", ("signal_summary", "unique_identifiers", "combined_fingerprint")),
+    ("session_id", "str", ("signal_summary", "unique_identifiers", "session_id")),
+]
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("pyarrow is required for columnar export: pip install pyarrow")
+
+
+def arrow_schema():
+    _require_pyarrow()
+    types = {
+        "str": pa.string(),
+        "dict_str": pa.dictionary(pa.int32(), pa.string()),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "bool": pa.bool_(),
+        "json": pa.string(),
+    }
+    return pa.schema([pa.field(name, types[kind]) for name, kind, _ in COLUMNS])
+
+
+def _extract(record: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+    value: Any = record
+    for key in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _coerce(kind: str, value: Any) -> Any:
+    if value is None:
+        return None
+    try:
+        if kind in ("str", "dict_str"):
+            return value if isinstance(value, str) else str(value)
+        if kind == "int":
+            return int(value)
+        if kind == "float":
+            return float(value)
+        if kind == "bool":
+            return bool(value)
+    except (TypeError, ValueError):
+        return None
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+
+def flatten_record(record: Dict[str, Any]) -> List[Any]:
+    """One row in COLUMNS order. Accepts a comprehensive_data dict or a log-sink record wrapping it."""
+    if "data" in record and "server_signals" not in record:
+        record = record["data"]
+    return [_coerce(kind, _extract(record, path)) for _, kind, path in COLUMNS]
+
+
+def _record_batch(rows_by_column: List[List[Any]], schema):
+    arrays = []
+    for (name, kind, _), values in zip(COLUMNS, rows_by_column):
+        if kind == "dict_str":
+            arrays.append(pa.array(values, type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(values, type=schema.field(name).type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def iter_jsonl(paths: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Stream records from JSONL files (plain or .gz), skipping lines that are not JSON objects."""
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(record, dict):
+                    yield record
+
+
+def export_records(records: Iterable[Dict[str, Any]], out_path: str, fmt: str = "parquet",
+                   row_group_size: int = DEFAULT_ROW_GROUP_SIZE, compression: Optional[str] = "zstd") -> int:
+    """Write records to `out_path` in streaming row groups and return the row count."""
+    schema = arrow_schema()
+    if fmt == "parquet":
+        dictionary_columns = [name for name, kind, _ in COLUMNS if kind == "dict_str"]
+        writer = pq.ParquetWriter(out_path, schema, compression=compression, use_dictionary=dictionary_columns)
+        write = writer.write_batch
+    elif fmt == "arrow":
+        # The IPC stream format (not the file format) lets each batch carry its own dictionaries
+        sink = pa.OSFile(out_path, "wb")
+        options = pa.ipc.IpcWriteOptions(compression=compression) if compression else None
+        writer = pa.ipc.new_stream(sink, schema, options=options)
+        write = writer.write_batch
+    else:
+        raise ValueError(f"unknown export format {fmt!r}; expected parquet or arrow")
+
+    columns: List[List[Any]] = [[] for _ in COLUMNS]
+    total = 0
+    try:
+        for record in records:
+            for column, value in zip(columns, flatten_record(record)):
+                column.append(value)
+            if len(columns[0]) >= row_group_size:
+                write(_record_batch(columns, schema))
+                total += len(columns[0])
+                columns = [[] for _ in COLUMNS]
+        if columns[0]:
+            write(_record_batch(columns, schema))
+            total += len(columns[0])
+    finally:
+        writer.close()
+        if fmt == "arrow":
+            sink.close()
+    return total
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export collected signals to Parquet/Arrow")
+    parser.add_argument("--input", nargs="*", help="JSONL files to read (default: the signal store)")
+    parser.add_argument("--store-dir", default=SIGNAL_STORE_DIR, help="signal store directory")
+    parser.add_argument("--out", required=True, help="output file")
+    parser.add_argument("--format", choices=("parquet", "arrow"), default="parquet")
+    parser.add_argument("--row-group-size", type=int, default=DEFAULT_ROW_GROUP_SIZE)
+    parser.add_argument("--compression", default="zstd", help="codec, or 'none'")
+    args = parser.parse_args(argv)
+
+    records = iter_jsonl(args.input) if args.input else iter_records(args.store_dir)
+    compression = None if args.compression == "none" else args.compression
+    start = time.perf_counter()
+    rows = export_records(records, args.out, args.format, args.row_group_size, compression)
+    elapsed = time.perf_counter() - start
+    print(f"✓ exported {rows} records to {args.out} in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} records/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+# Large strings (canvas data URLs) are encoded and hashed in slices of this many
+# characters, so hashing never holds a second full-size copy of the payload
+HASH_CHUNK_CHARS = 16 * 1024
+
+# Canonical form: sorted keys, no whitespace, ASCII-only escapes and repr()
+# floats. The json module has produced exactly this output for these options
+# across Python 3 releases, so digests stay comparable between deployments.
+_CANONICAL = json.JSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=True,
+                              allow_nan=True, default=str)
+
+
+def canonical_bytes(value: Any) -> bytes:
+    return _CANONICAL.encode(value).encode("ascii")
+
+
+def feed_canonical(hasher, value: Any):
+    """Feed the canonical encoding of `value` into an incremental hashlib object."""
+    hasher.update(canonical_bytes(value))
+    return hasher
+
+
+def canonical_digest(value: Any, algorithm: str = "sha256") -> bytes:
+    return feed_canonical(hashlib.new(algorithm), value).digest()
+
+
+def text_digest(text: str, algorithm: str = "sha256") -> bytes:
+    """Same digest as hashlib.new(algorithm, text.encode()), without materializing the encoded copy."""
+    hasher = hashlib.new(algorithm)
+    if text.isascii():
+        for start in range(0, len(text), HASH_CHUNK_CHARS):
+            hasher.update(text[start:start + HASH_CHUNK_CHARS].encode("ascii"))
+    else:
+        hasher.update(text.encode())
+    return hasher.digest()
+
+
+def header_fingerprints(method: str, path: str, keys: List[str], raw: Dict[str, str]) -> Dict[str, str]:
+    return {
+        "header_order_hash": feed_canonical(hashlib.md5(), keys).hexdigest(),
+        "header_values_hash": feed_canonical(hashlib.md5(), raw).hexdigest(),
+        "full_request_hash": feed_canonical(hashlib.sha256(), [method, path, raw]).hexdigest(),
+    }
+
+
+def signal_fingerprints(ua: Optional[str], accept_lang: Optional[str], accept_enc: Optional[str], canvas: str,
+                        webgl_renderer: Any, screen_info: Any, navigator_info: Any, now: float) -> Dict[str, Any]:
+    """
+    Component digests are computed once; the combined fingerprint hashes those
+    digests rather than the components, so the canvas payload is read a
+    single time. session_id extends a copy of the combined hash state.
+    """
+    canvas_digest = text_digest(canvas) if canvas else None
+    webgl_digest = canonical_digest(webgl_renderer)
+    screen_digest = canonical_digest(screen_info)
+    navigator_digest = canonical_digest(navigator_info)
+
+    combined = feed_canonical(hashlib.sha256(), [
+        ua, accept_lang, accept_enc, canvas_digest.hex() if canvas_digest else None,
+        webgl_digest.hex(), screen_digest.hex(), navigator_digest.hex()])
+    session = combined.copy()
+    feed_canonical(session, now)
+
+    return {
+        "basic_fingerprint": hashlib.md5(f"{ua}{accept_lang}".encode()).hexdigest(),
+        "canvas_fingerprint": canvas_digest.hex() if canvas_digest else None,
+        "webgl_fingerprint": webgl_digest.hex(),
+        "screen_fingerprint": screen_digest.hex(),
+        "combined_fingerprint": combined.hexdigest(),
+        "session_id": session.hexdigest()[:32],
+    }
@@ -0,0 +1,339 @@
+import ipaddress
+import os
+import signal
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Union
+
+import geoip2.database
+import geoip2.errors
+import maxminddb
+
+try:
+    import maxminddb.extension  # noqa: F401
+    _HAS_EXTENSION = True
+except ImportError:
+    _HAS_EXTENSION = False
+
+from caching import FrozenDict, LRUCache
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+# Database location (defaults to the file next to this module, not the CWD)
+GEOIP_DB_PATH = os.environ.get(
+    "GEOIP_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "GeoLite2-City.mmdb"))
+# Seconds between checks for a replaced database file; 0 disables the watcher
+GEOIP_WATCH_INTERVAL = float(os.environ.get("GEOIP_WATCH_INTERVAL", "60"))
+
+# Cached network entries; MaxMind answers cover whole networks, so one entry
+# serves every address in the block
+GEOIP_CACHE_SIZE = int(os.environ.get("GEOIP_CACHE_SIZE", "65536"))
+
+# Marker stored for networks the database has no record for
+_NOT_FOUND = FrozenDict()
+
+_reload_lock = threading.Lock()
+reload_stats: Dict[str, Any] = {"reloads": 0, "last_swap_ms": None, "last_open_ms": None}
+
+
+class NetworkCache(LRUCache):
+    """
+    LRU cache keyed by the network prefix a database answer applies to.
+
+    Keys are (ip version, prefix length, address >> host bits). A lookup probes
+    every prefix length seen so far, longest first, and counts as a single hit
+    or miss. Entries belong to one database build: when the build epoch of the
+    loaded database changes the cache is flushed, so a new database never
+    serves stale answers.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        super().__init__(name, maxsize)
+        self.build_epoch: Optional[int] = None
+        self._prefix_lengths: Dict[int, list] = {4: [], 6: []}
+        self._shared_marks = b""
+        self._shared_prefix_lengths: Dict[int, list] = {4: [], 6: []}
+
+    def ensure_epoch(self, build_epoch: Optional[int]) -> None:
+        if build_epoch != self.build_epoch:
+            with self._lock:
+                self._data.clear()
+                self._prefix_lengths = {4: [], 6: []}
+                self.build_epoch = build_epoch
+
+    def lookup(self, ip_obj: IPAddress) -> Optional[FrozenDict]:
+        version, max_bits, value = ip_obj.version, ip_obj.max_prefixlen, int(ip_obj)
+        with self._lock:
+            for prefix_len in self._prefix_lengths[version]:
+                key = (version, prefix_len, value >> (max_bits - prefix_len))
+                entry = self._data.get(key)
+                if entry is not None:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry
+            self.misses += 1
+        return self._shared_lookup(version, max_bits, value) if self.shared is not None else None
+
+    def _shared_lookup(self, version: int, max_bits: int, value: int) -> Optional[FrozenDict]:
+        """Probe the prefix lengths any worker has stored; a hit is copied into the local cache."""
+        marks = self.shared.marks()
+        if marks != self._shared_marks:
+            self._shared_marks = marks
+            self._shared_prefix_lengths = {
+                4: [length for length in range(32, -1, -1) if marks[length]],
+                6: [length for length in range(128, -1, -1) if marks[33 + length]],
+            }
+        for prefix_len in self._shared_prefix_lengths[version]:
+            key = (version, prefix_len, value >> (max_bits - prefix_len))
+            entry = self.shared.read((self.build_epoch,) + key)
+            if entry is not None:
+                self.shared.hits += 1
+                self._store_local(version, prefix_len, key, entry)
+                return entry
+        self.shared.misses += 1
+        return None
+
+    def store(self, network: Union[ipaddress.IPv4Network, ipaddress.IPv6Network], entry: FrozenDict) -> None:
+        version, prefix_len = network.version, network.prefixlen
+        key = (version, prefix_len, int(network.network_address) >> (network.max_prefixlen - prefix_len))
+        self._store_local(version, prefix_len, key, entry)
+        if self.shared is not None:
+            # Keyed by database build too, so workers never share answers across a reload
+            self.shared.put((self.build_epoch,) + key, entry)
+            self.shared.set_mark(prefix_len if version == 4 else 33 + prefix_len)
+
+    def _store_local(self, version: int, prefix_len: int, key: Tuple[int, int, int], entry: FrozenDict) -> None:
+        with self._lock:
+            lengths = self._prefix_lengths[version]
+            if prefix_len not in lengths:
+                self._prefix_lengths[version] = sorted(lengths + [prefix_len], reverse=True)
+        self.put(key, entry)
+
+
+geo_cache = NetworkCache("geoip", GEOIP_CACHE_SIZE)
+
+
+class GeoIPDatabase(NamedTuple):
+    """One opened database file; swapped as a unit so readers never see a half-updated pair."""
+    reader: Any
+    path: str
+    build_epoch: Optional[int]
+    file_id: Tuple[int, int, int]
+    loaded_at: float
+    open_ms: float
+
+
+def _database_epoch(reader) -> Optional[int]:
+    try:
+        return reader.metadata().build_epoch
+    except Exception:
+        return None
+
+
+def _file_id(path: str) -> Tuple[int, int, int]:
+    st = os.stat(path)
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def open_database(path: str) -> GeoIPDatabase:
+    """
+    Open the database memory-mapped, so every worker process maps the same
+    page-cache pages instead of holding a private copy. The C extension's
+    mmap mode is used when available; the pure Python MODE_MMAP otherwise.
+    """
+    start = time.perf_counter()
+    file_id = _file_id(path)
+    mode = maxminddb.MODE_MMAP_EXT if _HAS_EXTENSION else maxminddb.MODE_MMAP
+    reader = geoip2.database.Reader(path, mode=mode)
+    return GeoIPDatabase(reader, path, _database_epoch(reader), file_id, time.time(),
+                         (time.perf_counter() - start) * 1000)
+
+
+def load_database(path: Optional[str] = None) -> bool:
+    """
+    Open `path` (default GEOIP_DB_PATH) and atomically swap it in. The old reader
+    is not closed here: lookups already running keep their reference and finish
+    on it, and it is released once the last of them drops it.
+    """
+    global geoip_db
+    path = path or GEOIP_DB_PATH
+    start = time.perf_counter()
+    try:
+        new_db = open_database(path)
+    except Exception as e:
+        print(f"⚠ Warning: Could not load GeoIP2 database: {e}")
+        return False
+
+    with _reload_lock:
+        geoip_db = new_db
+        reload_stats["reloads"] += 1
+        reload_stats["last_swap_ms"] = (time.perf_counter() - start) * 1000
+        reload_stats["last_open_ms"] = new_db.open_ms
+    print(f"✓ GeoIP2 database loaded successfully ({path}, build {new_db.build_epoch})")
+    return True
+
+
+def reload_if_changed() -> bool:
+    """Reload when the database file was replaced or modified since it was opened."""
+    current = geoip_db
+    path = current.path if current else GEOIP_DB_PATH
+    try:
+        file_id = _file_id(path)
+    except OSError:
+        return False
+    if current is not None and file_id == current.file_id:
+        return False
+    return load_database(path)
+
+
+def _watch_database(stop: threading.Event, interval: float) -> None:
+    while not stop.wait(interval):
+        try:
+            reload_if_changed()
+        except Exception as e:
+            print(f"⚠ Warning: GeoIP2 reload check failed: {e}")
+
+
+def start_database_watcher(interval: float = GEOIP_WATCH_INTERVAL) -> Optional[threading.Event]:
+    """Poll the database file in a daemon thread; set the returned event to stop it."""
+    if interval <= 0:
+        return None
+    stop = threading.Event()
+    threading.Thread(target=_watch_database, args=(stop, interval),
+                     name="geoip-watcher", daemon=True).start()
+    return stop
+
+
+def install_reload_signal() -> None:
+    """Reload the database on SIGHUP (POSIX only), off the signal handler's stack."""
+    if not hasattr(signal, "SIGHUP") or threading.current_thread() is not threading.main_thread():
+        return
+    signal.signal(signal.SIGHUP, lambda signum, frame: threading.Thread(
+        target=load_database, name="geoip-reload", daemon=True).start())
+
+
+def process_memory() -> Dict[str, Optional[int]]:
+    """RSS / PSS / shared bytes of this worker (Linux); PSS splits shared mmap pages across workers."""
+    memory: Dict[str, Optional[int]] = {"rss": None, "pss": None, "shared": None}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            fields = {line.split(":")[0]: line.split()[1] for line in f if ":" in line}
+    except OSError:
+        return memory
+    memory["rss"] = int(fields.get("Rss", 0)) * 1024
+    memory["pss"] = int(fields.get("Pss", 0)) * 1024
+    memory["shared"] = (int(fields.get("Shared_Clean", 0)) + int(fields.get("Shared_Dirty", 0))) * 1024
+    return memory
+
+
+def database_stats() -> Dict[str, Any]:
+    db = geoip_db
+    return {
+        "loaded": db is not None,
+        "path": db.path if db else GEOIP_DB_PATH,
+        "build_epoch": db.build_epoch if db else None,
+        "loaded_at": db.loaded_at if db else None,
+        "mode": "mmap_ext" if _HAS_EXTENSION else "mmap",
+        **reload_stats,
+        "process_memory": process_memory(),
+    }
+
+
+# Initialize GeoIP2 Reader (load database once at startup)
+geoip_db: Optional[GeoIPDatabase] = None
+load_database()
+
+
+def _is_private(ip_obj: IPAddress) -> bool:
+    return ip_obj.is_private or ip_obj.is_loopback or ip_obj.is_link_local
+
+
+def is_private_ip(ip_str: str) -> bool:
+    try:
+        return _is_private(ipaddress.ip_address(ip_str))
+    except ValueError:
+        return True
+
+
+def _city_fields(response) -> FrozenDict:
+    return FrozenDict({
+        "city": response.city.name,
+        "city_geoname_id": response.city.geoname_id,
+        "region": response.subdivisions.most_specific.name if response.subdivisions else None,
+        "region_code": response.subdivisions.most_specific.iso_code if response.subdivisions else None,
+        "region_geoname_id": response.subdivisions.most_specific.geoname_id if response.subdivisions else None,
+        "country": response.country.name,
+        "country_code": response.country.iso_code,
+        "country_geoname_id": response.country.geoname_id,
+        "continent": response.continent.name,
+        "continent_code": response.continent.code,
+        "postal": response.postal.code,
+        "latitude": response.location.latitude,
+        "longitude": response.location.longitude,
+        "accuracy_radius": response.location.accuracy_radius,
+        "timezone": response.location.time_zone,
+        "metro_code": response.location.metro_code,
+        "is_in_european_union": response.country.is_in_european_union,
+        "registered_country": response.registered_country.name,
+        "registered_country_code": response.registered_country.iso_code,
+    })
+
+
+def _lookup_fields(reader, ip_address: str) -> FrozenDict:
+    """Query the database and cache the answer under the network it came from."""
+    try:
+        response = reader.city(ip_address)
+    except geoip2.errors.AddressNotFoundError as e:
+        if getattr(e, "network", None) is not None:
+            geo_cache.store(e.network, _NOT_FOUND)
+        return _NOT_FOUND
+
+    fields = _city_fields(response)
+    network = getattr(response.traits, "network", None)
+    if network is not None:
+        geo_cache.store(network, fields)
+    return fields
+
+
+def get_ip_geolocation(ip_address: str, ip_obj: Optional[IPAddress] = None) -> Dict[str, Any]:
+    """
+    Get geolocation data from IP address using MaxMind GeoLite2 local database.
+    Returns city, country, coordinates, timezone, etc. Pass ip_obj when the
+    address is already parsed to skip parsing it again.
+    """
+    if ip_obj is None:
+        try:
+            ip_obj = ipaddress.ip_address(ip_address)
+        except ValueError:
+            pass
+
+    if ip_obj is None or _is_private(ip_obj):
+        return {
+            "ip": ip_address,
+            "city": "localhost",
+            "region": "localhost",
+            "country": "localhost",
+            "country_code": None,
+            "postal": None,
+            "latitude": None,
+            "longitude": None,
+            "timezone": None,
+            "accuracy_radius": None,
+            "note": "Private/localhost IP - no geolocation available"
+        }
+
+    db = geoip_db
+    if db is None:
+        return {"ip": ip_address, "error": "GeoIP2 database not loaded"}
+
+    try:
+        geo_cache.ensure_epoch(db.build_epoch)
+        fields = geo_cache.lookup(ip_obj)
+        if fields is None:
+            fields = _lookup_fields(db.reader, ip_address)
+    except Exception as e:
+        return {"ip": ip_address, "error": f"Geolocation lookup failed: {str(e)}"}
+
+    if not fields:
+        return {"ip": ip_address, "error": f"IP address {ip_address} not found in database"}
+    return {"ip": ip_address, **fields}
@@ -0,0 +1,75 @@
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Headers copied into server_signals["http_headers"], in output order. The
+# output field is the header name with "-" replaced by "_".
+KNOWN_HEADERS = [
+    "user-agent", "accept", "accept-language", "accept-encoding", "referer", "cookie", "host",
+    "origin", "connection", "content-type", "content-length", "cache-control", "pragma", "dnt",
+    "upgrade-insecure-requests", "if-modified-since", "if-none-match", "if-match",
+    "if-unmodified-since", "if-range", "range", "sec-fetch-dest", "sec-fetch-mode",
+    "sec-fetch-site", "sec-fetch-user", "sec-gpc", "sec-ch-ua", "sec-ch-ua-mobile",
+    "sec-ch-ua-platform", "sec-ch-ua-arch", "sec-ch-ua-bitness", "sec-ch-ua-full-version",
+    "sec-ch-ua-full-version-list", "sec-ch-ua-model", "sec-ch-ua-platform-version",
+    "sec-ch-ua-wow64", "save-data", "device-memory", "downlink", "ect", "rtt", "viewport-width",
+    "width", "dpr", "sec-ch-prefers-color-scheme", "sec-ch-prefers-reduced-motion",
+    "sec-ch-prefers-reduced-transparency", "authorization", "proxy-authorization",
+    "x-forwarded-for", "x-forwarded-host", "x-forwarded-proto", "x-forwarded-port", "x-real-ip",
+    "x-client-ip", "x-cluster-client-ip", "forwarded", "via", "cf-connecting-ip", "cf-ipcountry",
+    "cf-ray", "cf-visitor", "true-client-ip", "fastly-client-ip", "x-azure-clientip",
+    "x-azure-socketip", "x-requested-with", "x-moz", "x-purpose", "from", "max-forwards", "te",
+    "trailer", "transfer-encoding", "expect",
+]
+
+# Raw (lowercase, as ASGI delivers them) header name bytes -> (decoded name, output field)
+_KNOWN_BY_RAW_NAME = {name.encode("latin-1"): (name, name.replace("-", "_")) for name in KNOWN_HEADERS}
+_FIELD_BY_NAME = {name: field for name, field in _KNOWN_BY_RAW_NAME.values()}
+_EMPTY_FIELDS = dict.fromkeys(field for _, field in _KNOWN_BY_RAW_NAME.values())
+
+
+class HeaderExtraction(NamedTuple):
+    """
+    Everything /collect derives from the request headers, produced by one pass
+    over the raw ASGI header list. `fields` follows request.headers.get()
+    semantics (first occurrence wins); `raw` follows dict(request.headers)
+    (last occurrence wins); `keys` keeps every name in arrival order.
+    """
+    fields: Dict[str, Optional[str]]
+    raw: Dict[str, str]
+    keys: List[str]
+    total_size: int
+
+    def get(self, name: str, default: Any = None) -> Any:
+        """Case-insensitive lookup; first occurrence wins for KNOWN_HEADERS, last otherwise."""
+        name = name.lower()
+        field = _FIELD_BY_NAME.get(name)
+        if field is None:
+            return self.raw.get(name, default)
+        value = self.fields[field]
+        return default if value is None else value
+
+    @property
+    def count(self) -> int:
+        return len(self.keys)
+
+
+def extract_headers(raw_headers: Iterable[Tuple[bytes, bytes]]) -> HeaderExtraction:
+    fields = _EMPTY_FIELDS.copy()
+    raw: Dict[str, str] = {}
+    keys: List[str] = []
+    total_size = 0
+    known = _KNOWN_BY_RAW_NAME
+
+    for raw_name, raw_value in raw_headers:
+        value = raw_value.decode("latin-1")
+        entry = known.get(raw_name)
+        if entry is None:
+            name = raw_name.decode("latin-1")
+        else:
+            name, field = entry
+            if fields[field] is None:
+                fields[field] = value
+        keys.append(name)
+        raw[name] = value
+        total_size += len(name) + len(value)
+
+    return HeaderExtraction(fields, raw, keys, total_size)
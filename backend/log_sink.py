@@ -0,0 +1,225 @@
+import asyncio
+import json
+import os
+import queue
+import sys
+import threading
+from typing import Any, BinaryIO, Dict, List, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Where records go: "stdout", "stderr", "file:<path>" or "none"
+LOG_SINK_TARGET = os.environ.get("LOG_SINK", "stdout")
+LOG_SINK_QUEUE_SIZE = int(os.environ.get("LOG_SINK_QUEUE_SIZE", "10000"))
+LOG_SINK_BATCH_SIZE = int(os.environ.get("LOG_SINK_BATCH_SIZE", "256"))
+LOG_SINK_FLUSH_INTERVAL = float(os.environ.get("LOG_SINK_FLUSH_INTERVAL", "0.5"))
+# What emit() does when the queue is full: drop_newest, drop_oldest or block
+LOG_SINK_POLICY = os.environ.get("LOG_SINK_POLICY", "drop_newest")
+# Upper bound on how long the "block" policy makes a record wait for room
+LOG_SINK_BLOCK_TIMEOUT = float(os.environ.get("LOG_SINK_BLOCK_TIMEOUT", "0.05"))
+LOG_SINK_USE_ORJSON = os.environ.get("LOG_SINK_ORJSON", "1") != "0"
+
+POLICIES = ("drop_newest", "drop_oldest", "block")
+_STOP = object()
+
+
+def encode_record(record: Any, use_orjson: bool = LOG_SINK_USE_ORJSON) -> bytes:
+    """Compact single-line JSON; non-serializable values fall back to str()."""
+    if use_orjson and orjson is not None:
+        return orjson.dumps(record, default=str)
+    return json.dumps(record, separators=(",", ":"), default=str).encode()
+
+
+class StreamWriter:
+    """Writes newline-delimited batches to a binary stream (stdout by default)."""
+
+    def __init__(self, stream: Optional[BinaryIO] = None):
+        self.stream = stream if stream is not None else sys.stdout.buffer
+
+    def write_batch(self, lines: List[bytes]) -> None:
+        self.stream.write(b"\n".join(lines) + b"\n")
+        self.stream.flush()
+
+    def close(self) -> None:
+        self.stream.flush()
+
+
+class FileWriter(StreamWriter):
+    def __init__(self, path: str):
+        super().__init__(open(path, "ab"))
+
+    def close(self) -> None:
+        self.stream.close()
+
+
+class NullWriter:
+    def write_batch(self, lines: List[bytes]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def writer_for(target: str):
+    if target == "stdout":
+        return StreamWriter()
+    if target == "stderr":
+        return StreamWriter(sys.stderr.buffer)
+    if target.startswith("file:"):
+        return FileWriter(target[len("file:"):])
+    if target == "none":
+        return NullWriter()
+    raise ValueError(f"unknown LOG_SINK target: {target!r}")
+
+
+class LogSink:
+    """
+    Non-blocking structured log sink.
+
+    emit() only enqueues the record; a background thread drains the bounded
+    queue in batches, encodes each record as one JSON line and hands the batch
+    to the writer. When the queue is full the configured policy decides whether
+    the new record is dropped, the oldest queued one is dropped, or the caller
+    waits (at most block_timeout seconds) for room. Async handlers call
+    emit_async(), which does that wait in a worker thread so the event loop
+    never stalls.
+    """
+
+    def __init__(self, writer=None, maxsize: int = LOG_SINK_QUEUE_SIZE,
+                 batch_size: int = LOG_SINK_BATCH_SIZE, flush_interval: float = LOG_SINK_FLUSH_INTERVAL,
+                 policy: str = LOG_SINK_POLICY, block_timeout: float = LOG_SINK_BLOCK_TIMEOUT,
+                 use_orjson: bool = LOG_SINK_USE_ORJSON):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown LOG_SINK_POLICY {policy!r}; expected one of {POLICIES}")
+        self.writer = writer if writer is not None else writer_for(LOG_SINK_TARGET)
+        self.queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, maxsize))
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.use_orjson = use_orjson
+        self.emitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.write_errors = 0
+        self.max_depth = 0
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+                self._thread.start()
+
+    def emit(self, record: Any) -> bool:
+        """
+        Queue a record for writing. Returns False if it was dropped. Under the
+        "block" policy this may wait up to block_timeout; on the event loop
+        use emit_async() instead.
+        """
+        if self._thread is None:
+            self.start()
+        self.emitted += 1
+        return self._enqueue(record, self.block_timeout if self.policy == "block" else None)
+
+    async def emit_async(self, record: Any) -> bool:
+        """emit() for async handlers: a "block" wait for room happens in a worker thread, never on the loop."""
+        if self._thread is None:
+            self.start()
+        self.emitted += 1
+        if self.policy == "block":
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                return await asyncio.to_thread(self._enqueue, record, self.block_timeout)
+            self._track_depth()
+            return True
+        return self._enqueue(record, None)
+
+    def _enqueue(self, record: Any, timeout: Optional[float]) -> bool:
+        try:
+            if timeout is not None:
+                self.queue.put(record, timeout=timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            if self.policy != "drop_oldest":
+                self.dropped += 1
+                return False
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+                return False
+        self._track_depth()
+        return True
+
+    def _track_depth(self) -> None:
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(record is _STOP for record in batch)
+            records = [record for record in batch if record is not _STOP]
+            if records:
+                self._write(records)
+            if stop:
+                return
+
+    def _write(self, records: List[Any]) -> None:
+        try:
+            lines = [encode_record(record, self.use_orjson) for record in records]
+            self.writer.write_batch(lines)
+            self.written += len(lines)
+            self.batches += 1
+        except Exception as e:
+            self.write_errors += 1
+            print(f"⚠ Warning: log sink write failed: {e}", file=sys.stderr)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush everything queued so far and stop the writer thread."""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.put(_STOP)
+            self._thread.join(timeout)
+        self._thread = None
+        self.writer.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "target": type(self.writer).__name__,
+            "policy": self.policy,
+            "encoder": "orjson" if self.use_orjson and orjson is not None else "json",
+            "queue_depth": self.queue.qsize(),
+            "queue_max_depth": self.max_depth,
+            "queue_capacity": self.queue.maxsize,
+            "emitted": self.emitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "write_errors": self.write_errors,
+        }
+
+
+log_sink = LogSink()
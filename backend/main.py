@@ -1,20 +1,68 @@
-from fastapi import FastAPI, Request, Response
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Any, Dict, Optional, List
+from pydantic import ValidationError
+from typing import Any, Dict, Optional
 import uvicorn
-import json
+import asyncio
+import os
 import time
-import hashlib
-import socket
-import re
 from datetime import datetime
-import geoip2.database
-import geoip2.errors
-import ipaddress  # NEW
+from body_limits import body_limits
+from caching import all_cache_stats
+from client_hints import CLIENT_HINTS_ROUTES, ClientHintsMiddleware, parse_hint_routes
+from collected_signals import ClientSignals, CollectedSignals, parse_client_signals
+from canvas_store import REFERENCE_PREFIX, canvas_store, record_references
+from log_sink import log_sink
+from metrics import STAGES, MetricsWriter, StageClock
+from ndjson import iter_ndjson
+from server_identity import COLLECTOR_VERSION, get_identity, refresh_identity
+from signal_store import iter_records, signal_store
+from signal_summary import summarize_signals
+from fingerprinting import signal_fingerprints
+from geolocation import database_stats, install_reload_signal, start_database_watcher
+from request_signals import DEFAULT_SIGNAL_SELECTION, build_server_signals, parse_signal_selection, server_signal_registry
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background services for the lifetime of the worker"""
+    await refresh_identity()
+    install_reload_signal()
+    stop_geoip_watcher = start_database_watcher()
+    log_sink.start()
+    if signal_store is not None:
+        signal_store.start()
+    if canvas_store is not None:
+        await asyncio.to_thread(canvas_store.open)
+    if canvas_store is not None and signal_store is not None:
+        # Segments dropped by retention release their canvases; blobs found without
+        # an index entry get their references counted from the stored records
+        signal_store.writer.on_retire = lambda records: canvas_store.release_all(record_references(records))
+        if canvas_store.adopted:
+            await asyncio.to_thread(canvas_store.rebuild_references,
+                                    record_references(iter_records(signal_store.writer.directory)))
+    yield
+    if stop_geoip_watcher:
+        stop_geoip_watcher.set()
+    if signal_store is not None:
+        signal_store.close()
+    log_sink.close()
+
+# Shape of the /collect response: "minimal" (status + ids), "summary" (signal_summary) or "full"
+RESPONSE_MODES = ("minimal", "summary", "full")
+
+def validate_response_mode(mode: str) -> str:
+    """A configured response mode, normalized; a typo fails at startup rather than 400ing every request"""
+    if mode.lower() not in RESPONSE_MODES:
+        raise ValueError(f"unknown COLLECT_RESPONSE_MODE {mode!r}; expected one of {', '.join(RESPONSE_MODES)}")
+    return mode.lower()
+
+COLLECT_RESPONSE_MODE = validate_response_mode(os.environ.get("COLLECT_RESPONSE_MODE", "full"))
 
 # Create FastAPI app instance
-app = FastAPI(title="Maximum Signal Collector", version="2.0.0")
+app = FastAPI(title="Maximum Signal Collector", version=COLLECTOR_VERSION, lifespan=lifespan)
 
 # Configure CORS middleware to allow requests from React frontend
 app.add_middleware(
@@ -26,587 +74,325 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
-# Initialize GeoIP2 Reader (load database once at startup)
-try:
-    geoip_reader = geoip2.database.Reader('./GeoLite2-City.mmdb')
-    print("✓ GeoIP2 database loaded successfully")
-except Exception as e:
-    print(f"⚠ Warning: Could not load GeoIP2 database: {e}")
-    geoip_reader = None
-
-# Pydantic model for comprehensive signal collection
-class CollectedSignals(BaseModel):
-    navigator: Optional[Dict[str, Any]] = None
-    screen: Optional[Dict[str, Any]] = None
-    timezone: Optional[str] = None
-    tzOffsetMin: Optional[int] = None
-    locale: Optional[str] = None
-    performance: Optional[Dict[str, Any]] = None
-    canvasFingerprintDataURL: Optional[str] = None
-    webglRenderer: Optional[Dict[str, Any]] = None
-    computedStyles: Optional[Dict[str, Any]] = None
-    installedFontsDetection: Optional[List[str]] = None
-    audioContextFingerprint: Optional[Dict[str, Any]] = None
-    interaction: Optional[Dict[str, Any]] = None
-    capabilities: Optional[Dict[str, Any]] = None
-    storage: Optional[Dict[str, Any]] = None
-    deviceMotion: Optional[Dict[str, Any]] = None
-    fileUploads: Optional[List[Dict[str, Any]]] = None
-    documentReferrer: Optional[str] = None
-    historyLength: Optional[int] = None
-    previousUrlPath: Optional[str] = None
-    mimeTypes: Optional[List[Dict[str, Any]]] = None
-    plugins: Optional[List[Dict[str, Any]]] = None
-    osHints: Optional[Dict[str, Any]] = None
-    batteryStatus: Optional[Dict[str, Any]] = None
-
-def is_private_ip(ip_str: str) -> bool:
-    try:
-        ip_obj = ipaddress.ip_address(ip_str)
-        return ip_obj.is_private or ip_obj.is_loopback or ip_obj.is_link_local
-    except ValueError:
-        return True
+# Request Client Hints on responses (health checks and monitoring endpoints excepted)
+app.add_middleware(ClientHintsMiddleware, routes=parse_hint_routes(CLIENT_HINTS_ROUTES))
 
-def extract_client_ip(request: Request) -> str:
+def identify_worker(response: Response) -> None:
     """
-    Prefer the first public IP from X-Forwarded-For, then X-Real-IP,
-    falling back to request.client.host.
-    Only trust headers if present (assumes you're using a trusted tunnel/reverse proxy).
+    Counters are per worker process; with several workers behind one socket,
+    each request may land on a different one, so stats responses name theirs
     """
-    xff = request.headers.get("x-forwarded-for", "")
-    if xff:
-        # XFF is a comma-separated list; the first is the original client
-        for part in [p.strip() for p in xff.split(",")]:
-            # Filter out empty/malformed; take first non-private/global IP
-            try:
-                ip_obj = ipaddress.ip_address(part)
-                if not (ip_obj.is_private or ip_obj.is_loopback or ip_obj.is_link_local):
-                    return part
-            except ValueError:
-                continue
-
-    x_real_ip = request.headers.get("x-real-ip")
-    if x_real_ip:
-        try:
-            ip_obj = ipaddress.ip_address(x_real_ip.strip())
-            if not (ip_obj.is_private or ip_obj.is_loopback or ip_obj.is_link_local):
-                return x_real_ip.strip()
-        except ValueError:
-            pass
-
-    return request.client.host
-
-def get_ip_geolocation(ip_address: str) -> Dict[str, Any]:
-    """
-    Get geolocation data from IP address using MaxMind GeoLite2 local database.
-    Returns city, country, coordinates, timezone, etc.
-    """
-    if is_private_ip(ip_address):
-        return {
-            "ip": ip_address,
-            "city": "localhost",
-            "region": "localhost",
-            "country": "localhost",
-            "country_code": None,
-            "postal": None,
-            "latitude": None,
-            "longitude": None,
-            "timezone": None,
-            "accuracy_radius": None,
-            "note": "Private/localhost IP - no geolocation available"
-        }
-
-    if geoip_reader is None:
-        return {"ip": ip_address, "error": "GeoIP2 database not loaded"}
-
-    try:
-        response = geoip_reader.city(ip_address)
-        return {
-            "ip": ip_address,
-            "city": response.city.name,
-            "city_geoname_id": response.city.geoname_id,
-            "region": response.subdivisions.most_specific.name if response.subdivisions else None,
-            "region_code": response.subdivisions.most_specific.iso_code if response.subdivisions else None,
-            "region_geoname_id": response.subdivisions.most_specific.geoname_id if response.subdivisions else None,
-            "country": response.country.name,
-            "country_code": response.country.iso_code,
-            "country_geoname_id": response.country.geoname_id,
-            "continent": response.continent.name,
-            "continent_code": response.continent.code,
-            "postal": response.postal.code,
-            "latitude": response.location.latitude,
-            "longitude": response.location.longitude,
-            "accuracy_radius": response.location.accuracy_radius,
-            "timezone": response.location.time_zone,
-            "metro_code": response.location.metro_code,
-            "is_in_european_union": response.country.is_in_european_union,
-            "registered_country": response.registered_country.name,
-            "registered_country_code": response.registered_country.iso_code,
-        }
-    except geoip2.errors.AddressNotFoundError:
-        return {"ip": ip_address, "error": f"IP address {ip_address} not found in database"}
-    except Exception as e:
-        return {"ip": ip_address, "error": f"Geolocation lookup failed: {str(e)}"}
+    identity = get_identity()
+    response.headers["X-Collector-Worker"] = identity.worker_id
+    response.headers["X-Collector-Pid"] = str(identity.pid)
 
 @app.get("/")
 def health():
     return {"status": "ok"}
 
-@app.middleware("http")
-async def add_client_hints_request(request: Request, call_next):
-    """Middleware to request Client Hints on responses"""
-    response = await call_next(request)
-
-    client_hints = [
-        "Sec-CH-UA", "Sec-CH-UA-Mobile", "Sec-CH-UA-Platform",
-        "Sec-CH-UA-Arch", "Sec-CH-UA-Bitness", "Sec-CH-UA-Model",
-        "Sec-CH-UA-Platform-Version", "Sec-CH-UA-Full-Version-List",
-        "Sec-CH-UA-WoW64", "Device-Memory", "Downlink", "ECT", "RTT",
-        "Save-Data", "Viewport-Width", "Width", "DPR",
-        "Sec-CH-Prefers-Color-Scheme", "Sec-CH-Prefers-Reduced-Motion"
-    ]
-    response.headers["Accept-CH"] = ", ".join(client_hints)
-    response.headers["Critical-CH"] = ", ".join(client_hints[:8])
-
-    return response
-
-@app.post("/collect")
-async def collect_comprehensive_signals(request: Request, client_signals: CollectedSignals):
+@app.get("/stats/cache", dependencies=[Depends(identify_worker)])
+def cache_stats():
+    """Hit/miss/eviction counters for the in-process lookup caches"""
+    return all_cache_stats()
+
+@app.get("/stats/log", dependencies=[Depends(identify_worker)])
+def log_stats():
+    """Log sink queue depth, throughput and dropped-record counts"""
+    return log_sink.stats()
+
+@app.get("/stats/store", dependencies=[Depends(identify_worker)])
+def store_stats():
+    """Signal store queue, segment and fsync counters"""
+    if signal_store is None:
+        return {"enabled": False}
+    return {"enabled": True, **signal_store.stats(), "writer": signal_store.writer.stats()}
+
+@app.get("/stats/canvas", dependencies=[Depends(identify_worker)])
+def canvas_stats():
+    """Canvas blob store size, dedup and eviction counters"""
+    if canvas_store is None:
+        return {"enabled": False}
+    return {"enabled": True, **canvas_store.stats()}
+
+@app.get("/stats/limits", dependencies=[Depends(identify_worker)])
+def limit_stats():
+    """Body and field size limits, with rejected and truncated counts"""
+    return body_limits.stats()
+
+@app.get("/canvas/{digest}")
+def get_canvas(digest: str):
+    """Decoded canvas image behind a sha256:<digest> reference in a record"""
+    blob = canvas_store.get(digest.removeprefix(REFERENCE_PREFIX)) if canvas_store is not None else None
+    if blob is None:
+        raise HTTPException(status_code=404, detail="canvas not found")
+    media_type, data = blob
+    return Response(content=data, media_type=media_type)
+
+@app.get("/stats/signals", dependencies=[Depends(identify_worker)])
+def signal_stats():
+    """Server signal producers: dependencies, call counts and timings"""
+    return {"fields": server_signal_registry.fields(), "default_selection": DEFAULT_SIGNAL_SELECTION,
+            **server_signal_registry.stats()}
+
+@app.get("/stats/server", dependencies=[Depends(identify_worker)])
+def server_stats():
+    """Cached server identity injected into every record"""
+    return get_identity().as_record()
+
+@app.post("/stats/server/refresh", dependencies=[Depends(identify_worker)])
+async def refresh_server_identity():
+    """Re-resolve hostname/FQDN off the event loop, e.g. after a host rename"""
+    return (await refresh_identity()).as_record()
+
+@app.get("/stats/geoip", dependencies=[Depends(identify_worker)])
+def geoip_stats():
+    """Loaded GeoIP database, reload/swap timings and this worker's memory footprint"""
+    return database_stats()
+
+@app.get("/metrics")
+def metrics():
     """
-    Maximum signal collection endpoint - collects everything possible without user permission.
+    Prometheus text exposition: per-stage latency histograms plus cache, queue and store counters.
+    Every value belongs to the worker process that answered; worker and pid labels keep each
+    worker's series separate and monotonic (see serve.py)
+    """
+    identity = get_identity()
+    writer = MetricsWriter({"worker": identity.worker_id, "pid": identity.pid})
+    for stage, histogram in list(STAGES.items()):
+        writer.add_histogram("whoami_stage_duration_seconds", "Time spent in each collection pipeline stage",
+                             histogram, {"stage": stage})
+    for name, stats in all_cache_stats().items():
+        writer.add_stats("whoami_cache", stats, counters=("hits", "misses", "evictions"),
+                         gauges=("size", "maxsize"), labels={"cache": name})
+    sinks = {"log": log_sink, "signal_store": signal_store}
+    for name, sink in sinks.items():
+        if sink is not None:
+            writer.add_stats("whoami_sink", sink.stats(), counters=("emitted", "written", "dropped", "batches", "write_errors"),
+                             gauges=("queue_depth", "queue_max_depth", "queue_capacity"), labels={"sink": name})
+    if signal_store is not None:
+        writer.add_stats("whoami_signal_store", signal_store.writer.stats(),
+                         counters=("records_written", "segments_rotated", "segments_deleted", "fsyncs"))
+    if canvas_store is not None:
+        writer.add_stats("whoami_canvas_store", canvas_store.stats(),
+                         counters=("stored", "deduplicated", "rejected", "evictions", "bytes_saved"),
+                         gauges=("blobs", "total_bytes", "references"))
+    writer.add_stats("whoami_body_limits", body_limits.stats(),
+                     counters=("bodies_rejected", "fields_rejected", "fields_truncated"))
+    geoip = database_stats()
+    writer.add_stats("whoami_geoip", geoip, counters=("reloads",))
+    writer.add_stats("whoami_process_memory", geoip["process_memory"], gauges=("rss", "pss", "shared"))
+    return PlainTextResponse(writer.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+async def record_collection(request_start: float, server_signals: Dict[str, Any],
+                           client_signals: ClientSignals) -> Dict[str, Any]:
+    """
+    Combine server and client signals into one collection record, then hand it
+    to the signal store and log sink.
     """
-    request_start = time.time()
-
-    # Get client IP (honor proxy headers) and perform geolocation lookup
-    client_ip = extract_client_ip(request)
-    geolocation_data = get_ip_geolocation(client_ip)
-
-    server_signals = {
-        "client_ip": client_ip,
-        "client_port": request.client.port if hasattr(request.client, 'port') else None,
-        "geolocation": geolocation_data,
-        "http_method": request.method,
-        "request_path": request.url.path,
-        "query_string": str(request.query_params),
-        "request_timestamp": time.time(),
-        "request_datetime": datetime.utcnow().isoformat(),
-        "url_scheme": request.url.scheme,
-        "url_netloc": request.url.netloc,
-        "url_full": str(request.url),
-        "server_hostname": socket.gethostname(),
-        "server_fqdn": socket.getfqdn(),
-        "request_details": {
-            "url_length": len(str(request.url)),
-            "header_count": len(request.headers),
-            "total_header_size": sum(len(k) + len(v) for k, v in request.headers.items()),
-            "method_is_safe": request.method in ["GET", "HEAD", "OPTIONS"],
-            "is_ajax": request.headers.get("x-requested-with", "").lower() == "xmlhttprequest",
-            "is_prefetch": request.headers.get("x-moz") == "prefetch" or request.headers.get("x-purpose") == "preview",
-            "is_secure": request.url.scheme == "https",
-        },
-        "http_headers": {
-            "user_agent": request.headers.get("user-agent"),
-            "accept": request.headers.get("accept"),
-            "accept_language": request.headers.get("accept-language"),
-            "accept_encoding": request.headers.get("accept-encoding"),
-            "referer": request.headers.get("referer"),
-            "cookie": request.headers.get("cookie"),
-            "host": request.headers.get("host"),
-            "origin": request.headers.get("origin"),
-            "connection": request.headers.get("connection"),
-            "content_type": request.headers.get("content-type"),
-            "content_length": request.headers.get("content-length"),
-            "cache_control": request.headers.get("cache-control"),
-            "pragma": request.headers.get("pragma"),
-            "dnt": request.headers.get("dnt"),
-            "upgrade_insecure_requests": request.headers.get("upgrade-insecure-requests"),
-            "if_modified_since": request.headers.get("if-modified-since"),
-            "if_none_match": request.headers.get("if-none-match"),
-            "if_match": request.headers.get("if-match"),
-            "if_unmodified_since": request.headers.get("if-unmodified-since"),
-            "if_range": request.headers.get("if-range"),
-            "range": request.headers.get("range"),
-            "sec_fetch_dest": request.headers.get("sec-fetch-dest"),
-            "sec_fetch_mode": request.headers.get("sec-fetch-mode"),
-            "sec_fetch_site": request.headers.get("sec-fetch-site"),
-            "sec_fetch_user": request.headers.get("sec-fetch-user"),
-            "sec_gpc": request.headers.get("sec-gpc"),
-            "sec_ch_ua": request.headers.get("sec-ch-ua"),
-            "sec_ch_ua_mobile": request.headers.get("sec-ch-ua-mobile"),
-            "sec_ch_ua_platform": request.headers.get("sec-ch-ua-platform"),
-            "sec_ch_ua_arch": request.headers.get("sec-ch-ua-arch"),
-            "sec_ch_ua_bitness": request.headers.get("sec-ch-ua-bitness"),
-            "sec_ch_ua_full_version": request.headers.get("sec-ch-ua-full-version"),
-            "sec_ch_ua_full_version_list": request.headers.get("sec-ch-ua-full-version-list"),
-            "sec_ch_ua_model": request.headers.get("sec-ch-ua-model"),
-            "sec_ch_ua_platform_version": request.headers.get("sec-ch-ua-platform-version"),
-            "sec_ch_ua_wow64": request.headers.get("sec-ch-ua-wow64"),
-            "save_data": request.headers.get("save-data"),
-            "device_memory": request.headers.get("device-memory"),
-            "downlink": request.headers.get("downlink"),
-            "ect": request.headers.get("ect"),
-            "rtt": request.headers.get("rtt"),
-            "viewport_width": request.headers.get("viewport-width"),
-            "width": request.headers.get("width"),
-            "dpr": request.headers.get("dpr"),
-            "sec_ch_prefers_color_scheme": request.headers.get("sec-ch-prefers-color-scheme"),
-            "sec_ch_prefers_reduced_motion": request.headers.get("sec-ch-prefers-reduced-motion"),
-            "sec_ch_prefers_reduced_transparency": request.headers.get("sec-ch-prefers-reduced-transparency"),
-            "authorization": request.headers.get("authorization"),
-            "proxy_authorization": request.headers.get("proxy-authorization"),
-            "x_forwarded_for": request.headers.get("x-forwarded-for"),
-            "x_forwarded_host": request.headers.get("x-forwarded-host"),
-            "x_forwarded_proto": request.headers.get("x-forwarded-proto"),
-            "x_forwarded_port": request.headers.get("x-forwarded-port"),
-            "x_real_ip": request.headers.get("x-real-ip"),
-            "x_client_ip": request.headers.get("x-client-ip"),
-            "x_cluster_client_ip": request.headers.get("x-cluster-client-ip"),
-            "forwarded": request.headers.get("forwarded"),
-            "via": request.headers.get("via"),
-            "cf_connecting_ip": request.headers.get("cf-connecting-ip"),
-            "cf_ipcountry": request.headers.get("cf-ipcountry"),
-            "cf_ray": request.headers.get("cf-ray"),
-            "cf_visitor": request.headers.get("cf-visitor"),
-            "true_client_ip": request.headers.get("true-client-ip"),
-            "fastly_client_ip": request.headers.get("fastly-client-ip"),
-            "x_azure_clientip": request.headers.get("x-azure-clientip"),
-            "x_azure_socketip": request.headers.get("x-azure-socketip"),
-            "x_requested_with": request.headers.get("x-requested-with"),
-            "x_moz": request.headers.get("x-moz"),
-            "x_purpose": request.headers.get("x-purpose"),
-            "from": request.headers.get("from"),
-            "max_forwards": request.headers.get("max-forwards"),
-            "te": request.headers.get("te"),
-            "trailer": request.headers.get("trailer"),
-            "transfer_encoding": request.headers.get("transfer-encoding"),
-            "expect": request.headers.get("expect"),
-            "user_agent_parsed": parse_user_agent(request.headers.get("user-agent", "")),
-        },
-        "accept_language_parsed": parse_accept_language(request.headers.get("accept-language", "")),
-        "accept_encoding_list": [enc.strip() for enc in request.headers.get("accept-encoding", "").split(",") if enc.strip()],
-        "fingerprints": {
-            "header_order_hash": hashlib.md5(str(list(request.headers.keys())).encode()).hexdigest(),
-            "header_values_hash": hashlib.md5(str(dict(request.headers)).encode()).hexdigest(),
-            "full_request_hash": hashlib.sha256(
-                f"{request.method}{request.url.path}{dict(request.headers)}".encode()
-            ).hexdigest(),
-        },
-        "bot_detection": {
-            "is_bot_likely": is_bot(request.headers.get("user-agent", "")),
-            "bot_patterns_matched": detect_bot_patterns(request.headers.get("user-agent", "")),
-            "has_automation_headers": detect_automation_headers(request.headers),
-        },
-        "all_headers_raw": dict(request.headers),
-    }
-
     response_time_ms = (time.time() - request_start) * 1000
+    user_agent = server_signals["http_headers"]["user_agent"] or ""
+
+    clock = StageClock()
+    client_record = client_signals.model_dump()
+    clock.lap("model_dump")
+    summary = summarize_signals(server_signals, client_record)
+    clock.lap("summary")
+    unique_identifiers = generate_unique_identifiers(server_signals, client_record)
+    clock.lap("identifiers")
+
+    # Identical canvases recur across visits: keep one decoded copy in the blob
+    # store and carry only its digest in the record and response. The store does
+    # disk and index I/O, so it runs in a thread. Without a signal store no record
+    # keeps the reference, and the blob stays evictable
+    canvas = client_record.get("canvasFingerprintDataURL")
+    reference = None
+    if canvas and canvas_store is not None:
+        reference = await asyncio.to_thread(canvas_store.offload, canvas, unique_identifiers["canvas_fingerprint"],
+                                            signal_store is not None)
+        if reference is not None:
+            client_record["canvasFingerprintDataURL"] = reference
+        clock.lap("canvas_offload")
 
     comprehensive_data = {
         "collection_metadata": {
             "timestamp": time.time(),
             "timestamp_iso": datetime.utcnow().isoformat(),
             "response_time_ms": response_time_ms,
-            "collection_version": "2.0.0",
-            "collector_type": "maximum_signals"
+            "collection_version": COLLECTOR_VERSION,
+            "collector_type": "maximum_signals",
+            "server_identity": get_identity().as_record(),
         },
         "server_signals": server_signals,
-        "client_signals": client_signals.dict(),
+        "client_signals": client_record,
         "signal_summary": {
-            "total_server_signals": count_non_null_values(server_signals),
-            "total_client_signals": count_non_null_values(client_signals.dict()),
-            "collection_completeness": calculate_completeness(client_signals.dict()),
-            "unique_identifiers": generate_unique_identifiers(server_signals, client_signals.dict())
+            "total_server_signals": summary.total_server_signals,
+            "total_client_signals": summary.total_client_signals,
+            "collection_completeness": summary.collection_completeness,
+            "unique_identifiers": unique_identifiers
         }
     }
 
-    print("=" * 100)
-    print("MAXIMUM SIGNAL COLLECTION COMPLETE")
-    print("=" * 100)
-    print(f"Collection Time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Response Time: {response_time_ms:.2f}ms")
-    print(f"Client IP: {client_ip}")
-    print(f"Geo lookup raw: {geolocation_data}")  # ALWAYS show raw result
-
-    # Print geolocation info if available
-    if isinstance(geolocation_data, dict) and geolocation_data.get("city") is not None:
-        print(f"Location: {geolocation_data.get('city')}, {geolocation_data.get('region')}, {geolocation_data.get('country')}")
-        print(f"Coordinates: {geolocation_data.get('latitude')}, {geolocation_data.get('longitude')}")
-        print(f"Timezone: {geolocation_data.get('timezone')}")
-
-    print(f"User Agent: {request.headers.get('user-agent', 'Unknown')[:100]}...")
-    print(f"Bot Detection: {server_signals['bot_detection']['is_bot_likely']}")
-    print("-" * 100)
-
-    signal_categories = {
-        "Network/HTTP": len(server_signals.get('http_headers', {})),
-        "Geolocation": count_non_null_values(geolocation_data),
-        "Navigator/Device": count_non_null_values(client_signals.navigator),
-        "Screen/Viewport": count_non_null_values(client_signals.screen),
-        "Performance": count_non_null_values(client_signals.performance),
-        "Graphics/Fingerprinting": sum([
-            1 if client_signals.canvasFingerprintDataURL else 0,
-            count_non_null_values(client_signals.webglRenderer),
-            len(client_signals.installedFontsDetection or [])
-        ]),
-        "Interaction/Behavior": count_non_null_values(client_signals.interaction),
-        "Capabilities": count_non_null_values(client_signals.capabilities),
-        "Storage": count_non_null_values(client_signals.storage),
-        "Device Motion": count_non_null_values(client_signals.deviceMotion)
-    }
-
-    for category, count in signal_categories.items():
-        if count:
-            print(f"{category}: {count} signals collected")
+    if signal_store is not None:
+        if not await signal_store.emit_async(comprehensive_data) and reference is not None:
+            # Dropped on a full queue: the reference it held goes with it
+            await asyncio.to_thread(canvas_store.release, unique_identifiers["canvas_fingerprint"])
+        clock.lap("signal_store")
 
-    print("-" * 100)
-    print("FULL DATA DUMP:")
-    print(json.dumps(comprehensive_data, indent=2, default=str))
-    print("=" * 100)
+    # Structured record for the background log sink; serialized off the event loop
+    await log_sink.emit_async({
+        "event": "signal_collection",
+        "collected_at": datetime.utcnow().isoformat(),
+        "response_time_ms": response_time_ms,
+        "client_ip": server_signals["client_ip"],
+        "user_agent": user_agent[:100],
+        "is_bot_likely": server_signals.get("bot_detection", {}).get("is_bot_likely"),
+        "signal_categories": {category: count for category, count in summary.signal_categories.items() if count},
+        "data": comprehensive_data,
+    })
+    clock.lap("log_sink")
+
+    return comprehensive_data
+
+def resolve_response_mode(request: Request, requested: Optional[str]) -> str:
+    """Response shape from ?response=, then the X-Response-Mode header, then COLLECT_RESPONSE_MODE"""
+    mode = (requested or request.headers.get("x-response-mode") or COLLECT_RESPONSE_MODE).lower()
+    if mode not in RESPONSE_MODES:
+        raise HTTPException(status_code=400, detail=f"response mode must be one of {', '.join(RESPONSE_MODES)}")
+    return mode
+
+def resolve_signal_selection(requested: Optional[str]) -> Optional[tuple]:
+    """Server signals to compute: ?signals= when given, else the SERVER_SIGNALS default"""
+    if requested is None:
+        return DEFAULT_SIGNAL_SELECTION
+    try:
+        return parse_signal_selection(requested)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return {
+def timed_json_response(content: Dict[str, Any], endpoint_start: float, stage: str) -> JSONResponse:
+    """
+    Render the body here rather than in FastAPI so serialization is timed as a
+    stage, then record the endpoint's total time (handler start to rendered body).
+    """
+    clock = StageClock()
+    rendered = JSONResponse(content)
+    clock.lap("serialization")
+    StageClock(endpoint_start).lap(stage)
+    return rendered
+
+def shape_collect_response(mode: str, comprehensive_data: Dict[str, Any]) -> Dict[str, Any]:
+    response = {
         "status": "success",
         "message": "Maximum signal collection completed",
         "response_status": 200,
-        "response_time_ms": response_time_ms,
-        "data": comprehensive_data
+        "response_time_ms": comprehensive_data["collection_metadata"]["response_time_ms"],
     }
+    identifiers = comprehensive_data["signal_summary"]["unique_identifiers"]
+    if mode == "minimal":
+        response["session_id"] = identifiers["session_id"]
+        response["combined_fingerprint"] = identifiers["combined_fingerprint"]
+    elif mode == "summary":
+        response["signal_summary"] = comprehensive_data["signal_summary"]
+    else:
+        response["data"] = comprehensive_data
+    return response
 
-def parse_user_agent(user_agent: str) -> Dict[str, Any]:
-    ua_lower = user_agent.lower()
-    parsed = {
-        "raw": user_agent,
-        "length": len(user_agent),
-        "os": "unknown",
-        "os_version": None,
-        "browser": "unknown",
-        "browser_version": None,
-        "is_mobile": False,
-        "is_tablet": False,
-        "is_bot": False,
-        "device_type": "desktop",
-        "engine": "unknown"
-    }
+def request_validation_error(error: ValidationError) -> RequestValidationError:
+    """FastAPI's 422 for a body validated in the handler, with the usual body-prefixed error locations"""
+    return RequestValidationError([{**e, "loc": ("body", *e["loc"])} for e in error.errors(include_url=False)])
 
-    if "windows nt 10.0" in ua_lower:
-        parsed["os"] = "windows"
-        parsed["os_version"] = "10"
-    elif "windows nt 6.3" in ua_lower:
-        parsed["os"] = "windows"
-        parsed["os_version"] = "8.1"
-    elif "windows nt 6.2" in ua_lower:
-        parsed["os"] = "windows"
-        parsed["os_version"] = "8"
-    elif "windows nt 6.1" in ua_lower:
-        parsed["os"] = "windows"
-        parsed["os_version"] = "7"
-    elif "windows" in ua_lower:
-        parsed["os"] = "windows"
-    elif "mac os x" in ua_lower:
-        parsed["os"] = "macos"
-        mac_version = re.search(r'mac os x (\d+[._]\d+[._]?\d*)', ua_lower)
-        if mac_version:
-            parsed["os_version"] = mac_version.group(1).replace('_', '.')
-    elif "linux" in ua_lower and "android" not in ua_lower:
-        parsed["os"] = "linux"
-    elif "android" in ua_lower:
-        parsed["os"] = "android"
-        parsed["is_mobile"] = True
-        android_version = re.search(r'android (\d+\.?\d*)', ua_lower)
-        if android_version:
-            parsed["os_version"] = android_version.group(1)
-    elif "iphone" in ua_lower or "ipad" in ua_lower:
-        parsed["os"] = "ios"
-        ios_version = re.search(r'os (\d+[._]\d+[._]?\d*)', ua_lower)
-        if ios_version:
-            parsed["os_version"] = ios_version.group(1).replace('_', '.')
-
-    if "edg/" in ua_lower or "edge/" in ua_lower:
-        parsed["browser"] = "edge"
-        edge_version = re.search(r'edg[e]?/(\d+\.?\d*)', ua_lower)
-        if edge_version:
-            parsed["browser_version"] = edge_version.group(1)
-    elif "chrome/" in ua_lower and "edg" not in ua_lower:
-        parsed["browser"] = "chrome"
-        chrome_version = re.search(r'chrome/(\d+\.?\d*)', ua_lower)
-        if chrome_version:
-            parsed["browser_version"] = chrome_version.group(1)
-    elif "firefox/" in ua_lower:
-        parsed["browser"] = "firefox"
-        firefox_version = re.search(r'firefox/(\d+\.?\d*)', ua_lower)
-        if firefox_version:
-            parsed["browser_version"] = firefox_version.group(1)
-    elif "safari/" in ua_lower and "chrome" not in ua_lower:
-        parsed["browser"] = "safari"
-        safari_version = re.search(r'version/(\d+\.?\d*)', ua_lower)
-        if safari_version:
-            parsed["browser_version"] = safari_version.group(1)
-    elif "opera" in ua_lower or "opr/" in ua_lower:
-        parsed["browser"] = "opera"
-        opera_version = re.search(r'(?:opera|opr)/(\d+\.?\d*)', ua_lower)
-        if opera_version:
-            parsed["browser_version"] = opera_version.group(1)
-
-    if "gecko" in ua_lower and "like gecko" not in ua_lower:
-        parsed["engine"] = "gecko"
-    elif "webkit" in ua_lower:
-        parsed["engine"] = "webkit"
-    elif "trident" in ua_lower:
-        parsed["engine"] = "trident"
-    elif "blink" in ua_lower:
-        parsed["engine"] = "blink"
-
-    if "mobile" in ua_lower or "android" in ua_lower and "mobile" in ua_lower:
-        parsed["is_mobile"] = True
-        parsed["device_type"] = "mobile"
-    if "tablet" in ua_lower or "ipad" in ua_lower:
-        parsed["is_tablet"] = True
-        parsed["device_type"] = "tablet"
-
-    parsed["is_bot"] = is_bot(user_agent)
-
-    return parsed
-
-def parse_accept_language(accept_language: str) -> List[Dict[str, Any]]:
-    if not accept_language:
-        return []
-
-    languages = []
-    parts = accept_language.split(",")
-
-    for part in parts:
-        part = part.strip()
-        if ";q=" in part:
-            lang, quality = part.split(";q=")
-            languages.append({
-                "language": lang.strip(),
-                "quality": float(quality.strip()),
-            })
-        else:
-            languages.append({
-                "language": part,
-                "quality": 1.0,
-            })
-
-    languages.sort(key=lambda x: x["quality"], reverse=True)
-    return languages
-
-def is_bot(user_agent: str) -> bool:
-    if not user_agent:
-        return False
-
-    ua_lower = user_agent.lower()
-    bot_indicators = [
-        'bot', 'crawler', 'spider', 'scraper', 'curl', 'wget', 'python',
-        'java', 'http', 'headless', 'phantom', 'selenium', 'puppeteer',
-        'slurp', 'facebook', 'twitter', 'linkedinbot', 'whatsapp',
-        'telegram', 'discord', 'slack', 'google', 'bing', 'yahoo',
-        'baidu', 'yandex', 'duckduck', 'archive', 'scrapy'
-    ]
-
-    return any(indicator in ua_lower for indicator in bot_indicators)
-
-def detect_bot_patterns(user_agent: str) -> List[str]:
-    if not user_agent:
-        return []
-
-    ua_lower = user_agent.lower()
-    patterns = {
-        'googlebot': 'Google Bot',
-        'bingbot': 'Bing Bot',
-        'slurp': 'Yahoo Bot',
-        'duckduckbot': 'DuckDuckGo Bot',
-        'baiduspider': 'Baidu Spider',
-        'yandexbot': 'Yandex Bot',
-        'facebookexternalhit': 'Facebook Bot',
-        'twitterbot': 'Twitter Bot',
-        'linkedinbot': 'LinkedIn Bot',
-        'whatsapp': 'WhatsApp',
-        'telegrambot': 'Telegram Bot',
-        'discordbot': 'Discord Bot',
-        'slackbot': 'Slack Bot',
-        'curl': 'cURL',
-        'wget': 'Wget',
-        'python': 'Python Script',
-        'java': 'Java Client',
-        'selenium': 'Selenium',
-        'puppeteer': 'Puppeteer',
-        'playwright': 'Playwright',
-        'headless': 'Headless Browser',
-        'phantom': 'PhantomJS',
-    }
+# The body is read and validated in the handler (see BODY_VALIDATION), so document it explicitly
+COLLECT_REQUEST_BODY = {"requestBody": {"required": True, "content": {
+    "application/json": {"schema": CollectedSignals.model_json_schema()}}}}
 
-    matched = []
-    for pattern, name in patterns.items():
-        if pattern in ua_lower:
-            matched.append(name)
-
-    return matched
-
-def detect_automation_headers(headers: Dict) -> bool:
-    automation_indicators = [
-        headers.get("x-requested-with") == "XMLHttpRequest",
-        "headless" in headers.get("user-agent", "").lower(),
-        "selenium" in headers.get("user-agent", "").lower(),
-        "puppeteer" in headers.get("user-agent", "").lower(),
-        "playwright" in headers.get("user-agent", "").lower(),
-        headers.get("sec-ch-ua") and "Headless" in headers.get("sec-ch-ua", ""),
-    ]
-
-    return any(automation_indicators)
-
-def count_non_null_values(data: Any) -> int:
-    if isinstance(data, dict):
-        count = 0
-        for value in data.values():
-            if value is not None:
-                if isinstance(value, (dict, list)):
-                    count += count_non_null_values(value)
-                else:
-                    count += 1
-        return count
-    elif isinstance(data, list):
-        return sum(1 for item in data if item is not None)
-    else:
-        return 1 if data is not None else 0
-
-def calculate_completeness(client_signals: Dict[str, Any]) -> Dict[str, float]:
-    categories = {
-        "navigator": client_signals.get("navigator", {}),
-        "screen": client_signals.get("screen", {}),
-        "performance": client_signals.get("performance", {}),
-        "interaction": client_signals.get("interaction", {}),
-        "capabilities": client_signals.get("capabilities", {}),
-        "storage": client_signals.get("storage", {})
-    }
+@app.post("/collect", openapi_extra=COLLECT_REQUEST_BODY)
+async def collect_comprehensive_signals(request: Request, response: Optional[str] = None,
+                                        signals: Optional[str] = None):
+    """
+    Maximum signal collection endpoint - collects everything possible without user permission.
+    The body is a CollectedSignals object; bodies over COLLECT_MAX_BODY_BYTES get 413.
+    `response` (or the X-Response-Mode header) selects minimal, summary or full output;
+    `signals` ("all" or comma-separated field names) selects the server signals computed.
+    """
+    request_start = time.time()
+    endpoint_start = time.perf_counter()
+    clock = StageClock(endpoint_start)
+    body = await body_limits.read_body(request)
+    # Upload and network time, kept apart so body_validation is decode and validation only
+    clock.lap("body_read")
+    try:
+        client_signals = parse_client_signals(body)
+    except ValidationError as e:
+        raise request_validation_error(e)
+    clock.lap("body_validation")
+    mode = resolve_response_mode(request, response)
+    server_signals = build_server_signals(request, resolve_signal_selection(signals))
+    try:
+        comprehensive_data = await record_collection(request_start, server_signals, client_signals)
+    except ValidationError as e:
+        # Deferred item checks of a lazily validated body (BODY_VALIDATION=lazy)
+        raise request_validation_error(e)
 
-    completeness = {}
-    for category, data in categories.items():
-        if data:
-            total_possible = len(data) if isinstance(data, dict) else 1
-            collected = count_non_null_values(data)
-            completeness[category] = (collected / total_possible) * 100 if total_possible > 0 else 0
+    return timed_json_response(shape_collect_response(mode, comprehensive_data), endpoint_start, "collect")
 
-    return completeness
+@app.post("/collect/batch")
+async def collect_batch(request: Request, signals: Optional[str] = None):
+    """
+    Batch ingestion for load tests and replay tooling. The body is NDJSON, one
+    CollectedSignals object per line, validated and processed as it streams in.
+    Request-derived server signals (IP, geolocation, headers, UA parsing) are
+    computed once and shared by every record in the batch. A body over
+    BATCH_MAX_BODY_BYTES fails with 413 when the limit is crossed; records
+    before that point have already been stored.
+    """
+    batch_start = time.time()
+    endpoint_start = time.perf_counter()
+    server_signals = build_server_signals(request, resolve_signal_selection(signals))
+    results = []
+    accepted = 0
+
+    async for index, line in iter_ndjson(body_limits.stream(request, body_limits.max_batch_bytes)):
+        record_start = time.time()
+        if line is None:
+            results.append({"index": index, "status": "error", "error": "line exceeds maximum length"})
+            continue
+        try:
+            client_signals = parse_client_signals(line)
+            comprehensive_data = await record_collection(record_start, server_signals, client_signals)
+        except ValidationError as e:
+            errors = e.errors()
+            first = errors[0] if errors else {"loc": (), "msg": str(e)}
+            location = ".".join(str(part) for part in first["loc"]) or "body"
+            results.append({"index": index, "status": "error",
+                            "error": f"{len(errors)} validation error(s); {location}: {first['msg']}"})
+            continue
+        results.append({"index": index, "status": "ok",
+                        "session_id": comprehensive_data["signal_summary"]["unique_identifiers"]["session_id"]})
+        accepted += 1
+
+    return timed_json_response({
+        "status": "success",
+        "records": len(results),
+        "accepted": accepted,
+        "rejected": len(results) - accepted,
+        "response_time_ms": (time.time() - batch_start) * 1000,
+        "results": results,
+    }, endpoint_start, "collect_batch")
 
 def generate_unique_identifiers(server_signals: Dict, client_signals: Dict) -> Dict[str, str]:
-    ua = server_signals.get('http_headers', {}).get('user_agent', '')
-    accept_lang = server_signals.get('http_headers', {}).get('accept_language', '')
-    accept_enc = server_signals.get('http_headers', {}).get('accept_encoding', '')
-    canvas = client_signals.get('canvasFingerprintDataURL', '')
-    webgl_renderer = str(client_signals.get('webglRenderer', {}))
-    screen_info = str(client_signals.get('screen', {}))
-    navigator_info = str(client_signals.get('navigator', {}))
-    combined = f"{ua}|{accept_lang}|{accept_enc}|{canvas}|{webgl_renderer}|{screen_info}|{navigator_info}"
-
-    return {
-        "basic_fingerprint": hashlib.md5(f"{ua}{accept_lang}".encode()).hexdigest(),
-        "canvas_fingerprint": hashlib.sha256(canvas.encode()).hexdigest() if canvas else None,
-        "webgl_fingerprint": hashlib.sha256(webgl_renderer.encode()).hexdigest(),
-        "screen_fingerprint": hashlib.sha256(screen_info.encode()).hexdigest(),
-        "combined_fingerprint": hashlib.sha256(combined.encode()).hexdigest(),
-        "session_id": hashlib.sha256(f"{combined}{time.time()}".encode()).hexdigest()[:32]
-    }
+    http_headers = server_signals.get('http_headers', {})
+    return signal_fingerprints(
+        ua=http_headers.get('user_agent', ''),
+        accept_lang=http_headers.get('accept_language', ''),
+        accept_enc=http_headers.get('accept_encoding', ''),
+        canvas=client_signals.get('canvasFingerprintDataURL', ''),
+        webgl_renderer=client_signals.get('webglRenderer', {}),
+        screen_info=client_signals.get('screen', {}),
+        navigator_info=client_signals.get('navigator', {}),
+        now=time.time(),
+    )
 
 if __name__ == "__main__":
+    # Single-process development server with reload; production runs `python serve.py`
     # Enable proxy headers here as well when running directly
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True, proxy_headers=True)
\ No newline at end of file
@@ -0,0 +1,137 @@
+import os
+from bisect import bisect_left
+from collections import OrderedDict
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Per-stage latency histograms (signal producers, summary, hashing, storage,
+# serialization); "0" turns every stage timer into a no-op
+STAGE_TIMING = os.environ.get("STAGE_TIMING", "1") != "0"
+
+# Upper bounds in seconds, 5us .. 1s
+LATENCY_BUCKETS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+)
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram. observe() is one bisect and a few
+    increments, cheap enough for every request; counters are not locked,
+    like the other in-process counters.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "max")
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, cumulative count) pairs, ending with +Inf."""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            pairs.append((repr(bound), running))
+        pairs.append(("+Inf", running + self.counts[-1]))
+        return pairs
+
+
+# Every pipeline stage observed in this process, by name
+STAGES: Dict[str, Histogram] = {}
+
+
+def stage_histogram(name: str) -> Histogram:
+    histogram = STAGES.get(name)
+    if histogram is None:
+        histogram = STAGES.setdefault(name, Histogram())
+    return histogram
+
+
+class StageClock:
+    """
+    Times consecutive pipeline stages: each lap(stage) records the time since
+    the previous lap (or since the clock was created) under that stage.
+    """
+
+    __slots__ = ("last",)
+
+    def __init__(self, start: Optional[float] = None):
+        self.last = perf_counter() if start is None else start
+
+    def lap(self, stage: str) -> None:
+        if STAGE_TIMING:
+            now = perf_counter()
+            (STAGES.get(stage) or stage_histogram(stage)).observe(now - self.last)
+            self.last = now
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class MetricsWriter:
+    """
+    Collects metric families and renders them in the Prometheus text exposition
+    format. `labels` are added to every series, e.g. to tell worker processes apart.
+    """
+
+    def __init__(self, labels: Optional[Dict[str, Any]] = None):
+        self._families: "OrderedDict[str, Tuple[str, str, List[str]]]" = OrderedDict()
+        self.labels = dict(labels or {})
+
+    def _family(self, name: str, kind: str, help_text: str) -> List[str]:
+        if name not in self._families:
+            self._families[name] = (kind, help_text, [])
+        return self._families[name][2]
+
+    def add(self, name: str, kind: str, help_text: str, value: Any, labels: Optional[Dict[str, Any]] = None) -> None:
+        if value is None or isinstance(value, str):
+            return
+        number = int(value) if isinstance(value, (bool, int)) else float(value)
+        self._family(name, kind, help_text).append(f"{name}{_labels({**self.labels, **(labels or {})})} {number!r}")
+
+    def add_stats(self, prefix: str, stats: Dict[str, Any], counters: Iterable[str] = (),
+                  gauges: Iterable[str] = (), labels: Optional[Dict[str, Any]] = None) -> None:
+        """Export selected numeric fields of a stats() dict as counters (`_total`) and gauges."""
+        for field in counters:
+            self.add(f"{prefix}_{field}_total", "counter", f"{prefix} {field}", stats.get(field), labels)
+        for field in gauges:
+            self.add(f"{prefix}_{field}", "gauge", f"{prefix} {field}", stats.get(field), labels)
+
+    def add_histogram(self, name: str, help_text: str, histogram: Histogram,
+                      labels: Optional[Dict[str, Any]] = None) -> None:
+        lines = self._family(name, "histogram", help_text)
+        labels = {**self.labels, **(labels or {})}
+        for le, count in histogram.cumulative():
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum!r}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+    def render(self) -> str:
+        out = []
+        for name, (kind, help_text, lines) in self._families.items():
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+        return "\n".join(out) + "\n"
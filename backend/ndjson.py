@@ -0,0 +1,51 @@
+import os
+from typing import AsyncIterator, Optional, Tuple
+
+# Longest accepted NDJSON line; longer lines are skipped and reported as errors
+NDJSON_MAX_LINE_BYTES = int(os.environ.get("NDJSON_MAX_LINE_BYTES", str(8 * 1024 * 1024)))
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes],
+                      max_line_bytes: int = NDJSON_MAX_LINE_BYTES) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Split a streamed body into (index, line) pairs as chunks arrive, so at most
+    one partial line is buffered. Blank lines are skipped; a line longer than
+    max_line_bytes is discarded and yielded as (index, None).
+    """
+    buffer = bytearray()
+    index = 0
+    overflow = False
+
+    async for chunk in chunks:
+        start = 0
+        while True:
+            newline = chunk.find(b"\n", start)
+            if newline == -1:
+                if not overflow:
+                    buffer += chunk[start:]
+                    if len(buffer) > max_line_bytes:
+                        buffer.clear()
+                        overflow = True
+                break
+            if overflow:
+                overflow = False
+                yield index, None
+                index += 1
+            else:
+                buffer += chunk[start:newline]
+                line = bytes(buffer).strip()
+                buffer.clear()
+                if len(line) > max_line_bytes:
+                    yield index, None
+                    index += 1
+                elif line:
+                    yield index, line
+                    index += 1
+            start = newline + 1
+
+    if overflow:
+        yield index, None
+    else:
+        line = bytes(buffer).strip()
+        if line:
+            yield index, line if len(line) <= max_line_bytes else None
@@ -0,0 +1,259 @@
+"""
+Re-run the server-side signal processing over stored collection records,
+offline, so changes to bot patterns, user agent parsing or header
+fingerprinting can be applied to past traffic.
+
+Each record's request is rebuilt from its stored raw headers, method, path
+and client address, and the selected server signals are recomputed by the
+same producers /collect uses, without HTTP. The recomputed fields replace
+the stored ones, the signal summary is recounted to match, and every record
+is written out again, changed or not. Records
+stored without all_headers_raw cannot be replayed and are passed through
+as they are.
+
+Input is streamed in chunks to a pool of worker processes, with a bounded
+number of chunks in flight, so memory stays flat however large the input is.
+Output keeps input order.
+
+    python replay.py --out replayed.jsonl.gz
+    python replay.py --input capture.jsonl.gz --signals bot_detection --workers 4 --out bots.jsonl
+
+Only fields derived from the request itself are meaningful to replay;
+timestamps and server identity would describe the replay, not the request.
+"""
+import argparse
+import gzip
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from collections import Counter, deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from starlette.requests import Request
+
+from log_sink import encode_record
+from request_signals import build_server_signals, parse_signal_selection
+from signal_store import SIGNAL_STORE_DIR, SqliteSegmentWriter, list_segments
+from signal_summary import summarize_signals
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fields recomputed by default: everything that depends on parsing and matching rules
+REPLAY_SIGNALS = ("http_headers", "accept_language_parsed", "accept_encoding_list", "fingerprints", "bot_detection")
+DEFAULT_CHUNK_RECORDS = 512
+
+# Set in each worker by _init_worker
+_fields: Tuple[str, ...] = ()
+_selection: Optional[Tuple[str, ...]] = None
+
+
+def _loads(line: bytes) -> Any:
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+def iter_lines(paths: Iterable[str]) -> Iterator[bytes]:
+    """Raw JSON records from JSONL files (plain or .gz) and signal store segments, without decoding them."""
+    for path in paths:
+        if path.endswith(SqliteSegmentWriter.suffix):
+            db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                for (record,) in db.execute("SELECT record FROM signals ORDER BY id"):
+                    yield record.encode() if isinstance(record, str) else record
+            finally:
+                db.close()
+            continue
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            try:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        yield line
+            except (EOFError, gzip.BadGzipFile):
+                # A segment still being written ends mid-stream
+                continue
+
+
+def iter_chunks(lines: Iterable[bytes], size: int) -> Iterator[List[bytes]]:
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def replay_scope(server_signals: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """ASGI scope of the stored request, or None when its raw headers were not recorded."""
+    raw_headers = server_signals.get("all_headers_raw")
+    if not isinstance(raw_headers, dict):
+        return None
+    scheme = server_signals.get("url_scheme") or "https"
+    host, _, port = (server_signals.get("url_netloc") or "").partition(":")
+    return {
+        "type": "http",
+        "method": server_signals.get("http_method") or "POST",
+        "path": server_signals.get("request_path") or "/collect",
+        "query_string": (server_signals.get("query_string") or "").encode("latin-1", "replace"),
+        "scheme": scheme,
+        "server": (host, int(port) if port.isdigit() else 443 if scheme == "https" else 80),
+        "client": (server_signals.get("client_ip") or "", server_signals.get("client_port") or 0),
+        "headers": [(name.encode("latin-1", "replace"), str(value).encode("latin-1", "replace"))
+                    for name, value in raw_headers.items()],
+    }
+
+
+def replay_record(record: Dict[str, Any], fields: Tuple[str, ...],
+                  selection: Optional[Tuple[str, ...]]) -> Optional[List[str]]:
+    """
+    Recompute `fields` of one record in place, then its signal summary.
+    Accepts a comprehensive_data dict or a log-sink record wrapping it.
+    Returns the names of the fields whose value changed, or None if the
+    record cannot be replayed.
+    """
+    data = record["data"] if "data" in record and "server_signals" not in record else record
+    server_signals = data.get("server_signals") if isinstance(data, dict) else None
+    scope = replay_scope(server_signals) if isinstance(server_signals, dict) else None
+    if scope is None:
+        return None
+
+    fresh = build_server_signals(Request(scope), selection)
+    changed = []
+    for name in fields:
+        # Through JSON, so tuples and read-only dicts compare like the stored lists and dicts
+        value = _loads(encode_record(fresh[name]))
+        if server_signals.get(name) != value:
+            changed.append(name)
+        server_signals[name] = value
+    if data is not record and "bot_detection" in fields and "is_bot_likely" in record:
+        record["is_bot_likely"] = server_signals["bot_detection"].get("is_bot_likely")
+    refresh_summary(record, data)
+    return changed
+
+
+def refresh_summary(record: Dict[str, Any], data: Dict[str, Any]) -> None:
+    """Recount signal_summary (and a log-sink record's signal_categories) over the replayed server signals."""
+    summary = data.get("signal_summary")
+    client_signals = data.get("client_signals")
+    if not isinstance(summary, dict) or not isinstance(client_signals, dict):
+        return
+    fresh = summarize_signals(data["server_signals"], client_signals)
+    summary["total_server_signals"] = fresh.total_server_signals
+    summary["total_client_signals"] = fresh.total_client_signals
+    summary["collection_completeness"] = fresh.collection_completeness
+    if data is not record and "signal_categories" in record:
+        record["signal_categories"] = {category: count for category, count in fresh.signal_categories.items() if count}
+
+
+def _init_worker(fields: Tuple[str, ...]) -> None:
+    global _fields, _selection
+    _fields = fields
+    _selection = parse_signal_selection(",".join(fields))
+
+
+def replay_chunk(lines: List[bytes]) -> Tuple[List[bytes], Dict[str, Any]]:
+    """
+    Replay one chunk of raw records; returns the output lines and the chunk's
+    counters. Lines that are not JSON objects are dropped; a record whose
+    replay fails is written out unchanged. Both count as errors.
+    """
+    out = []
+    stats: Dict[str, Any] = {"records": 0, "changed": 0, "skipped": 0, "errors": 0, "by_field": Counter()}
+    for line in lines:
+        try:
+            record = _loads(line)
+        except ValueError:
+            stats["errors"] += 1
+            continue
+        if not isinstance(record, dict):
+            stats["errors"] += 1
+            continue
+        stats["records"] += 1
+        try:
+            changed = replay_record(record, _fields, _selection)
+        except Exception:
+            stats["errors"] += 1
+            out.append(line + b"\n")
+            continue
+        if changed is None:
+            stats["skipped"] += 1
+        elif changed:
+            stats["changed"] += 1
+            stats["by_field"].update(changed)
+        out.append(encode_record(record) + b"\n")
+    return out, stats
+
+
+def replay(lines: Iterable[bytes], out_path: str, fields: Tuple[str, ...] = REPLAY_SIGNALS,
+           workers: int = os.cpu_count() or 1, chunk_records: int = DEFAULT_CHUNK_RECORDS) -> Dict[str, Any]:
+    """Replay `lines` into `out_path` (gzip if it ends in .gz) and return the totals."""
+    totals: Dict[str, Any] = {"records": 0, "changed": 0, "skipped": 0, "errors": 0, "by_field": Counter()}
+    opener = gzip.open if out_path.endswith(".gz") else open
+
+    with opener(out_path, "wb") as out:
+        def write(result: Tuple[List[bytes], Dict[str, Any]]) -> None:
+            output, stats = result
+            out.writelines(output)
+            for key, value in stats.items():
+                totals[key] += value
+
+        chunks = iter_chunks(lines, chunk_records)
+        if workers <= 1:
+            _init_worker(fields)
+            for chunk in chunks:
+                write(replay_chunk(chunk))
+            return totals
+
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(fields,)) as pool:
+            # Pool.imap would read ahead without bound; cap the chunks in flight instead
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(replay_chunk, (chunk,)))
+                if len(pending) >= workers * 2:
+                    write(pending.popleft().get())
+            while pending:
+                write(pending.popleft().get())
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Recompute server signals of stored records offline")
+    parser.add_argument("--input", nargs="*", help="JSONL files to read (default: the signal store)")
+    parser.add_argument("--store-dir", default=SIGNAL_STORE_DIR, help="signal store directory")
+    parser.add_argument("--out", required=True, help="output JSONL file (.gz to compress)")
+    parser.add_argument("--signals", default=",".join(REPLAY_SIGNALS), help="comma-separated fields to recompute")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes; 1 runs inline")
+    parser.add_argument("--chunk-records", type=int, default=DEFAULT_CHUNK_RECORDS)
+    args = parser.parse_args(argv)
+
+    fields = tuple(dict.fromkeys(name.strip() for name in args.signals.split(",") if name.strip()))
+    if not fields:
+        parser.error("--signals names no fields")
+    try:
+        parse_signal_selection(",".join(fields))
+    except ValueError as e:
+        parser.error(str(e))
+
+    lines = iter_lines(args.input if args.input else list_segments(args.store_dir))
+    start = time.perf_counter()
+    totals = replay(lines, args.out, fields, max(1, args.workers), max(1, args.chunk_records))
+    elapsed = time.perf_counter() - start
+    records = totals["records"]
+    print(f"✓ replayed {records} records to {args.out} in {elapsed:.2f}s "
+          f"({records / elapsed if elapsed else 0:,.0f} records/s): {totals['changed']} changed, "
+          f"{totals['skipped']} without raw headers, {totals['errors']} errors")
+    for name, count in totals["by_field"].most_common():
+        print(f"  {name}: {count} changed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from starlette.requests import Request
+
+from accept_headers import parse_accept_encoding, parse_accept_language
+from bot_detection import classify_request
+from fingerprinting import header_fingerprints
+from geolocation import get_ip_geolocation
+from header_extraction import extract_headers
+from server_identity import get_identity
+from trusted_proxies import IPAddress, parse_ip, to_address, trusted_proxies
+from signal_producers import ProducerRegistry
+from user_agent import analyze_user_agent
+
+# Server signals computed for each request: "all" or a comma-separated list of
+# field names; a request may narrow or widen it with ?signals=
+SERVER_SIGNALS = os.environ.get("SERVER_SIGNALS", "all")
+
+# Always computed: the record's fingerprints and log line are built from them
+CORE_SIGNALS = ("client_ip", "http_headers")
+
+server_signal_registry = ProducerRegistry("server_signals")
+producer = server_signal_registry.producer
+
+
+def extract_client_address(request: Request) -> Tuple[str, Optional[IPAddress]]:
+    """
+    The client's IP as (text, parsed address). Forwarding headers are only
+    believed when the connecting peer is a trusted proxy: X-Forwarded-For
+    is then walked from the right (the hop our proxy appended) and the first
+    hop outside the trusted networks is the client. A malformed hop ends the
+    walk at the last trusted one, and if every hop is trusted the leftmost
+    wins. X-Real-IP is used when a trusted peer sends no X-Forwarded-For.
+    A peer without an IP address (Unix socket, in-process client) counts
+    as trusted. The address is None when the chosen value is not an IP.
+    """
+    client = request.client
+    host = client.host if client else ""
+    peer = parse_ip(host)
+    if peer is not None and not trusted_proxies.contains(*peer):
+        return host, to_address(*peer)
+
+    xff = request.headers.get("x-forwarded-for")
+    if xff:
+        end = len(xff)
+        while end > 0:
+            start = xff.rfind(",", 0, end) + 1
+            hop = xff[start:end].strip()
+            end = start - 1
+            if not hop:
+                continue
+            parsed = parse_ip(hop)
+            if parsed is None:
+                break
+            host, peer = hop, parsed
+            if not trusted_proxies.contains(*parsed):
+                break
+    else:
+        x_real_ip = (request.headers.get("x-real-ip") or "").strip()
+        parsed = parse_ip(x_real_ip) if x_real_ip else None
+        if parsed is not None:
+            host, peer = x_real_ip, parsed
+
+    return host, to_address(*peer) if peer is not None else None
+
+
+def extract_client_ip(request: Request) -> str:
+    return extract_client_address(request)[0]
+
+
+# Shared intermediates; they only run when a selected field needs them
+
+@producer("identity", public=False)
+def _identity(request: Request):
+    return get_identity()
+
+
+@producer("headers", public=False)
+def _headers(request: Request):
+    # One pass over the raw ASGI headers feeds every header-derived field
+    return extract_headers(request.scope["headers"])
+
+
+@producer("user_agent", requires=("headers",), public=False)
+def _user_agent(request: Request, headers) -> Tuple[str, Any, Any]:
+    user_agent = headers.get("user-agent", "")
+    return (user_agent, *analyze_user_agent(user_agent))
+
+
+@producer("client_address", public=False)
+def _client_address(request: Request) -> Tuple[str, Optional[IPAddress]]:
+    return extract_client_address(request)
+
+
+# Output fields, registered in the order they appear in server_signals
+
+@producer("client_ip", requires=("client_address",))
+def _client_ip(request: Request, client_address):
+    return client_address[0]
+
+
+@producer("client_port")
+def _client_port(request: Request):
+    return request.client.port if hasattr(request.client, 'port') else None
+
+
+@producer("geolocation", requires=("client_address",))
+def _geolocation(request: Request, client_address):
+    # Reuses the address parsed during extraction
+    return get_ip_geolocation(*client_address)
+
+
+@producer("http_method")
+def _http_method(request: Request):
+    return request.method
+
+
+@producer("request_path")
+def _request_path(request: Request):
+    return request.url.path
+
+
+@producer("query_string")
+def _query_string(request: Request):
+    return str(request.query_params)
+
+
+@producer("request_timestamp")
+def _request_timestamp(request: Request):
+    return time.time()
+
+
+@producer("request_datetime")
+def _request_datetime(request: Request):
+    return datetime.utcnow().isoformat()
+
+
+@producer("url_scheme")
+def _url_scheme(request: Request):
+    return request.url.scheme
+
+
+@producer("url_netloc")
+def _url_netloc(request: Request):
+    return request.url.netloc
+
+
+@producer("url_full")
+def _url_full(request: Request):
+    return str(request.url)
+
+
+@producer("server_hostname", requires=("identity",))
+def _server_hostname(request: Request, identity):
+    return identity.hostname
+
+
+@producer("server_fqdn", requires=("identity",))
+def _server_fqdn(request: Request, identity):
+    return identity.fqdn
+
+
+@producer("request_details", requires=("headers",))
+def _request_details(request: Request, headers):
+    return {
+        "url_length": len(str(request.url)),
+        "header_count": headers.count,
+        "total_header_size": headers.total_size,
+        "method_is_safe": request.method in ["GET", "HEAD", "OPTIONS"],
+        "is_ajax": (headers.fields["x_requested_with"] or "").lower() == "xmlhttprequest",
+        "is_prefetch": headers.fields["x_moz"] == "prefetch" or headers.fields["x_purpose"] == "preview",
+        "is_secure": request.url.scheme == "https",
+    }
+
+
+@producer("http_headers", requires=("headers", "user_agent"))
+def _http_headers(request: Request, headers, user_agent):
+    http_headers = headers.fields
+    http_headers["user_agent_parsed"] = user_agent[1]
+    return http_headers
+
+
+@producer("accept_language_parsed", requires=("headers",))
+def _accept_language_parsed(request: Request, headers):
+    # Fresh lists around the cached entries: records count and serialize lists
+    return list(parse_accept_language(headers.get("accept-language", "")))
+
+
+@producer("accept_encoding_list", requires=("headers",))
+def _accept_encoding_list(request: Request, headers):
+    # Bare lowercase codings in header order ("br", not "br;q=0.9"); records stored before
+    # the RFC parser kept the raw elements, which remain in http_headers["accept_encoding"]
+    return [entry["coding"] for entry in parse_accept_encoding(headers.get("accept-encoding", ""))]
+
+
+@producer("fingerprints", requires=("headers",))
+def _fingerprints(request: Request, headers):
+    return header_fingerprints(request.method, request.url.path, headers.keys, headers.raw)
+
+
+@producer("bot_detection", requires=("headers", "user_agent"))
+def _bot_detection(request: Request, headers, user_agent):
+    return classify_request(user_agent[0], headers, user_agent[2])
+
+
+@producer("all_headers_raw", requires=("headers",))
+def _all_headers_raw(request: Request, headers):
+    return headers.raw
+
+
+def parse_signal_selection(spec: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """
+    Field names from a selection spec ("all" or "a,b,c") plus CORE_SIGNALS;
+    None means every field. Unknown names raise ValueError.
+    """
+    if spec is None or spec.strip().lower() in ("", "all"):
+        return None
+    selection = tuple(dict.fromkeys(
+        list(CORE_SIGNALS) + [name.strip() for name in spec.split(",") if name.strip()]))
+    server_signal_registry.plan(selection)
+    return selection
+
+
+DEFAULT_SIGNAL_SELECTION = parse_signal_selection(SERVER_SIGNALS)
+
+
+def build_server_signals(request: Request, selection: Optional[Tuple[str, ...]] = DEFAULT_SIGNAL_SELECTION
+                         ) -> Dict[str, Any]:
+    """
+    Server-side signals derived from the HTTP request itself (IP, geolocation,
+    headers, user agent, bot detection). Only the producers behind the selected
+    fields run. Computed once per HTTP request.
+    """
+    return server_signal_registry.run(server_signal_registry.plan(selection), request)
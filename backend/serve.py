@@ -0,0 +1,167 @@
+"""
+Production entry point: a pre-forking supervisor running N uvicorn workers
+on one shared listening socket.
+
+    python serve.py                       # WORKERS (default: CPU count) workers on HOST:PORT
+    python serve.py --workers 8 --port 8000 --shared-caches user_agent,geoip
+
+The application is imported once, in the supervisor, before any worker is
+forked: the GeoIP database is opened (memory-mapped), the user agent and bot
+pattern tables are built, and the heap is frozen out of the garbage
+collector, so workers share those pages copy-on-write instead of each
+building its own. Background services (log sink, signal store, GeoIP
+watcher) start per worker in the app lifespan, after the fork.
+
+Dead workers are replaced; SIGTERM/SIGINT stop every worker and exit, and
+SIGHUP is forwarded so each worker reloads its GeoIP database.
+
+Stage histograms, cache, queue and store counters are kept per worker and
+not aggregated. A scrape of /metrics or a /stats/* request is answered by
+whichever worker accepts the connection, so a single response only covers
+that worker. Every /metrics series carries worker (WORKER_ID, by default
+<host>:w<slot>, stable across restarts of the slot) and pid labels, and
+/stats/* responses name theirs in X-Collector-Worker / X-Collector-Pid.
+Each series is therefore monotonic; query with sum(rate(...)) across
+workers. Each scrape only refreshes the worker that served it, so use a
+rate() window spanning several scrapes per worker.
+
+`python main.py` remains the single-process development server with reload.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+
+WORKERS = int(os.environ.get("WORKERS", str(os.cpu_count() or 1)))
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", "8000"))
+# Caches whose contents workers share through shared memory, e.g. "user_agent,geoip"; empty to disable
+SHARED_CACHES = os.environ.get("SHARED_CACHES", "")
+# Size of each shared cache segment
+SHARED_CACHE_MB = int(os.environ.get("SHARED_CACHE_MB", "64"))
+# Prefix of each worker's WORKER_ID (<prefix>:w<slot>), the worker label on its metrics
+WORKER_ID_PREFIX = os.environ.get("WORKER_ID", socket.gethostname())
+# Seconds to wait for workers to finish in-flight requests on shutdown
+GRACEFUL_TIMEOUT = float(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+
+
+def bind_socket(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload(shared_caches: List[str], shared_cache_mb: int):
+    """Import the app and build everything workers can share, then freeze the heap for copy-on-write."""
+    import main
+    from caching import attach_shared_caches
+
+    if shared_caches:
+        attach_shared_caches(shared_caches, shared_cache_mb * 1024 * 1024)
+        print(f"✓ shared caches: {', '.join(shared_caches)} ({shared_cache_mb} MB each)")
+    # Objects created so far are never collected; the collector then leaves their pages untouched
+    gc.collect()
+    gc.freeze()
+    return main.app
+
+
+class Supervisor:
+    """Forks the workers, replaces any that die, and relays shutdown and reload signals."""
+
+    def __init__(self, app, sock: socket.socket, workers: int, log_level: str):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        self.children: Dict[int, int] = {}
+        self.stopping = False
+
+    def spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = index
+            return
+        code = 0
+        try:
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(signum, signal.SIG_DFL)
+            # Metrics label: a replacement worker keeps its slot's name, only the pid changes
+            os.environ["WORKER_ID"] = f"{WORKER_ID_PREFIX}:w{index}"
+            config = uvicorn.Config(self.app, proxy_headers=True, log_level=self.log_level, access_log=False)
+            uvicorn.Server(config).run(sockets=[self.sock])
+        except BaseException as e:
+            print(f"⚠ worker {index} failed: {e!r}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def signal_children(self, signum: int) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _stop(self, signum, frame) -> None:
+        self.stopping = True
+        self.signal_children(signal.SIGTERM)
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, lambda signum, frame: self.signal_children(signal.SIGHUP))
+        for index in range(self.workers):
+            self.spawn(index)
+        print(f"✓ {self.workers} workers serving on {self.sock.getsockname()} (supervisor pid {os.getpid()})")
+
+        # Poll rather than block in waitpid: a blocking wait is retried after a signal
+        # handler runs (PEP 475), so a stop request would never reach the deadline check
+        deadline: Optional[float] = None
+        while self.children:
+            if self.stopping and deadline is None:
+                deadline = time.monotonic() + GRACEFUL_TIMEOUT
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                if deadline is not None and time.monotonic() > deadline:
+                    self.signal_children(signal.SIGKILL)
+                time.sleep(0.1)
+                continue
+            index = self.children.pop(pid, None)
+            if index is not None and not self.stopping:
+                print(f"⚠ worker {index} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}; restarting")
+                time.sleep(0.5)
+                self.spawn(index)
+        return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the collector with pre-forked uvicorn workers")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--shared-caches", default=SHARED_CACHES, help="comma-separated cache names, e.g. user_agent,geoip")
+    parser.add_argument("--shared-cache-mb", type=int, default=SHARED_CACHE_MB)
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args(argv)
+
+    sock = bind_socket(args.host, args.port)
+    shared_caches = [name.strip() for name in args.shared_caches.split(",") if name.strip()]
+    app = preload(shared_caches, args.shared_cache_mb)
+    return Supervisor(app, sock, max(1, args.workers), args.log_level).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
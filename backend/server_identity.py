@@ -0,0 +1,57 @@
+import asyncio
+import os
+import socket
+import time
+from typing import NamedTuple, Optional
+
+from caching import FrozenDict
+
+COLLECTOR_VERSION = "2.0.0"
+
+
+class ServerIdentity(NamedTuple):
+    hostname: str
+    fqdn: Optional[str]
+    version: str
+    worker_id: str
+    pid: int
+    boot_time: float
+    resolved_at: Optional[float]
+
+    def as_record(self) -> FrozenDict:
+        return FrozenDict(self._asdict())
+
+
+_BOOT_TIME = time.time()
+
+
+def _worker_id(hostname: str) -> str:
+    return os.environ.get("WORKER_ID") or f"{hostname}:{os.getpid()}"
+
+
+def _initial_identity() -> ServerIdentity:
+    # gethostname() is a local syscall; getfqdn() may hit DNS, so it waits for refresh
+    hostname = socket.gethostname()
+    return ServerIdentity(hostname, None, COLLECTOR_VERSION, _worker_id(hostname), os.getpid(), _BOOT_TIME, None)
+
+
+def resolve_identity() -> ServerIdentity:
+    """Blocking: resolves the FQDN. Run it off the event loop."""
+    hostname = socket.gethostname()
+    return ServerIdentity(hostname, socket.getfqdn(hostname), COLLECTOR_VERSION, _worker_id(hostname),
+                          os.getpid(), _BOOT_TIME, time.time())
+
+
+_identity = _initial_identity()
+
+
+def get_identity() -> ServerIdentity:
+    """The cached identity; never touches the resolver."""
+    return _identity
+
+
+async def refresh_identity() -> ServerIdentity:
+    """Re-resolve hostname/FQDN in a worker thread and swap the cached identity."""
+    global _identity
+    _identity = await asyncio.to_thread(resolve_identity)
+    return _identity
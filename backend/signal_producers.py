@@ -0,0 +1,117 @@
+from time import perf_counter
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from caching import LRUCache
+from metrics import STAGE_TIMING, Histogram, stage_histogram
+
+
+class Producer(NamedTuple):
+    name: str
+    fn: Callable[..., Any]
+    requires: Tuple[str, ...]
+    public: bool
+
+
+class Plan(NamedTuple):
+    """Producers to run, dependencies first, and the public fields to return, in registry order."""
+    steps: Tuple[Producer, ...]
+    outputs: Tuple[str, ...]
+
+
+class ProducerRegistry:
+    """
+    Declarative registry of signal producers.
+
+    Each producer computes one named value from a context object and the
+    values of the producers it requires. Public producers are output fields;
+    private ones are shared intermediates (parsed headers, for instance) that
+    only run when a selected field depends on them. A selection is resolved
+    once into a Plan, cached, and every request then just runs its steps.
+    """
+
+    def __init__(self, name: str, timing: bool = STAGE_TIMING):
+        self.name = name
+        self.timing = timing
+        self.producers: Dict[str, Producer] = {}
+        self._plans = LRUCache(f"{name}_plans", 256)
+        self._timings: Dict[str, Histogram] = {}
+
+    def producer(self, name: str, requires: Iterable[str] = (), public: bool = True):
+        """Decorator registering fn(context, *required_values) as the producer of `name`."""
+        def register(fn):
+            if name in self.producers:
+                raise ValueError(f"signal producer {name!r} registered twice")
+            self.producers[name] = Producer(name, fn, tuple(requires), public)
+            # Each producer is a pipeline stage of its own in /metrics
+            self._timings[name] = stage_histogram(name)
+            self._plans.clear()
+            return fn
+        return register
+
+    def fields(self) -> Tuple[str, ...]:
+        return tuple(name for name, producer in self.producers.items() if producer.public)
+
+    def plan(self, selection: Optional[Iterable[str]] = None) -> Plan:
+        """Resolve selected field names (None for all) into an ordered Plan; unknown names raise ValueError."""
+        key = None if selection is None else frozenset(selection)
+        return self._plans.get_or_compute(key, self._resolve)
+
+    def _resolve(self, selection: Optional[frozenset]) -> Plan:
+        public = self.fields()
+        if selection is None:
+            selection = frozenset(public)
+        unknown = sorted(name for name in selection if name not in public)
+        if unknown:
+            raise ValueError(f"unknown signal(s) {', '.join(unknown)}; expected any of {', '.join(public)}")
+
+        steps: List[Producer] = []
+        done = set()
+
+        def visit(name: str, path: Tuple[str, ...]) -> None:
+            if name in done:
+                return
+            if name in path:
+                raise ValueError(f"signal producer cycle: {' -> '.join(path + (name,))}")
+            producer = self.producers.get(name)
+            if producer is None:
+                raise ValueError(f"signal producer {path[-1]!r} requires unregistered {name!r}")
+            for dependency in producer.requires:
+                visit(dependency, path + (name,))
+            done.add(name)
+            steps.append(producer)
+
+        for name in public:
+            if name in selection:
+                visit(name, ())
+        return Plan(tuple(steps), tuple(name for name in public if name in selection))
+
+    def run(self, plan: Plan, context: Any) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        if self.timing:
+            # Back-to-back producers share clock reads: each one's end is the next one's start
+            timings = self._timings
+            last = perf_counter()
+            for producer in plan.steps:
+                values[producer.name] = producer.fn(context, *[values[name] for name in producer.requires])
+                now = perf_counter()
+                timings[producer.name].observe(now - last)
+                last = now
+        else:
+            for producer in plan.steps:
+                values[producer.name] = producer.fn(context, *[values[name] for name in producer.requires])
+        return {name: values[name] for name in plan.outputs}
+
+    def stats(self) -> Dict[str, Any]:
+        producers = {}
+        for name, histogram in self._timings.items():
+            producer = self.producers[name]
+            calls = histogram.count
+            producers[name] = {
+                "public": producer.public,
+                "requires": list(producer.requires),
+                "calls": calls,
+                "total_ms": histogram.sum * 1000,
+                "mean_us": histogram.sum / calls * 1e6 if calls else None,
+                "max_us": histogram.max * 1e6 if calls else None,
+            }
+        return {"timing": self.timing, "producers": producers}
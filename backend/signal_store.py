@@ -0,0 +1,329 @@
+import abc
+import glob
+import gzip
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import zlib
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from log_sink import LogSink
+
+# Storage backend for collected records: "jsonl" (gzip segments), "sqlite" (WAL segments) or "none"
+SIGNAL_STORE_BACKEND = os.environ.get("SIGNAL_STORE", "jsonl")
+SIGNAL_STORE_DIR = os.environ.get(
+    "SIGNAL_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "signal_data"))
+# A segment is rotated once it reaches either limit
+SIGNAL_STORE_SEGMENT_BYTES = int(os.environ.get("SIGNAL_STORE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+SIGNAL_STORE_SEGMENT_RECORDS = int(os.environ.get("SIGNAL_STORE_SEGMENT_RECORDS", "100000"))
+# Retention: oldest segments beyond this count are deleted (0 keeps everything)
+SIGNAL_STORE_MAX_SEGMENTS = int(os.environ.get("SIGNAL_STORE_MAX_SEGMENTS", "200"))
+# fsync policy: "always" (every batch), "interval" (at most every N seconds) or "never"
+SIGNAL_STORE_FSYNC = os.environ.get("SIGNAL_STORE_FSYNC", "interval")
+SIGNAL_STORE_FSYNC_INTERVAL = float(os.environ.get("SIGNAL_STORE_FSYNC_INTERVAL", "1.0"))
+SIGNAL_STORE_BATCH_SIZE = int(os.environ.get("SIGNAL_STORE_BATCH_SIZE", "256"))
+SIGNAL_STORE_QUEUE_SIZE = int(os.environ.get("SIGNAL_STORE_QUEUE_SIZE", "10000"))
+# What emit() does when the queue is full. emit() runs on the event loop, so the default
+# never waits: overflow is dropped and counted in /stats/store and /metrics ("dropped")
+SIGNAL_STORE_POLICY = os.environ.get("SIGNAL_STORE_POLICY", "drop_newest")
+
+FSYNC_POLICIES = ("always", "interval", "never")
+SEGMENT_PATTERN = "signals-*"
+# A segment being deleted by retention is renamed with this prefix first, so only one worker retires it
+RETIRING_PREFIX = "retiring-"
+# signals-<UTC stamp>-<writer pid>-<sequence><suffix>, as named by SegmentWriter._next_segment_path
+_SEGMENT_NAME = re.compile(r"signals-(\d{8}T\d{6})-(\d+)-(\d+)\.")
+
+
+class SegmentWriter(abc.ABC):
+    """
+    Base for append-only segment writers plugged into a LogSink. Subclasses
+    implement _open_segment/_append/_sync/_close_segment; rotation, fsync
+    policy and retention live here. on_retire, when set, is called with the
+    records of each segment retention is about to delete.
+    """
+
+    suffix = ""
+
+    def __init__(self, directory: str = SIGNAL_STORE_DIR, segment_bytes: int = SIGNAL_STORE_SEGMENT_BYTES,
+                 segment_records: int = SIGNAL_STORE_SEGMENT_RECORDS, max_segments: int = SIGNAL_STORE_MAX_SEGMENTS,
+                 fsync: str = SIGNAL_STORE_FSYNC, fsync_interval: float = SIGNAL_STORE_FSYNC_INTERVAL):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"unknown SIGNAL_STORE_FSYNC {fsync!r}; expected one of {FSYNC_POLICIES}")
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.segment_path: Optional[str] = None
+        self.segment_count = 0
+        self.records_written = 0
+        self.segments_rotated = 0
+        self.segments_deleted = 0
+        self.fsyncs = 0
+        self._sequence = 0
+        self._last_sync = time.monotonic()
+        self.on_retire: Optional[Callable[[Iterator[Dict[str, Any]]], None]] = None
+
+    def _next_segment_path(self) -> str:
+        self._sequence += 1
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        return os.path.join(self.directory, f"signals-{stamp}-{os.getpid()}-{self._sequence:06d}{self.suffix}")
+
+    def write_batch(self, lines: List[bytes]) -> None:
+        if self.segment_path is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.segment_path = self._next_segment_path()
+            self._open_segment(self.segment_path)
+            self.segment_count = 0
+            self._enforce_retention()
+
+        self._append(lines)
+        self.segment_count += len(lines)
+        self.records_written += len(lines)
+
+        now = time.monotonic()
+        if self.fsync == "always" or (self.fsync == "interval" and now - self._last_sync >= self.fsync_interval):
+            self._sync()
+            self.fsyncs += 1
+            self._last_sync = now
+
+        if self.segment_count >= self.segment_records or self._segment_size() >= self.segment_bytes:
+            self.rotate()
+
+    def rotate(self) -> None:
+        if self.segment_path is None:
+            return
+        self._close_segment(sync=self.fsync != "never")
+        self.segment_path = None
+        self.segments_rotated += 1
+
+    def close(self) -> None:
+        self.rotate()
+
+    def _enforce_retention(self) -> None:
+        if self.max_segments <= 0:
+            return
+        segments = list_segments(self.directory)
+        excess = len(segments) - self.max_segments
+        if excess <= 0:
+            return
+        # Workers share the directory: never retire a segment another live writer may still append to
+        in_use = segments_in_use(segments)
+        for path in segments:
+            if excess <= 0:
+                break
+            if path != self.segment_path and path not in in_use:
+                self._retire(path)
+                excess -= 1
+
+    def _retire(self, path: str) -> None:
+        if self.on_retire is not None:
+            # Workers share the directory: the one whose rename succeeds owns the segment
+            retiring = os.path.join(os.path.dirname(path), RETIRING_PREFIX + os.path.basename(path))
+            try:
+                os.rename(path, retiring)
+            except OSError:
+                return
+            try:
+                self.on_retire(iter_segment_records(retiring))
+            except Exception as e:
+                print(f"⚠ Warning: retiring segment {path} failed: {e}", file=sys.stderr)
+            path = retiring
+        try:
+            os.remove(path)
+            self.segments_deleted += 1
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "directory": self.directory,
+            "segment": self.segment_path,
+            "segment_records": self.segment_count,
+            "records_written": self.records_written,
+            "segments_rotated": self.segments_rotated,
+            "segments_deleted": self.segments_deleted,
+            "fsync": self.fsync,
+            "fsyncs": self.fsyncs,
+        }
+
+    @abc.abstractmethod
+    def _open_segment(self, path: str) -> None:
+        """Create or open the segment file at `path` for appending."""
+
+    @abc.abstractmethod
+    def _append(self, lines: List[bytes]) -> None:
+        """Append one batch of encoded records to the open segment."""
+
+    @abc.abstractmethod
+    def _sync(self) -> None:
+        """Make everything appended so far durable."""
+
+    @abc.abstractmethod
+    def _segment_size(self) -> int:
+        """Current on-disk size of the open segment in bytes."""
+
+    @abc.abstractmethod
+    def _close_segment(self, sync: bool) -> None:
+        """Close the open segment, syncing it first when `sync` is set."""
+
+
+class JsonlSegmentWriter(SegmentWriter):
+    """gzip-compressed JSONL segments; each batch is sync-flushed so a crash loses at most the open batch."""
+
+    suffix = ".jsonl.gz"
+
+    def __init__(self, *args, compresslevel: int = 6, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.compresslevel = compresslevel
+        self._raw = None
+        self._gzip: Optional[gzip.GzipFile] = None
+
+    def _open_segment(self, path: str) -> None:
+        self._raw = open(path, "ab")
+        self._gzip = gzip.GzipFile(fileobj=self._raw, mode="ab", compresslevel=self.compresslevel)
+
+    def _append(self, lines: List[bytes]) -> None:
+        self._gzip.write(b"\n".join(lines) + b"\n")
+        self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def _sync(self) -> None:
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+
+    def _segment_size(self) -> int:
+        return self._raw.tell()
+
+    def _close_segment(self, sync: bool) -> None:
+        self._gzip.close()
+        if sync:
+            self._sync()
+        self._raw.close()
+        self._gzip = self._raw = None
+
+
+class SqliteSegmentWriter(SegmentWriter):
+    """SQLite segment files in WAL mode; one transaction per batch."""
+
+    suffix = ".sqlite"
+    _SYNCHRONOUS = {"always": "FULL", "interval": "NORMAL", "never": "OFF"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _open_segment(self, path: str) -> None:
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(f"PRAGMA synchronous={self._SYNCHRONOUS[self.fsync]}")
+        self._db.execute("CREATE TABLE IF NOT EXISTS signals (id INTEGER PRIMARY KEY, stored_at REAL, record TEXT)")
+
+    def _append(self, lines: List[bytes]) -> None:
+        now = time.time()
+        self._db.execute("BEGIN")
+        self._db.executemany("INSERT INTO signals (stored_at, record) VALUES (?, ?)",
+                             [(now, line.decode()) for line in lines])
+        self._db.execute("COMMIT")
+
+    def _sync(self) -> None:
+        # Under synchronous=NORMAL, commits are durable once the WAL is checkpointed
+        self._db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def _segment_size(self) -> int:
+        size = 0
+        for path in (self.segment_path, self.segment_path + "-wal"):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        return size
+
+    def _close_segment(self, sync: bool) -> None:
+        self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._db.close()
+        self._db = None
+
+
+def list_segments(directory: str = SIGNAL_STORE_DIR) -> List[str]:
+    """Segment files, oldest first."""
+    segments = []
+    for path in glob.glob(os.path.join(directory, SEGMENT_PATTERN)):
+        if not path.endswith((JsonlSegmentWriter.suffix, SqliteSegmentWriter.suffix)):
+            continue
+        try:
+            segments.append((os.path.getmtime(path), path))
+        except OSError:
+            # Retired by another worker since the glob
+            continue
+    return [path for _, path in sorted(segments)]
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def segments_in_use(paths: Iterable[str]) -> Set[str]:
+    """
+    Segments that may still be open: a writer appends only to its newest
+    segment, so that is the one kept back for every writer process still alive.
+    """
+    newest: Dict[int, tuple] = {}
+    for path in paths:
+        match = _SEGMENT_NAME.match(os.path.basename(path))
+        if match is None:
+            continue
+        pid, key = int(match[2]), (match[1], int(match[3]))
+        if pid not in newest or key > newest[pid][0]:
+            newest[pid] = (key, path)
+    return {path for pid, (_, path) in newest.items() if _pid_alive(pid)}
+
+
+def iter_segment_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Stream records back out of one segment; a truncated open gzip segment yields what is readable."""
+    if path.endswith(SqliteSegmentWriter.suffix):
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            for (record,) in db.execute("SELECT record FROM signals ORDER BY id"):
+                yield json.loads(record)
+        finally:
+            db.close()
+        return
+
+    with gzip.open(path, "rb") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, gzip.BadGzipFile):
+            return
+
+
+def iter_records(directory: str = SIGNAL_STORE_DIR) -> Iterator[Dict[str, Any]]:
+    for path in list_segments(directory):
+        yield from iter_segment_records(path)
+
+
+def create_store(backend: str = SIGNAL_STORE_BACKEND, **writer_options) -> Optional[LogSink]:
+    """A LogSink whose writer appends batches to rotating segment files."""
+    writers = {"jsonl": JsonlSegmentWriter, "sqlite": SqliteSegmentWriter}
+    if backend == "none":
+        return None
+    if backend not in writers:
+        raise ValueError(f"unknown SIGNAL_STORE backend {backend!r}; expected jsonl, sqlite or none")
+    return LogSink(writer=writers[backend](**writer_options), maxsize=SIGNAL_STORE_QUEUE_SIZE,
+                   batch_size=SIGNAL_STORE_BATCH_SIZE, policy=SIGNAL_STORE_POLICY)
+
+
+signal_store = create_store()
@@ -0,0 +1,77 @@
+from typing import Any, Dict, NamedTuple
+
+# Client sections reported in signal_summary["collection_completeness"]
+COMPLETENESS_CATEGORIES = ("navigator", "screen", "performance", "interaction", "capabilities", "storage")
+
+
+class SignalSummary(NamedTuple):
+    total_server_signals: int
+    total_client_signals: int
+    collection_completeness: Dict[str, float]
+    signal_categories: Dict[str, int]
+
+
+def count_non_null_values(data: Any) -> int:
+    """
+    Number of non-null leaves. Nested dicts are walked; a list counts its
+    non-null items without descending into them. Uses an explicit stack, so
+    arbitrarily deep client payloads cannot exhaust the interpreter stack.
+    """
+    if isinstance(data, list):
+        return len(data) - data.count(None)
+    if not isinstance(data, dict):
+        return 0 if data is None else 1
+
+    count = 0
+    stack = [data]
+    while stack:
+        for value in stack.pop().values():
+            if value is None:
+                continue
+            if isinstance(value, dict):
+                stack.append(value)
+            elif isinstance(value, list):
+                count += len(value) - value.count(None)
+            else:
+                count += 1
+    return count
+
+
+def section_counts(record: Dict[str, Any]) -> Dict[str, int]:
+    """count_non_null_values of every top-level value; their sum is the record's total."""
+    return {key: count_non_null_values(value) for key, value in record.items()}
+
+
+def summarize_signals(server_signals: Dict[str, Any], client_record: Dict[str, Any]) -> SignalSummary:
+    """
+    Totals, completeness and per-category counts for one collection record.
+    Each of the two records is traversed once; every figure is derived from
+    the per-section counts of that pass.
+    """
+    server = section_counts(server_signals)
+    client = section_counts(client_record)
+
+    completeness = {}
+    for category in COMPLETENESS_CATEGORIES:
+        data = client_record.get(category)
+        if data:
+            total_possible = len(data) if isinstance(data, dict) else 1
+            completeness[category] = (client[category] / total_possible) * 100 if total_possible > 0 else 0
+
+    categories = {
+        "Network/HTTP": len(server_signals.get("http_headers", {})),
+        "Geolocation": server.get("geolocation", 0),
+        "Navigator/Device": client.get("navigator", 0),
+        "Screen/Viewport": client.get("screen", 0),
+        "Performance": client.get("performance", 0),
+        "Graphics/Fingerprinting": sum([
+            1 if client_record.get("canvasFingerprintDataURL") else 0,
+            client.get("webglRenderer", 0),
+            len(client_record.get("installedFontsDetection") or []),
+        ]),
+        "Interaction/Behavior": client.get("interaction", 0),
+        "Capabilities": client.get("capabilities", 0),
+        "Storage": client.get("storage", 0),
+        "Device Motion": client.get("deviceMotion", 0),
+    }
+    return SignalSummary(sum(server.values()), sum(client.values()), completeness, categories)
@@ -0,0 +1,18 @@
+"""
+Shared setup for the backend tests.
+
+Run from the backend directory:
+    python -m pytest -q
+"""
+import os
+import sys
+
+# The app's modules configure themselves from the environment at import time:
+# keep records in memory and out of stdout while the tests drive the app
+os.environ.setdefault("SIGNAL_STORE", "none")
+os.environ.setdefault("LOG_SINK", "none")
+os.environ.setdefault("CANVAS_STORE", "memory")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
@@ -0,0 +1,103 @@
+import random
+
+import pytest
+
+import accept_headers
+from accept_headers import parse_accept_encoding, parse_accept_language
+from benchmarks.common import collect_scope
+from request_signals import build_server_signals, parse_signal_selection
+from starlette.requests import Request
+
+LANGUAGE_CASES = [
+    ("", []),
+    ("en-US,en;q=0.9", [("en-US", 1.0), ("en", 0.9)]),
+    ("de;q=0.5, fr-CH , *;q=0", [("fr-CH", 1.0), ("de", 0.5), ("*", 0.0)]),
+    ("en; Q=0.7 ,ja", [("ja", 1.0), ("en", 0.7)]),
+    ("en;q=abc", []),
+    ("en;q=abc, fr", [("fr", 1.0)]),
+    ("en;q=1.5, de;q=-1, it;q=0.1234, es;q=0.123", [("es", 0.123)]),
+    ("en,,  ,fr", [("en", 1.0), ("fr", 1.0)]),
+    ("en_US, zh-Hant-TW", [("en-US", 1.0), ("zh-Hant-TW", 1.0)]),
+    ("de_DE;q=0.8, en_GB", [("en-GB", 1.0), ("de-DE", 0.8)]),
+    ("en__US, _en", []),
+    ("a;q=0.5,b;q=0.5,c;q=0.5", [("a", 0.5), ("b", 0.5), ("c", 0.5)]),
+]
+ENCODING_CASES = [
+    ("", []),
+    ("gzip, deflate, br, zstd", [("gzip", 1.0), ("deflate", 1.0), ("br", 1.0), ("zstd", 1.0)]),
+    ("br;q=1.0, gzip;q=0.8, *;q=0.1", [("br", 1.0), ("gzip", 0.8), ("*", 0.1)]),
+    ("GZIP, identity;q=0", [("gzip", 1.0), ("identity", 0.0)]),
+    ("gzip;q=x, br", [("br", 1.0)]),
+    ("gzip deflate, br", [("br", 1.0)]),
+]
+ALPHABET = "aAzZ09-_*;,=q. \t1.05éx\"'"
+
+
+def fuzz_values(count: int, seed: int = 21):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+    for _ in range(count):
+        # Near-valid values: real elements with mangled weights and separators
+        parts = [rng.choice(["en-US", "en_US", "en", "de", "*", "gzip", "br", "x-foo", ""]) +
+                 rng.choice(["", ";q=0.8", ";q=1", "; q = 0.5", ";q=", ";q=1.0001", ";Q=0", ";level=1", ";q=nan"])
+                 for _ in range(rng.randint(1, 6))]
+        yield rng.choice([",", ", ", " ,", ";"]).join(parts)
+
+
+FUZZ = list(fuzz_values(5_000))
+
+
+@pytest.mark.parametrize("value, expected", LANGUAGE_CASES)
+def test_accept_language(value, expected):
+    assert [(entry["language"], entry["quality"]) for entry in parse_accept_language(value)] == expected
+
+
+@pytest.mark.parametrize("value, expected", ENCODING_CASES)
+def test_accept_encoding(value, expected):
+    assert [(entry["coding"], entry["quality"]) for entry in parse_accept_encoding(value)] == expected
+
+
+def test_memoized_result_is_shared():
+    assert parse_accept_language("en-US,en;q=0.9") is parse_accept_language("en-US,en;q=0.9")
+
+
+def test_entries_are_read_only():
+    entry = parse_accept_language("en-US")[0]
+    with pytest.raises(TypeError):
+        entry["quality"] = 0.5
+
+
+@pytest.mark.parametrize("parse, key", [(parse_accept_language, "language"), (parse_accept_encoding, "coding")])
+def test_fuzzed_values_parse_to_well_formed_entries(parse, key):
+    for value in FUZZ:
+        entries = parse(value)
+        assert isinstance(entries, tuple)
+        for entry in entries:
+            assert set(entry) == {key, "quality"}
+            assert isinstance(entry[key], str) and entry[key]
+            assert 0.0 <= entry["quality"] <= 1.0
+
+
+def test_fuzzed_languages_sorted_by_quality():
+    for value in FUZZ:
+        qualities = [entry["quality"] for entry in parse_accept_language(value)]
+        assert qualities == sorted(qualities, reverse=True)
+
+
+def test_fuzzed_cached_equals_uncached():
+    for value in FUZZ:
+        assert parse_accept_language(value) == accept_headers._parse_accept_language(value)
+        assert parse_accept_encoding(value) == accept_headers._parse_accept_encoding(value)
+
+
+def test_server_signals_record_shape():
+    scope = collect_scope([(b"accept-encoding", b"GZIP;q=0.8, br, x y, zstd;q=0"),
+                           (b"accept-language", b"en_US, de;q=0.5")])
+    signals = build_server_signals(Request(scope), parse_signal_selection(
+        "http_headers,accept_encoding_list,accept_language_parsed"))
+    # Bare lowercase codings; the raw elements (the pre-parser format) stay in http_headers
+    assert signals["accept_encoding_list"] == ["gzip", "br", "zstd"]
+    assert signals["http_headers"]["accept_encoding"] == "GZIP;q=0.8, br, x y, zstd;q=0"
+    assert signals["accept_language_parsed"] == [{"language": "en-US", "quality": 1.0},
+                                                 {"language": "de", "quality": 0.5}]
@@ -0,0 +1,138 @@
+import base64
+import hashlib
+import os
+
+import pytest
+
+from canvas_store import REFERENCE_PREFIX, CanvasStore, record_references
+from signal_store import JsonlSegmentWriter, list_segments
+from log_sink import encode_record
+
+
+def canvas(seed: int, size: int = 1000) -> str:
+    data = hashlib.sha256(str(seed).encode()).digest() * (size // 32)
+    return "data:image/png;base64," + base64.b64encode(data).decode()
+
+
+def digest(data_url: str) -> str:
+    return hashlib.sha256(data_url.encode()).hexdigest()
+
+
+def offload(store: CanvasStore, data_url: str, referenced: bool = True) -> str:
+    return store.offload(data_url, digest(data_url), referenced)
+
+
+@pytest.fixture(params=["memory", "disk"])
+def store(request, tmp_path):
+    return CanvasStore(str(tmp_path / "canvas") if request.param == "disk" else None, max_bytes=2500)
+
+
+def test_offload_and_rebuild_data_url(store):
+    url = canvas(1)
+    assert offload(store, url) == REFERENCE_PREFIX + digest(url)
+    assert store.data_url(digest(url)) == url
+    assert store.offload("not a data url", digest("x")) is None
+    assert store.stats()["rejected"] == 1
+
+
+def test_duplicates_share_one_blob(store):
+    url = canvas(1)
+    for _ in range(3):
+        offload(store, url)
+    assert store.entry(digest(url)).refs == 3
+    assert store.stats()["blobs"] == 1
+    assert store.stats()["deduplicated"] == 2
+
+
+def test_referenced_blobs_are_never_evicted(store):
+    first = canvas(1)
+    offload(store, first)
+    offload(store, first)
+    for seed in range(2, 6):
+        offload(store, canvas(seed))
+    # Over max_bytes, but every blob is still referenced
+    assert store.stats()["total_bytes"] > store.max_bytes
+    assert store.stats()["evictions"] == 0
+    assert store.data_url(digest(first)) == first
+
+
+def test_released_blobs_are_evicted_oldest_first(store):
+    urls = [canvas(seed) for seed in range(3)]
+    for url in urls:
+        offload(store, url)
+    store.release_all([digest(urls[1]), digest(urls[0])])
+    assert store.stats()["evictions"] == 1
+    # urls[0] was referenced longest ago
+    assert store.get(digest(urls[0])) is None
+    assert store.data_url(digest(urls[1])) == urls[1]
+
+    offload(store, canvas(9))
+    assert store.get(digest(urls[1])) is None
+    assert store.data_url(digest(urls[2])) == urls[2]
+
+
+def test_unreferenced_offload_stays_evictable(store):
+    kept, loose = canvas(1), canvas(2)
+    offload(store, loose, referenced=False)
+    offload(store, kept)
+    offload(store, canvas(3))
+    assert store.entry(digest(loose)) is None
+    assert store.data_url(digest(kept)) == kept
+
+
+def test_refcounts_persist_across_restarts(tmp_path):
+    directory = str(tmp_path / "canvas")
+    url = canvas(1)
+    first = CanvasStore(directory)
+    offload(first, url)
+    offload(first, url)
+    restarted = CanvasStore(directory)
+    assert restarted.entry(digest(url)).refs == 2
+    assert not restarted.adopted
+
+
+def test_workers_share_the_index(tmp_path):
+    directory = str(tmp_path / "canvas")
+    worker_a, worker_b = CanvasStore(directory, max_bytes=2500), CanvasStore(directory, max_bytes=2500)
+    url = canvas(1)
+    offload(worker_a, url)
+    assert worker_b.data_url(digest(url)) == url
+    offload(worker_b, url)
+    assert worker_a.entry(digest(url)).refs == 2
+    # worker_b's eviction pressure must not remove what worker_a's records reference
+    for seed in range(2, 6):
+        offload(worker_b, canvas(seed), referenced=False)
+    assert worker_a.data_url(digest(url)) == url
+
+
+def test_unindexed_files_are_adopted_and_counted(tmp_path):
+    directory = tmp_path / "canvas"
+    directory.mkdir()
+    url = canvas(1)
+    (directory / (digest(url) + ".png")).write_bytes(base64.b64decode(url.partition(",")[2]))
+    store = CanvasStore(str(directory))
+    store.open()
+    assert store.adopted == {digest(url)}
+    records = [{"client_signals": {"canvasFingerprintDataURL": REFERENCE_PREFIX + digest(url)}}] * 2
+    store.rebuild_references(record_references(records))
+    assert store.entry(digest(url)).refs == 2
+    assert store.data_url(digest(url)) == url
+
+
+def test_segment_retention_releases_references(tmp_path):
+    store = CanvasStore(str(tmp_path / "canvas"), max_bytes=0)
+    writer = JsonlSegmentWriter(directory=str(tmp_path / "segments"), segment_records=2, max_segments=2,
+                                fsync="never")
+    writer.on_retire = lambda records: store.release_all(record_references(records))
+    urls = [canvas(seed) for seed in range(4)]
+    for url in urls:
+        reference = offload(store, url)
+        writer.write_batch([encode_record({"client_signals": {"canvasFingerprintDataURL": reference}})])
+    # Opening the third segment retires the first, which held urls[0] and urls[1]
+    writer.write_batch([encode_record({"client_signals": {}})])
+    writer.close()
+
+    assert writer.segments_deleted == 1
+    assert len(list_segments(str(tmp_path / "segments"))) == 2
+    assert not [name for name in os.listdir(tmp_path / "segments") if not name.startswith("signals-")]
+    assert [store.get(digest(url)) is not None for url in urls] == [False, False, True, True]
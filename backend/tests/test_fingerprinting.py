@@ -0,0 +1,102 @@
+import hashlib
+import random
+
+import pytest
+
+import fingerprinting
+from benchmarks.common import client_payload
+from fingerprinting import canonical_digest, signal_fingerprints, text_digest
+
+# sha256 of the canonical encoding; recorded once, never regenerated: a change
+# here silently splits every stored fingerprint ("é" pins the ASCII-escaped form)
+GOLDEN = [
+    (None, "74234e98afe7498fb5daf1f36ac2d78acc339464f950703b8c019892f982b90b"),
+    (True, "b5bea41b6c623f7c09f1bf24dcae58ebab3c0cdd90ad966bc43a45b44867e12b"),
+    (False, "fcbcf165908dd18a9e49f7ff27810176db8e9f63b4352213741664245224f8aa"),
+    (0, "5feceb66ffc86f38d952786c6d696c79c2dbc239dd4e91b46729d73a27fb57e9"),
+    (-7, "a770d3270c9dcdedf12ed9fd70444f7c8a95c26cae3cae9bd867499090a2f14b"),
+    (1.5, "9f29a130438b81170b92a42650f9a94291ecad60bd47af2a3886e75f7f728725"),
+    ("", "12ae32cb1ec02d01eda3581b127c1fee3b0dc53572ed6baf239721a03d82e126"),
+    ("abc", "6cc43f858fbb763301637b5af970e2a46b46f461f27e5a0f41e009c59b827b25"),
+    ("é", "abc3932c9ec58f042750738c49034e7ee67cf556d6be86832ac3dda38decb703"),
+    ([], "4f53cda18c2baa0c0354bb5f9a3ecbe5ed12ab4d8e11ba873c2f11161202b945"),
+    ([1, [2, []]], "1ea0d80950a5ba05916a6e968ea329ac74dd7aaad26ef5d197bb2e5602cb2747"),
+    ({}, "44136fa355b3678a1146ad16f7e8649e94fb4fc21fe77e8310c060f61caaff8a"),
+    ({"b": 1, "a": [None, 2.0]}, "a518bb9282779745c31e193b68be37f0622a2ce87300385d01f1cece9bd7ca35"),
+    ({"screen": {"width": 1920, "height": 1080, "pixelRatio": 1.25}},
+     "398a5de6ea797001eaa28470bc3011e870f206e97a453fcd70122d4566833bae"),
+]
+
+SIGNAL_INPUTS = ("ua", "en", "gzip", "data:x", {"r": "ANGLE"}, {"w": 1}, {"l": ["en"]}, 1700000000.5)
+GOLDEN_SIGNALS = {
+    "basic_fingerprint": "6f3a8ae1349cd0d21be44b72cf9c8f94",
+    "canvas_fingerprint": "83286fe62613ea3440ebc42507fde9f2e6deaa1f7708acbcbe11f9e7b656e25a",
+    "webgl_fingerprint": "2c3be513476ba4c929f575a10ec042eb3d013aca3ec2916796f78bff6d0e14d0",
+    "screen_fingerprint": "1462bb4a1d3f03fb6ce4b6cb6bbcd6155c417160ac8f030be23554e9fa4e4c0a",
+    "combined_fingerprint": "652181f8e60fd6255e9e58f9f6ff39971da84ae138ca69a50dc48a9820025a4c",
+    "session_id": "235fcaaf348251b1161283d2de5faf60",
+}
+
+
+def _shuffled(value, rng):
+    """The same data with every dict rebuilt in a random key order."""
+    if isinstance(value, dict):
+        items = list(value.items())
+        rng.shuffle(items)
+        return {key: _shuffled(child, rng) for key, child in items}
+    if isinstance(value, list):
+        return [_shuffled(child, rng) for child in value]
+    return value
+
+
+@pytest.mark.parametrize("value, expected", GOLDEN)
+def test_golden_digest(value, expected):
+    assert canonical_digest(value).hex() == expected
+
+
+def test_golden_signal_fingerprints():
+    assert signal_fingerprints(*SIGNAL_INPUTS) == GOLDEN_SIGNALS
+
+
+def test_legacy_basic_and_canvas_fingerprints_unchanged():
+    # Records stored before the canonical encoding hashed these two exactly like this
+    ua, accept_lang = "Mozilla/5.0 (X11)", "en-US,en;q=0.9"
+    canvas = client_payload(canvas_kb=64)["canvasFingerprintDataURL"]
+    fingerprints = signal_fingerprints(ua, accept_lang, "gzip", canvas, {}, {}, {}, 0.0)
+    assert fingerprints["basic_fingerprint"] == hashlib.md5(f"{ua}{accept_lang}".encode()).hexdigest()
+    assert fingerprints["canvas_fingerprint"] == hashlib.sha256(canvas.encode()).hexdigest()
+
+
+def test_missing_canvas_has_no_fingerprint():
+    assert signal_fingerprints("ua", "en", "gzip", "", {}, {}, {}, 0.0)["canvas_fingerprint"] is None
+
+
+def test_distinct_values_hash_distinctly():
+    # Values that str() or naive concatenation would conflate
+    distinct = [None, "None", "null", 0, False, 0.0, "0", 1, True, 1.0, "", [], {}, [[]], ["a", "b"], ["ab"],
+                ["a", ""], ["a,b"], {"a": "b"}, [["a", "b"]], {"a": None}, {"ab": ""}, '"a"']
+    assert len({canonical_digest(value) for value in distinct}) == len(distinct)
+
+
+def test_dict_key_order_does_not_matter():
+    payload = client_payload(canvas_kb=16)
+    rng = random.Random(7)
+    reference = canonical_digest(payload)
+    for _ in range(20):
+        assert canonical_digest(_shuffled(payload, rng)) == reference
+
+
+def test_tuple_encodes_as_list():
+    assert canonical_digest((1, "a")) == canonical_digest([1, "a"])
+
+
+@pytest.mark.parametrize("text", [
+    client_payload(canvas_kb=200)["canvasFingerprintDataURL"],
+    "ü" * 100_000,
+    "A" * (fingerprinting.HASH_CHUNK_CHARS - 1),
+    "A" * fingerprinting.HASH_CHUNK_CHARS,
+    "A" * (fingerprinting.HASH_CHUNK_CHARS + 1),
+    "A" * (3 * fingerprinting.HASH_CHUNK_CHARS),
+], ids=["canvas", "non-ascii", "chunk-1", "chunk", "chunk+1", "3-chunks"])
+def test_text_digest_matches_hashlib(text):
+    assert text_digest(text) == hashlib.sha256(text.encode()).digest()
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+
+from log_sink import LogSink
+
+
+class GatedWriter:
+    """Holds every batch until released, so the queue stays full."""
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.lines = []
+
+    def write_batch(self, lines):
+        self.gate.wait()
+        self.lines.extend(lines)
+
+    def close(self):
+        pass
+
+
+def full_sink(policy: str, block_timeout: float = 0.3):
+    writer = GatedWriter()
+    sink = LogSink(writer=writer, maxsize=1, batch_size=1, flush_interval=0.01,
+                   policy=policy, block_timeout=block_timeout)
+    sink.emit({"n": 0})
+    time.sleep(0.05)  # taken by the writer thread, which now waits on the gate
+    sink.emit({"n": 1})
+    return sink, writer
+
+
+def test_emit_async_block_policy_does_not_stall_the_loop():
+    sink, writer = full_sink("block")
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        accepted = await sink.emit_async({"n": 2})
+        task.cancel()
+        return accepted, ticks
+
+    accepted, ticks = asyncio.run(scenario())
+    # The wait for room ran in a thread: the loop kept ticking through block_timeout
+    assert accepted is False
+    assert ticks >= 10
+    assert sink.dropped == 1
+    writer.gate.set()
+    sink.close()
+
+
+def test_emit_async_block_policy_waits_for_room():
+    sink, writer = full_sink("block", block_timeout=2.0)
+    threading.Timer(0.1, writer.gate.set).start()
+    assert asyncio.run(sink.emit_async({"n": 2})) is True
+    sink.close()
+    assert len(writer.lines) == 3
+
+
+def test_emit_async_drop_newest():
+    sink, writer = full_sink("drop_newest")
+    start = time.perf_counter()
+    assert asyncio.run(sink.emit_async({"n": 2})) is False
+    assert time.perf_counter() - start < 0.1
+    writer.gate.set()
+    sink.close()
@@ -0,0 +1,42 @@
+from fastapi.testclient import TestClient
+
+import main
+import metrics
+from benchmarks.common import client_payload
+
+
+def test_collect_times_body_read_apart_from_validation():
+    with TestClient(main.app) as client:
+        before = {name: histogram.count for name, histogram in metrics.STAGES.items()}
+        assert client.post("/collect", json=client_payload(canvas_kb=1)).status_code == 200
+        exposition = client.get("/metrics").text
+
+    for stage in ("body_read", "body_validation", "collect"):
+        assert metrics.STAGES[stage].count == before.get(stage, 0) + 1
+    assert any(line.startswith("whoami_stage_duration_seconds_count{") and 'stage="body_read"}' in line
+               for line in exposition.splitlines())
+
+
+def test_metrics_and_stats_name_the_worker():
+    with TestClient(main.app) as client:
+        identity = client.get("/stats/server").json()
+        stats = client.get("/stats/cache")
+        exposition = client.get("/metrics").text
+
+    assert stats.headers["x-collector-worker"] == identity["worker_id"]
+    assert stats.headers["x-collector-pid"] == str(identity["pid"])
+    series = [line for line in exposition.splitlines() if line and not line.startswith("#")]
+    assert series
+    labels = f'worker="{identity["worker_id"]}",pid="{identity["pid"]}"'
+    assert all(labels in line for line in series)
+
+
+def test_writer_labels_combine_with_series_labels():
+    writer = metrics.MetricsWriter({"worker": "w0"})
+    writer.add("whoami_test", "gauge", "test", 1, {"cache": "ua"})
+    histogram = metrics.Histogram()
+    histogram.observe(0.001)
+    writer.add_histogram("whoami_test_seconds", "test", histogram, {"stage": "s"})
+    rendered = writer.render()
+    assert 'whoami_test{worker="w0",cache="ua"} 1' in rendered
+    assert 'whoami_test_seconds_count{worker="w0",stage="s"} 1' in rendered
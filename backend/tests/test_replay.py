@@ -0,0 +1,61 @@
+import copy
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from benchmarks.common import client_payload
+from replay import REPLAY_SIGNALS, replay_record
+from request_signals import parse_signal_selection
+from signal_summary import summarize_signals
+
+BOT_USER_AGENT = "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)"
+
+
+@pytest.fixture(scope="module")
+def stored_record():
+    with TestClient(main.app) as client:
+        response = client.post("/collect", json=client_payload(canvas_kb=1), headers={"user-agent": BOT_USER_AGENT})
+    return response.json()["data"]
+
+
+def stale(record):
+    """The record as an older collector would have stored it: no bot detection, summary counted without it."""
+    record = copy.deepcopy(record)
+    record["server_signals"]["bot_detection"] = {}
+    summary = summarize_signals(record["server_signals"], record["client_signals"])
+    record["signal_summary"]["total_server_signals"] = summary.total_server_signals
+    return record
+
+
+def replay(record):
+    return replay_record(record, REPLAY_SIGNALS, parse_signal_selection(",".join(REPLAY_SIGNALS)))
+
+
+def test_replay_recounts_signal_summary(stored_record):
+    record = stale(stored_record)
+    before = record["signal_summary"]["total_server_signals"]
+
+    assert "bot_detection" in replay(record)
+    assert record["server_signals"]["bot_detection"]["is_bot_likely"] is True
+    summary = summarize_signals(record["server_signals"], record["client_signals"])
+    assert record["signal_summary"]["total_server_signals"] == summary.total_server_signals > before
+    assert record["signal_summary"]["total_client_signals"] == summary.total_client_signals
+    assert record["signal_summary"]["unique_identifiers"] == stored_record["signal_summary"]["unique_identifiers"]
+
+
+def test_replay_recounts_log_sink_record(stored_record):
+    data = stale(stored_record)
+    record = {"event": "signal_collection", "is_bot_likely": None, "signal_categories": {}, "data": data}
+
+    replay(record)
+    summary = summarize_signals(data["server_signals"], data["client_signals"])
+    assert record["is_bot_likely"] is True
+    assert data["signal_summary"]["total_server_signals"] == summary.total_server_signals
+    assert record["signal_categories"] == {name: count for name, count in summary.signal_categories.items() if count}
+
+
+def test_unchanged_record_keeps_its_summary(stored_record):
+    record = copy.deepcopy(stored_record)
+    assert replay(record) == []
+    assert record["signal_summary"] == stored_record["signal_summary"]
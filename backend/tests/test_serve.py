@@ -0,0 +1,41 @@
+import os
+import signal
+import socket
+import threading
+import time
+
+import pytest
+
+import serve
+
+
+class StubbornSupervisor(serve.Supervisor):
+    """Workers that ignore SIGTERM, standing in for a worker stuck in a request."""
+
+    def spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = index
+            return
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        time.sleep(30)
+        os._exit(0)
+
+
+@pytest.fixture
+def restore_signals():
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP)}
+    yield
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+
+
+def test_workers_ignoring_sigterm_are_killed_after_graceful_timeout(monkeypatch, restore_signals):
+    monkeypatch.setattr(serve, "GRACEFUL_TIMEOUT", 0.5)
+    with socket.socket() as sock:
+        supervisor = StubbornSupervisor(app=None, sock=sock, workers=2, log_level="warning")
+        threading.Timer(0.3, os.kill, (os.getpid(), signal.SIGTERM)).start()
+        start = time.monotonic()
+        assert supervisor.run() == 0
+    assert time.monotonic() - start < 5
+    assert supervisor.children == {}
@@ -0,0 +1,53 @@
+import json
+import socket
+from collections import Counter
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import server_identity
+from benchmarks.common import client_payload, ua_corpus
+
+RESOLVER_FUNCTIONS = ("gethostname", "getfqdn", "gethostbyaddr", "gethostbyname", "getaddrinfo")
+
+
+@pytest.fixture
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def test_identity_is_resolved_at_startup(client):
+    identity = client.get("/stats/server").json()
+    assert identity["hostname"] == socket.gethostname()
+    assert identity["fqdn"] is not None
+    assert identity["resolved_at"] is not None
+    assert identity["version"] == server_identity.COLLECTOR_VERSION
+
+
+def test_requests_never_call_the_resolver(client, monkeypatch):
+    calls = Counter()
+    for name in RESOLVER_FUNCTIONS:
+        original = getattr(socket, name)
+
+        def counting(*args, _name=name, _original=original, **kwargs):
+            calls[_name] += 1
+            return _original(*args, **kwargs)
+
+        monkeypatch.setattr(socket, name, counting)
+
+    payload = client_payload(canvas_kb=1)
+    for _ in range(20):
+        response = client.post("/collect", json=payload, headers={"user-agent": ua_corpus(1)[0]})
+        assert response.status_code == 200
+    response = client.post("/collect/batch", content="\n".join(json.dumps(payload) for _ in range(20)))
+    assert response.json()["accepted"] == 20
+
+    assert calls == Counter()
+
+
+def test_records_carry_the_cached_identity(client):
+    identity = client.get("/stats/server").json()
+    record = client.post("/collect", json=client_payload(canvas_kb=1)).json()["data"]
+    assert record["collection_metadata"]["server_identity"] == identity
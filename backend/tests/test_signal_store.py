@@ -0,0 +1,72 @@
+import os
+
+import signal_store
+from signal_store import JsonlSegmentWriter, iter_records, list_segments, segments_in_use
+
+
+def dead_pid() -> int:
+    pid = os.fork()
+    if pid == 0:
+        os._exit(0)
+    os.waitpid(pid, 0)
+    return pid
+
+
+def segment(directory, pid: int, sequence: int, mtime: float) -> str:
+    path = os.path.join(directory, f"signals-20250101T000000-{pid}-{sequence:06d}.jsonl.gz")
+    open(path, "wb").close()
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_retention_keeps_segments_other_live_writers_have_open(tmp_path):
+    live, dead = os.getppid(), dead_pid()
+    closed = segment(tmp_path, live, 1, 100)
+    dead_last = segment(tmp_path, dead, 1, 101)
+    live_open = segment(tmp_path, live, 2, 102)
+
+    writer = JsonlSegmentWriter(directory=str(tmp_path), max_segments=1, fsync="never")
+    writer.write_batch([b'{"n":1}'])
+    writer.close()
+
+    assert segments_in_use([closed, dead_last, live_open]) == {live_open}
+    # Oldest first, but the live writer's newest segment and our own are left alone
+    assert not os.path.exists(closed)
+    assert not os.path.exists(dead_last)
+    assert os.path.exists(live_open)
+    assert writer.segments_deleted == 2
+
+
+class OtherWorkerWriter(JsonlSegmentWriter):
+    """A writer named like another live worker process (the test runner's parent)."""
+
+    def _next_segment_path(self) -> str:
+        path = super()._next_segment_path()
+        return path.replace(f"-{os.getpid()}-", f"-{os.getppid()}-")
+
+
+def test_two_writers_keep_each_others_records(tmp_path):
+    writer_a = JsonlSegmentWriter(directory=str(tmp_path), max_segments=1, fsync="never")
+    writer_b = OtherWorkerWriter(directory=str(tmp_path), max_segments=1, fsync="never")
+    writer_a.write_batch([b'{"writer":"a","n":1}'])
+    writer_b.write_batch([b'{"writer":"b","n":1}'])
+    writer_a.write_batch([b'{"writer":"a","n":2}'])
+    writer_a.close()
+    writer_b.close()
+
+    records = sorted((record["writer"], record["n"]) for record in iter_records(str(tmp_path)))
+    assert records == [("a", 1), ("a", 2), ("b", 1)]
+
+
+def test_list_segments_skips_files_removed_while_listing(tmp_path, monkeypatch):
+    kept = segment(tmp_path, 1, 1, 100)
+    gone = segment(tmp_path, 1, 2, 101)
+    getmtime = os.path.getmtime
+
+    def racing_getmtime(path):
+        if path == gone:
+            os.remove(path)
+        return getmtime(path)
+
+    monkeypatch.setattr(signal_store.os.path, "getmtime", racing_getmtime)
+    assert list_segments(str(tmp_path)) == [kept]
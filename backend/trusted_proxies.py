@@ -0,0 +1,90 @@
+import ipaddress
+import os
+import socket
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+# Proxies whose X-Forwarded-For / X-Real-IP headers are believed, as
+# comma-separated CIDRs; the default covers a local tunnel agent (ngrok) or
+# a reverse proxy on the same host or private network
+TRUSTED_PROXIES = os.environ.get(
+    "TRUSTED_PROXIES", "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7")
+# Optional file with more trusted CIDRs, one per line ("#" starts a comment),
+# e.g. a CDN's published edge ranges saved locally
+TRUSTED_PROXIES_FILE = os.environ.get("TRUSTED_PROXIES_FILE", "")
+
+_FAMILIES = {4: socket.AF_INET, 6: socket.AF_INET6}
+_WIDTHS = {4: 32, 6: 128}
+
+
+def parse_ip(text: str) -> Optional[Tuple[int, int]]:
+    """
+    (ip version, address as an int) for a textual IP address, or None if it
+    is not one. Strict like ipaddress, but without building an address object.
+    """
+    version = 6 if ":" in text else 4
+    try:
+        return version, int.from_bytes(socket.inet_pton(_FAMILIES[version], text), "big")
+    except (OSError, ValueError):
+        return None
+
+
+def to_address(version: int, value: int) -> IPAddress:
+    return ipaddress.IPv4Address(value) if version == 4 else ipaddress.IPv6Address(value)
+
+
+def read_cidr_file(path: str) -> List[str]:
+    with open(path) as f:
+        return [entry for entry in (line.split("#", 1)[0].strip() for line in f) if entry]
+
+
+class CidrIndex:
+    """
+    Membership test for a set of networks. Networks are grouped by prefix
+    length into sets of network numbers (address >> host bits), so a lookup
+    is one shift and one set probe per distinct prefix length, longest first.
+    """
+
+    def __init__(self, cidrs: Iterable[str] = ()):
+        self.networks: List[Union[ipaddress.IPv4Network, ipaddress.IPv6Network]] = []
+        self._index: Dict[int, List[Tuple[int, frozenset]]] = {4: [], 6: []}
+        self.add(cidrs)
+
+    def add(self, cidrs: Iterable[str]) -> None:
+        """Add networks given as CIDR strings; raises ValueError on malformed entries."""
+        self.networks += [ipaddress.ip_network(cidr.strip(), strict=False) for cidr in cidrs if cidr.strip()]
+        for version in (4, 6):
+            by_length: Dict[int, set] = {}
+            for network in self.networks:
+                if network.version == version:
+                    shift = network.max_prefixlen - network.prefixlen
+                    by_length.setdefault(shift, set()).add(int(network.network_address) >> shift)
+            self._index[version] = [(shift, frozenset(numbers)) for shift, numbers in sorted(by_length.items())]
+
+    def contains(self, version: int, value: int) -> bool:
+        for shift, numbers in self._index[version]:
+            if value >> shift in numbers:
+                return True
+        return False
+
+    def __contains__(self, ip: str) -> bool:
+        parsed = parse_ip(ip)
+        return parsed is not None and self.contains(*parsed)
+
+    def __len__(self) -> int:
+        return len(self.networks)
+
+
+def load_trusted_proxies(cidrs: str = TRUSTED_PROXIES, path: str = TRUSTED_PROXIES_FILE) -> CidrIndex:
+    index = CidrIndex(cidrs.split(","))
+    if path:
+        try:
+            index.add(read_cidr_file(path))
+            print(f"✓ Trusted proxies loaded ({path}, {len(index)} networks in total)")
+        except OSError as e:
+            print(f"⚠ Warning: Could not read TRUSTED_PROXIES_FILE: {e}")
+    return index
+
+
+trusted_proxies = load_trusted_proxies()
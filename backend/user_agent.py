@@ -0,0 +1,124 @@
+import os
+import re
+from typing import Any, Dict, Tuple
+
+from bot_detection import is_bot_tokens, match_ua_tokens
+from caching import FrozenDict, LRUCache
+
+# Distinct user agents are few compared to request volume, so parsed results
+# are memoized by the raw string
+UA_CACHE_SIZE = int(os.environ.get("UA_CACHE_SIZE", "4096"))
+ua_cache = LRUCache("user_agent", UA_CACHE_SIZE)
+
+
+def _parse_user_agent(user_agent: str, tokens: frozenset) -> Dict[str, Any]:
+    ua_lower = user_agent.lower()
+    parsed = {
+        "raw": user_agent,
+        "length": len(user_agent),
+        "os": "unknown",
+        "os_version": None,
+        "browser": "unknown",
+        "browser_version": None,
+        "is_mobile": False,
+        "is_tablet": False,
+        "is_bot": False,
+        "device_type": "desktop",
+        "engine": "unknown"
+    }
+
+    if "windows nt 10.0" in ua_lower:
+        parsed["os"] = "windows"
+        parsed["os_version"] = "10"
+    elif "windows nt 6.3" in ua_lower:
+        parsed["os"] = "windows"
+        parsed["os_version"] = "8.1"
+    elif "windows nt 6.2" in ua_lower:
+        parsed["os"] = "windows"
+        parsed["os_version"] = "8"
+    elif "windows nt 6.1" in ua_lower:
+        parsed["os"] = "windows"
+        parsed["os_version"] = "7"
+    elif "windows" in ua_lower:
+        parsed["os"] = "windows"
+    elif "mac os x" in ua_lower:
+        parsed["os"] = "macos"
+        mac_version = re.search(r'mac os x (\d+[._]\d+[._]?\d*)', ua_lower)
+        if mac_version:
+            parsed["os_version"] = mac_version.group(1).replace('_', '.')
+    elif "linux" in ua_lower and "android" not in ua_lower:
+        parsed["os"] = "linux"
+    elif "android" in ua_lower:
+        parsed["os"] = "android"
+        parsed["is_mobile"] = True
+        android_version = re.search(r'android (\d+\.?\d*)', ua_lower)
+        if android_version:
+            parsed["os_version"] = android_version.group(1)
+    elif "iphone" in ua_lower or "ipad" in ua_lower:
+        parsed["os"] = "ios"
+        ios_version = re.search(r'os (\d+[._]\d+[._]?\d*)', ua_lower)
+        if ios_version:
+            parsed["os_version"] = ios_version.group(1).replace('_', '.')
+
+    if "edg/" in ua_lower or "edge/" in ua_lower:
+        parsed["browser"] = "edge"
+        edge_version = re.search(r'edg[e]?/(\d+\.?\d*)', ua_lower)
+        if edge_version:
+            parsed["browser_version"] = edge_version.group(1)
+    elif "chrome/" in ua_lower and "edg" not in ua_lower:
+        parsed["browser"] = "chrome"
+        chrome_version = re.search(r'chrome/(\d+\.?\d*)', ua_lower)
+        if chrome_version:
+            parsed["browser_version"] = chrome_version.group(1)
+    elif "firefox/" in ua_lower:
+        parsed["browser"] = "firefox"
+        firefox_version = re.search(r'firefox/(\d+\.?\d*)', ua_lower)
+        if firefox_version:
+            parsed["browser_version"] = firefox_version.group(1)
+    elif "safari/" in ua_lower and "chrome" not in ua_lower:
+        parsed["browser"] = "safari"
+        safari_version = re.search(r'version/(\d+\.?\d*)', ua_lower)
+        if safari_version:
+            parsed["browser_version"] = safari_version.group(1)
+    elif "opera" in ua_lower or "opr/" in ua_lower:
+        parsed["browser"] = "opera"
+        opera_version = re.search(r'(?:opera|opr)/(\d+\.?\d*)', ua_lower)
+        if opera_version:
+            parsed["browser_version"] = opera_version.group(1)
+
+    if "gecko" in ua_lower and "like gecko" not in ua_lower:
+        parsed["engine"] = "gecko"
+    elif "webkit" in ua_lower:
+        parsed["engine"] = "webkit"
+    elif "trident" in ua_lower:
+        parsed["engine"] = "trident"
+    elif "blink" in ua_lower:
+        parsed["engine"] = "blink"
+
+    if "mobile" in ua_lower or "android" in ua_lower and "mobile" in ua_lower:
+        parsed["is_mobile"] = True
+        parsed["device_type"] = "mobile"
+    if "tablet" in ua_lower or "ipad" in ua_lower:
+        parsed["is_tablet"] = True
+        parsed["device_type"] = "tablet"
+
+    parsed["is_bot"] = is_bot_tokens(tokens)
+
+    return parsed
+
+
+def analyze_user_agent(user_agent: str) -> Tuple[FrozenDict, frozenset]:
+    """
+    Cached (parsed user agent, matched bot tokens) pair. The token scan is done
+    once per distinct user agent and shared by the parser and bot detection.
+    """
+    return ua_cache.get_or_compute(user_agent, _analyze_user_agent)
+
+
+def _analyze_user_agent(user_agent: str) -> Tuple[FrozenDict, frozenset]:
+    tokens = match_ua_tokens(user_agent)
+    return FrozenDict(_parse_user_agent(user_agent, tokens)), tokens
+
+
+def parse_user_agent(user_agent: str) -> FrozenDict:
+    return analyze_user_agent(user_agent)[0]